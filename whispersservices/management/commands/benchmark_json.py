@@ -0,0 +1,102 @@
+import io
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.forms.models import model_to_dict
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from whispersservices.models import Event
+from whispersservices.parsers import FastJSONParser
+from whispersservices.renderers import FastJSONRenderer, orjson
+
+
+def build_synthetic_events(count):
+    # event summary-like records: nested lists of dicts with dates, datetimes, decimals, and (non-ASCII) strings
+    now = timezone.now()
+    events = []
+    for i in range(count):
+        start_date = date(2015, 1, 1) + timedelta(days=i % 1500)
+        events.append(OrderedDict([
+            ('id', i), ('event_reference', 'Reference ' + str(i)), ('affected_count', i * 7 % 500),
+            ('start_date', start_date), ('end_date', start_date + timedelta(days=30)), ('complete', i % 2 == 0),
+            ('public', True), ('created_date', start_date), ('modified_date', now - timedelta(seconds=i)),
+            ('eventdiagnoses', [OrderedDict([
+                ('id', i * 2 + j), ('diagnosis', 100 + j), ('diagnosis_string', 'Avian Influenza suspect'),
+                ('suspect', j == 0), ('major', True), ('priority', j + 1)]) for j in range(2)]),
+            ('eventlocations', [OrderedDict([
+                ('id', i * 3 + j), ('name', 'Lac Saint-Jean ' + str(j)), ('start_date', start_date),
+                ('latitude', Decimal('43.073051') + j), ('longitude', Decimal('-89.401230') - j),
+                ('comment', 'Found near the shore — see notes'), ('created_date', now),
+                ('locationspecies', [OrderedDict([
+                    ('id', i * 9 + j * 3 + k), ('species', 2000 + k), ('population_count', 1000 + k),
+                    ('sick_count', k), ('dead_count', 10 * k), ('captive', False),
+                ]) for k in range(3)]),
+            ]) for j in range(3)]),
+        ]))
+    return events
+
+
+def build_database_events(count):
+    # records of the first events and their locations and species, as model_to_dict builds them
+    events = []
+    for event in Event.objects.order_by('id').prefetch_related('eventlocations__locationspecies')[:count]:
+        event_dict = model_to_dict(event)
+        event_dict['eventlocations'] = []
+        for event_location in event.eventlocations.all():
+            event_location_dict = model_to_dict(event_location)
+            event_location_dict['locationspecies'] = [
+                model_to_dict(location_species) for location_species in event_location.locationspecies.all()]
+            event_dict['eventlocations'].append(event_location_dict)
+        events.append(event_dict)
+    return events
+
+
+class Command(BaseCommand):
+    help = ("Compares the default JSON renderer and parser with the fast (orjson) ones on event records, "
+            "checking that both render the same bytes and timing the best of several runs of each.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='The number of event records (default 1000)')
+        parser.add_argument('--repeat', type=int, default=5, help='The number of runs of each (default 5)')
+        parser.add_argument('--from-db', action='store_true',
+                            help='Use the first events in the database rather than synthetic records')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson is not installed, so the fast renderer and parser are the default ones")
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1")
+        if options['from_db']:
+            data = build_database_events(options['count'])
+        else:
+            data = build_synthetic_events(options['count'])
+
+        default_output = JSONRenderer().render(data, 'application/json')
+        fast_output = FastJSONRenderer().render(data, 'application/json')
+        if fast_output != default_output:
+            raise CommandError("The fast renderer rendered different bytes than the default renderer")
+        self.stdout.write("Rendered " + str(len(data)) + " events to " + str(len(default_output))
+                          + " bytes (the same bytes with both renderers)")
+
+        self.compare("render", lambda: JSONRenderer().render(data, 'application/json'),
+                     lambda: FastJSONRenderer().render(data, 'application/json'), options['repeat'])
+        self.compare("parse", lambda: JSONParser().parse(io.BytesIO(default_output), 'application/json'),
+                     lambda: FastJSONParser().parse(io.BytesIO(default_output), 'application/json'),
+                     options['repeat'])
+
+    def compare(self, name, default_function, fast_function, repeat):
+        default_time = self.best_time(default_function, repeat)
+        fast_time = self.best_time(fast_function, repeat)
+        self.stdout.write("{}: default {:.1f} ms, fast {:.1f} ms ({:.1f}x)".format(
+            name, default_time * 1000, fast_time * 1000, default_time / fast_time if fast_time else float('inf')))
+
+    def best_time(self, function, repeat):
+        times = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+        return min(times)
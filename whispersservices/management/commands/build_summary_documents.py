@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from whispersservices.models import Event
+from whispersservices.serializers import update_event_summary_documents
+
+
+class Command(BaseCommand):
+    help = ("Builds and stores the summary documents of the events that have none (e.g., the events created before "
+            "summary documents were introduced), or with --all, rebuilds the documents of every event. "
+            "The documents of changed events are rebuilt as the changes are committed, so this is only needed once.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Rebuild the documents of every event, rather than only of the events without one')
+
+    def handle(self, *args, **options):
+        events = Event.objects.all()
+        if not options['all']:
+            events = events.filter(summarydocument__isnull=True)
+        event_ids = list(events.order_by('id').values_list('id', flat=True))
+        update_event_summary_documents(event_ids)
+        self.stdout.write("Built the summary documents of %s events" % len(event_ids))
@@ -0,0 +1,160 @@
+import os
+import gzip
+from datetime import date
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+def add_months(month, count):
+    # the first day of the month a number of months after (or before, for negative counts) the given month
+    month_index = month.year * 12 + month.month - 1 + count
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = ("Partitions the history tables of the models in the HISTORY_PARTITIONED_MODELS setting by month "
+            "(converting them the first time), creates the partitions of the coming months, "
+            "and optionally archives the partitions of old months to gzipped CSV files and drops them. "
+            "Queries of history filtered by history_date (e.g., the event changes since a watermark) "
+            "then only read the partitions of the months they cover.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='The number of coming months to create partitions for (default 3)')
+        parser.add_argument('--archive-months', type=int, default=None,
+                            help='Archive and drop the partitions of the months before this many months ago')
+        parser.add_argument('--archive-dir', default=settings.HISTORY_ARCHIVE_DIR,
+                            help='The directory to write the archived partitions to')
+
+    def handle(self, *args, **options):
+        this_month = timezone.now().date().replace(day=1)
+        if options['months_ahead'] < 0:
+            raise CommandError("--months-ahead must not be negative")
+        if options['archive_months'] is not None and options['archive_months'] < 1:
+            raise CommandError("--archive-months must be at least 1 (the current month is never archived)")
+
+        for model_name in settings.HISTORY_PARTITIONED_MODELS:
+            table = apps.get_model('whispersservices', model_name).history.model._meta.db_table
+            with transaction.atomic():
+                if not self.is_partitioned(table):
+                    self.partition_table(table, this_month)
+                for count in range(options['months_ahead'] + 1):
+                    self.create_partition(table, add_months(this_month, count))
+            if options['archive_months'] is not None:
+                self.archive_partitions(table, add_months(this_month, -options['archive_months']),
+                                        options['archive_dir'])
+
+    def is_partitioned(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+            row = cursor.fetchone()
+        if row is None:
+            raise CommandError("History table " + table + " does not exist")
+        return row[0] == 'p'
+
+    def partition_table(self, table, this_month):
+        # replace a plain history table with a table partitioned by month (of history_date) holding the same rows,
+        # with the same indexes, foreign keys, and history ID sequence
+        # (the primary key of a partitioned table must include the partition key, so it becomes history_id plus date)
+        self.stdout.write("Partitioning " + table)
+        old_table = table + '_unpartitioned'
+        quoted_table = connection.ops.quote_name(table)
+        quoted_old_table = connection.ops.quote_name(old_table)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i "
+                           "JOIN pg_class c ON c.oid = i.indexrelid WHERE i.indrelid = %s::regclass "
+                           "AND NOT i.indisprimary", [table])
+            indexes = cursor.fetchall()
+            cursor.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                           "WHERE conrelid = %s::regclass AND contype = 'f'", [table])
+            foreign_keys = cursor.fetchall()
+            cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+                           [table])
+            primary_key = cursor.fetchone()[0]
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'history_id')", [table])
+            sequence = cursor.fetchone()[0]
+            cursor.execute("SELECT min(history_date) FROM " + quoted_table)
+            first_date = cursor.fetchone()[0]
+
+            # move the old table (and the names of its primary key and indexes) out of the way
+            cursor.execute("ALTER TABLE " + quoted_table + " RENAME TO " + quoted_old_table)
+            cursor.execute("ALTER TABLE " + quoted_old_table + " RENAME CONSTRAINT "
+                           + connection.ops.quote_name(primary_key) + " TO "
+                           + connection.ops.quote_name(old_table + '_pkey'))
+            for index_name, index_definition in indexes:
+                cursor.execute("DROP INDEX " + connection.ops.quote_name(index_name))
+
+            cursor.execute("CREATE TABLE " + quoted_table + " (LIKE " + quoted_old_table
+                           + " INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (history_date)")
+            cursor.execute("ALTER TABLE " + quoted_table + " ADD CONSTRAINT " + connection.ops.quote_name(primary_key)
+                           + " PRIMARY KEY (history_id, history_date)")
+            # rows outside the monthly partitions (e.g., if this command has not been run for a while) go to a default
+            cursor.execute("CREATE TABLE " + connection.ops.quote_name(table + '_default') + " PARTITION OF "
+                           + quoted_table + " DEFAULT")
+
+        month = first_date.date().replace(day=1) if first_date is not None else this_month
+        while month < this_month:
+            self.create_partition(table, month)
+            month = add_months(month, 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO " + quoted_table + " SELECT * FROM " + quoted_old_table)
+            # the index definitions were read before the rename, so they are made on the partitioned table
+            for index_name, index_definition in indexes:
+                cursor.execute(index_definition)
+            for constraint_name, constraint_definition in foreign_keys:
+                cursor.execute("ALTER TABLE " + quoted_table + " ADD CONSTRAINT "
+                               + connection.ops.quote_name(constraint_name) + " " + constraint_definition)
+            if sequence is not None:
+                cursor.execute("ALTER SEQUENCE " + sequence + " OWNED BY " + quoted_table + ".history_id")
+            cursor.execute("DROP TABLE " + quoted_old_table)
+
+    def create_partition(self, table, month):
+        # create the partition of a month if it does not exist yet,
+        # moving any rows of that month out of the default partition first (or the partition could not be made)
+        partition_name = table + '_p' + month.strftime('%Y%m')
+        partition = connection.ops.quote_name(partition_name)
+        default_partition = connection.ops.quote_name(table + '_default')
+        moved_rows = connection.ops.quote_name(table + '_moved')
+        start = month.isoformat() + ' 00:00:00+00'
+        end = add_months(month, 1).isoformat() + ' 00:00:00+00'
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [partition_name])
+            if cursor.fetchone()[0] is not None:
+                return
+            self.stdout.write("Creating partition " + partition_name)
+            cursor.execute("CREATE TEMPORARY TABLE " + moved_rows + " (LIKE " + connection.ops.quote_name(table) + ")")
+            cursor.execute("WITH moved AS (DELETE FROM " + default_partition + " WHERE history_date >= %s "
+                           "AND history_date < %s RETURNING *) INSERT INTO " + moved_rows + " SELECT * FROM moved",
+                           [start, end])
+            cursor.execute("CREATE TABLE " + partition + " PARTITION OF " + connection.ops.quote_name(table)
+                           + " FOR VALUES FROM (%s) TO (%s)", [start, end])
+            cursor.execute("INSERT INTO " + connection.ops.quote_name(table) + " SELECT * FROM " + moved_rows)
+            cursor.execute("DROP TABLE " + moved_rows)
+
+    def archive_partitions(self, table, before_month, archive_dir):
+        # write each monthly partition before a month to a gzipped CSV file (with a header), then drop it
+        os.makedirs(archive_dir, exist_ok=True)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                           "WHERE i.inhparent = %s::regclass ORDER BY c.relname", [table])
+            partitions = [row[0] for row in cursor.fetchall()]
+        for partition in partitions:
+            month = partition[len(table + '_p'):]
+            if not partition.startswith(table + '_p') or not month.isdigit() or month >= before_month.strftime('%Y%m'):
+                continue
+            self.stdout.write("Archiving partition " + partition)
+            path = os.path.join(archive_dir, partition + '.csv.gz')
+            # write to a temporary file first, so a partial archive never replaces a good one or leads to a drop
+            with transaction.atomic():
+                with connection.cursor() as cursor, gzip.open(path + '.tmp', 'wt', encoding='utf-8') as archive:
+                    cursor.copy_expert("COPY " + connection.ops.quote_name(partition) + " TO STDOUT WITH CSV HEADER",
+                                       archive)
+                os.replace(path + '.tmp', path)
+                with connection.cursor() as cursor:
+                    cursor.execute("ALTER TABLE " + connection.ops.quote_name(table) + " DETACH PARTITION "
+                                   + connection.ops.quote_name(partition))
+                    cursor.execute("DROP TABLE " + connection.ops.quote_name(partition))
@@ -0,0 +1,88 @@
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from whispersservices.models import EventChange, Event, User, Notification, queue_email
+from whispersservices.models import get_event_notification_recipients
+
+
+class Command(BaseCommand):
+    help = ("Sends each user one digest of the changes recorded since the last run to the events the user created "
+            "or collaborates on (made by other users), as a notification and, when NOTIFICATION_DIGEST_EMAIL is "
+            "enabled, a queued email. The changes to events deleted since they were recorded are dropped. "
+            "Runs once, or with --loop, every --interval seconds.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep sending digests every interval (as a worker)')
+        parser.add_argument('--interval', type=int, default=settings.NOTIFICATION_DIGEST_INTERVAL,
+                            help='The number of seconds over which changes are collected into a digest (with --loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            self.send_digests()
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def send_digests(self):
+        # lock the recorded changes (skipping any being recorded now, which go in the next digest),
+        # and remove them in the same transaction that creates the digests
+        # (a change recorded again while its row is locked waits for this transaction, then is inserted again,
+        # and only the rows as they were read are removed, so no change made during a digest is lost)
+        with transaction.atomic():
+            changes = list(EventChange.objects.select_for_update(skip_locked=True).values_list(
+                'id', 'event_id', 'changed_by', 'changed_date'))
+            if not changes:
+                return
+            changed_by = defaultdict(set)
+            for change_id, event_id, user_id, changed_date in changes:
+                changed_by[event_id].add(user_id)
+
+            # the changes of events that have since been deleted are dropped, since the collaborators of a deleted
+            # event are deleted with it, and there is no event left to link to
+            events = Event.objects.in_bulk(list(changed_by))
+
+            # coalesce the changes into one list of changed events per recipient, leaving out a recipient's own changes
+            recipient_events = defaultdict(list)
+            for event_id, recipient_ids in get_event_notification_recipients(list(events)).items():
+                for recipient_id in recipient_ids:
+                    if changed_by[event_id] - {recipient_id}:
+                        recipient_events[recipient_id].append(event_id)
+            usernames = dict(User.objects.filter(
+                id__in=set(user_id for user_ids in changed_by.values() for user_id in user_ids if user_id is not None)
+            ).values_list('id', 'username'))
+
+            notifications = []
+            emails = []
+            for recipient in User.objects.filter(id__in=recipient_events.keys(), is_active=True):
+                event_ids = sorted(recipient_events[recipient.id])
+                subject = "WHISPers events changed"
+                message = "The following events you created or collaborate on have changed:\r\n"
+                for event_id in event_ids:
+                    event = events[event_id]
+                    changed_by_names = sorted(usernames[user_id] for user_id in changed_by[event_id]
+                                              if user_id is not None and user_id != recipient.id)
+                    message += "\r\nEvent " + str(event_id)
+                    if event.event_reference:
+                        message += " (" + event.event_reference + ")"
+                    if changed_by_names:
+                        message += ", changed by " + ", ".join(changed_by_names)
+                    message += ": " + settings.APP_WHISPERS_URL + "event/" + str(event_id) + "/"
+                notifications.append(Notification(recipient=recipient, subject=subject, message=message,
+                                                  events=event_ids))
+                if (settings.NOTIFICATION_DIGEST_EMAIL and recipient.email
+                        and settings.ENVIRONMENT in ['production', 'test']):
+                    emails.append(EmailMessage(subject, message, settings.EMAIL_WHISPERS, [recipient.email, ]))
+
+            Notification.objects.bulk_create(notifications)
+            for email in emails:
+                queue_email(email)
+            EventChange.objects.filter(id__in=[change[0] for change in changes],
+                                       changed_date__lte=max(change[3] for change in changes)).delete()
+
+        self.stdout.write("Sent " + str(len(notifications)) + " digests of changes to " + str(len(events))
+                          + " events (dropped the changes to " + str(len(changed_by) - len(events))
+                          + " deleted events)")
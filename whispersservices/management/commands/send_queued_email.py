@@ -0,0 +1,78 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from whispersservices.models import OutboundEmail
+
+
+class Command(BaseCommand):
+    help = ("Sends the queued outbound emails in batches (one mail server connection per batch), "
+            "retrying failed emails later with an increasing delay until EMAIL_QUEUE_MAX_ATTEMPTS is reached. "
+            "Sends until the queue is empty, or with --loop, keeps polling the queue as a worker.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_QUEUE_BATCH_SIZE,
+                            help='The number of emails to send per batch')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the queue for emails to send (as a worker)')
+        parser.add_argument('--interval', type=int, default=settings.EMAIL_QUEUE_POLL_INTERVAL,
+                            help='The number of seconds to wait between polls of an empty queue (with --loop)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        while True:
+            count = self.send_batch(options['batch_size'])
+            if count < options['batch_size']:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+    def send_batch(self, batch_size):
+        # lock a batch of the queued emails that can be sent (skipping any locked by another worker),
+        # so that each email is sent by one worker (or sent again, if the worker stops before its batch is saved)
+        now = timezone.now()
+        with transaction.atomic():
+            emails = list(OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutboundEmail.STATUS_QUEUED, send_after__lte=now).order_by('send_after', 'id')[:batch_size])
+            if not emails:
+                return 0
+
+            connection = get_connection(fail_silently=False)
+            try:
+                connection.open()
+            except Exception as e:
+                for email in emails:
+                    self.record_failure(email, e, now)
+            else:
+                try:
+                    for email in emails:
+                        try:
+                            email.to_message(connection).send()
+                        except Exception as e:
+                            self.record_failure(email, e, now)
+                        else:
+                            email.status = OutboundEmail.STATUS_SENT
+                            email.sent_date = timezone.now()
+                finally:
+                    connection.close()
+
+            OutboundEmail.objects.bulk_update(
+                emails, ['status', 'attempts', 'last_error', 'send_after', 'sent_date'])
+
+        sent = sum(1 for email in emails if email.status == OutboundEmail.STATUS_SENT)
+        self.stdout.write("Sent " + str(sent) + " of " + str(len(emails)) + " queued emails")
+        return len(emails)
+
+    def record_failure(self, email, error, now):
+        # retry later (waiting twice as long after each failed attempt), or give up after the last attempt
+        email.attempts += 1
+        email.last_error = str(error)
+        if email.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+            email.status = OutboundEmail.STATUS_FAILED
+        else:
+            email.send_after = now + timedelta(seconds=settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (email.attempts - 1))
+        self.stderr.write("Failed to send email " + str(email.id) + ": " + email.last_error)
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.9 on 2026-10-19 16:23
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0039_auto_20200521_1028'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSummaryDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', django.contrib.postgres.fields.jsonb.JSONField(help_text='A JSON object containing the precomputed event summary data')),
+                ('event', models.OneToOneField(help_text='A foreign key integer value identifying an event', on_delete=django.db.models.deletion.CASCADE, related_name='summarydocument', to='whispersservices.Event')),
+            ],
+            options={
+                'db_table': 'whispers_eventsummarydocument',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.9 on 2026-10-19 16:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0040_eventsummarydocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='administrativelevelone',
+            name='centroid_latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text='A fixed-precision decimal number value indentifying the latitude for this administrative level one', max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='administrativelevelone',
+            name='centroid_longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text='A fixed-precision decimal number value indentifying the longitude for this administrative level one', max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicaladministrativelevelone',
+            name='centroid_latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text='A fixed-precision decimal number value indentifying the latitude for this administrative level one', max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicaladministrativelevelone',
+            name='centroid_longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text='A fixed-precision decimal number value indentifying the longitude for this administrative level one', max_digits=9, null=True),
+        ),
+    ]
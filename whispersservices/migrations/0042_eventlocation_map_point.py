@@ -0,0 +1,97 @@
+# Generated by Django 2.2.9 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+
+# a copy of whispersservices.models.encode_geohash as it was when this migration was written,
+# so that the migration keeps computing the same geohashes however the models module changes
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 12
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    latitude_range = [-90.0, 90.0]
+    longitude_range = [-180.0, 180.0]
+    latitude = float(latitude)
+    longitude = float(longitude)
+    geohash = ''
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geohash) < precision:
+        value_range, value = (longitude_range, longitude) if even else (latitude_range, latitude)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            value_range[0] = mid
+        else:
+            bits = bits * 2
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash += GEOHASH_BASE32[bits]
+            bits = 0
+            bit_count = 0
+    return geohash
+
+
+def set_map_points(apps, schema_editor):
+    # map every existing event location at its own coordinates, else at the centroid of its county (or its state)
+    EventLocation = apps.get_model('whispersservices', 'EventLocation')
+    event_locations = EventLocation.objects.select_related('administrative_level_one', 'administrative_level_two')
+    for event_location in event_locations.iterator():
+        map_latitude, map_longitude = event_location.latitude, event_location.longitude
+        if map_latitude is None or map_longitude is None:
+            map_latitude, map_longitude = None, None
+            for admin_level in [event_location.administrative_level_two, event_location.administrative_level_one]:
+                if (admin_level is not None and admin_level.centroid_latitude is not None
+                        and admin_level.centroid_longitude is not None):
+                    map_latitude, map_longitude = admin_level.centroid_latitude, admin_level.centroid_longitude
+                    break
+        if map_latitude is not None:
+            # update rather than save so that no history is recorded for this derived data
+            EventLocation.objects.filter(id=event_location.id).update(
+                map_latitude=map_latitude, map_longitude=map_longitude,
+                geohash=encode_geohash(map_latitude, map_longitude))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0041_administrativelevelone_centroid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventlocation',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='An alphanumeric value of the geohash of the map latitude and longitude of this event location', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='eventlocation',
+            name='map_latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text='A fixed-precision decimal number value indentifying the latitude at which this event location is mapped (its own latitude or its county centroid)', max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventlocation',
+            name='map_longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text='A fixed-precision decimal number value indentifying the longitude at which this event location is mapped (its own longitude or its county centroid)', max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicaleventlocation',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='An alphanumeric value of the geohash of the map latitude and longitude of this event location', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='historicaleventlocation',
+            name='map_latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text='A fixed-precision decimal number value indentifying the latitude at which this event location is mapped (its own latitude or its county centroid)', max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicaleventlocation',
+            name='map_longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text='A fixed-precision decimal number value indentifying the longitude at which this event location is mapped (its own longitude or its county centroid)', max_digits=9, null=True),
+        ),
+        migrations.RunPython(set_map_points, migrations.RunPython.noop),
+    ]
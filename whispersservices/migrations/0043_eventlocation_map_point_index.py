@@ -0,0 +1,17 @@
+# Generated by Django 2.2.9 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0042_eventlocation_map_point'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventlocation',
+            index=models.Index(fields=['map_latitude', 'map_longitude'], name='whispers_evtloc_map_point_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.9 on 2026-10-19 16:38
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# keep each search vector up to date with its text in the database itself, so that it is maintained for every write
+# (including queryset updates), then fill in the search vectors of the existing rows
+SEARCH_VECTOR_TABLES = [
+    ('whispers_event', 'event_reference'),
+    ('whispers_eventabstract', 'text'),
+    ('whispers_comment', 'comment'),
+]
+SEARCH_VECTOR_SQL = [
+    ("CREATE TRIGGER {0}_search_vector_update BEFORE INSERT OR UPDATE ON {0} FOR EACH ROW "
+     "EXECUTE PROCEDURE tsvector_update_trigger(search_vector, 'pg_catalog.english', {1});"
+     "UPDATE {0} SET search_vector = to_tsvector('pg_catalog.english', COALESCE({1}, ''));".format(table, column),
+     "DROP TRIGGER IF EXISTS {0}_search_vector_update ON {0};".format(table))
+    for table, column in SEARCH_VECTOR_TABLES
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0043_eventlocation_map_point_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='The full-text search vector of the comment of this object (maintained by the database)', null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='The full-text search vector of the event reference of this event (maintained by the database)', null=True),
+        ),
+        migrations.AddField(
+            model_name='eventabstract',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='The full-text search vector of the text of this event abstract (maintained by the database)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='whispers_comment_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='whispers_event_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventabstract',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='whispers_evtabs_search_idx'),
+        ),
+    ] + [migrations.RunSQL(sql, reverse_sql) for sql, reverse_sql in SEARCH_VECTOR_SQL]
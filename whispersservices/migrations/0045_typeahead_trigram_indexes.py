@@ -0,0 +1,40 @@
+# Generated by Django 2.2.9 on 2026-10-19 16:40
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0044_text_search_vectors'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='contact',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['first_name'], name='whispers_contact_first_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['last_name'], name='whispers_contact_last_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['email'], name='whispers_contact_email_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='organization',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='whispers_org_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='species',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='whispers_species_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='species',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['species_latin_name'], name='whispers_species_latin_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,125 @@
+# Generated by Django 2.2.9 on 2026-10-19 16:43
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import simple_history.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0045_typeahead_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricalEventWriteCircle',
+            fields=[
+                ('id', models.IntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('created_date', models.DateField(blank=True, db_index=True, default=datetime.date.today, help_text='The date this object was created in "YYYY-MM-DD" format', null=True)),
+                ('modified_date', models.DateField(blank=True, editable=False, help_text='The date this object was last modified on in "YYYY-MM-DD" format', null=True)),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField()),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('circle', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='whispersservices.Circle')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, help_text='A foreign key integer identifying the user who created the object', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('event', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='whispersservices.Event')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('modified_by', models.ForeignKey(blank=True, db_constraint=False, help_text='A foreign key integer identifying the user who last modified the object', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical event write circle',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': 'history_date',
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalEventReadCircle',
+            fields=[
+                ('id', models.IntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('created_date', models.DateField(blank=True, db_index=True, default=datetime.date.today, help_text='The date this object was created in "YYYY-MM-DD" format', null=True)),
+                ('modified_date', models.DateField(blank=True, editable=False, help_text='The date this object was last modified on in "YYYY-MM-DD" format', null=True)),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField()),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('circle', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='whispersservices.Circle')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, help_text='A foreign key integer identifying the user who created the object', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('event', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='whispersservices.Event')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('modified_by', models.ForeignKey(blank=True, db_constraint=False, help_text='A foreign key integer identifying the user who last modified the object', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical event read circle',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': 'history_date',
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='EventWriteCircle',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateField(blank=True, db_index=True, default=datetime.date.today, help_text='The date this object was created in "YYYY-MM-DD" format', null=True)),
+                ('modified_date', models.DateField(auto_now=True, help_text='The date this object was last modified on in "YYYY-MM-DD" format', null=True)),
+                ('circle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventwritecircles', to='whispersservices.Circle')),
+                ('created_by', models.ForeignKey(blank=True, help_text='A foreign key integer identifying the user who created the object', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='eventwritecircle_creator', to=settings.AUTH_USER_MODEL)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventwritecircles', to='whispersservices.Event')),
+                ('modified_by', models.ForeignKey(blank=True, help_text='A foreign key integer identifying the user who last modified the object', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='eventwritecircle_modifier', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'whispers_eventwritecircle',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventReadCircle',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateField(blank=True, db_index=True, default=datetime.date.today, help_text='The date this object was created in "YYYY-MM-DD" format', null=True)),
+                ('modified_date', models.DateField(auto_now=True, help_text='The date this object was last modified on in "YYYY-MM-DD" format', null=True)),
+                ('circle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventreadcircles', to='whispersservices.Circle')),
+                ('created_by', models.ForeignKey(blank=True, help_text='A foreign key integer identifying the user who created the object', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='eventreadcircle_creator', to=settings.AUTH_USER_MODEL)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventreadcircles', to='whispersservices.Event')),
+                ('modified_by', models.ForeignKey(blank=True, help_text='A foreign key integer identifying the user who last modified the object', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='eventreadcircle_modifier', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'whispers_eventreadcircle',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventCircleUser',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('write', models.BooleanField(default=False, help_text='A boolean value indicating if the user can write the event (through any circle) or only read it')),
+                ('event', models.ForeignKey(help_text='A foreign key integer value identifying an event', on_delete=django.db.models.deletion.CASCADE, related_name='eventcircleusers', to='whispersservices.Event')),
+                ('user', models.ForeignKey(help_text='A foreign key integer value identifying a member of a circle the event is shared with', on_delete=django.db.models.deletion.CASCADE, related_name='eventcircleusers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'whispers_eventcircleuser',
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='read_circles',
+            field=models.ManyToManyField(related_name='readevents', through='whispersservices.EventReadCircle', to='whispersservices.Circle'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='write_circles',
+            field=models.ManyToManyField(related_name='writeevents', through='whispersservices.EventWriteCircle', to='whispersservices.Circle'),
+        ),
+        migrations.AddIndex(
+            model_name='eventcircleuser',
+            index=models.Index(fields=['user', 'event'], name='whispers_evtcircleuser_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='eventcircleuser',
+            unique_together={('event', 'user')},
+        ),
+    ]
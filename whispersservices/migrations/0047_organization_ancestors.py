@@ -0,0 +1,54 @@
+# Generated by Django 2.2.9 on 2026-10-19 16:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def link_organization_ancestors(apps, schema_editor):
+    # link every existing organization to itself and to each of its ancestors
+    Organization = apps.get_model('whispersservices', 'Organization')
+    OrganizationAncestor = apps.get_model('whispersservices', 'OrganizationAncestor')
+    parent_ids = dict(Organization.objects.values_list('id', 'parent_organization_id'))
+    links = []
+    for org_id in parent_ids:
+        ancestor_id = org_id
+        depth = 0
+        # (stop at a repeated ancestor, in case the existing hierarchy has a cycle)
+        seen_ids = set()
+        while ancestor_id is not None and ancestor_id not in seen_ids:
+            seen_ids.add(ancestor_id)
+            links.append(OrganizationAncestor(organization_id=org_id, ancestor_id=ancestor_id, depth=depth))
+            ancestor_id = parent_ids.get(ancestor_id)
+            depth += 1
+    OrganizationAncestor.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0046_event_circles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationAncestor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.IntegerField(default=0, help_text='An integer value of the number of levels between the organization and the ancestor (zero for the organization itself)')),
+                ('ancestor', models.ForeignKey(help_text='A foreign key integer value identifying the organization itself or one of its ancestors', on_delete=django.db.models.deletion.CASCADE, related_name='organizationdescendants', to='whispersservices.Organization')),
+                ('organization', models.ForeignKey(help_text='A foreign key integer value identifying an organization', on_delete=django.db.models.deletion.CASCADE, related_name='organizationancestors', to='whispersservices.Organization')),
+            ],
+            options={
+                'db_table': 'whispers_organizationancestor',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='organizationancestor',
+            index=models.Index(fields=['ancestor', 'organization'], name='whispers_organcestor_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='organizationancestor',
+            unique_together={('organization', 'ancestor')},
+        ),
+        migrations.RunPython(link_organization_ancestors, migrations.RunPython.noop),
+    ]
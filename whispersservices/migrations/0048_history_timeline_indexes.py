@@ -0,0 +1,34 @@
+# Generated by Django 2.2.9 on 2026-10-19 16:53
+
+from django.db import migrations
+
+
+# index the history tables of the event tree (and comments) by time, and by record and time, so that the changes
+# since a time and the timeline of the records of an event are read with index scans
+# (the history models are generated by simple_history, which has no option for indexes, so they are made in SQL)
+HISTORY_TIMELINE_TABLES = [
+    'event', 'eventeventgroup', 'eventorganization', 'eventcontact', 'eventlocation', 'eventlocationcontact',
+    'eventlocationflyway', 'locationspecies', 'eventdiagnosis', 'speciesdiagnosis', 'speciesdiagnosisorganization',
+    'servicerequest', 'eventreaduser', 'eventwriteuser', 'eventreadcircle', 'eventwritecircle', 'comment',
+]
+HISTORY_TIMELINE_SQL = [
+    ("CREATE INDEX whispers_hist_{0}_date_idx ON whispersservices_historical{0} (history_date);"
+     "CREATE INDEX whispers_hist_{0}_id_idx ON whispersservices_historical{0} (id, history_date, history_id);"
+     .format(table),
+     "DROP INDEX IF EXISTS whispers_hist_{0}_date_idx; DROP INDEX IF EXISTS whispers_hist_{0}_id_idx;".format(table))
+    for table in HISTORY_TIMELINE_TABLES
+] + [
+    ("CREATE INDEX whispers_hist_comment_object_idx ON whispersservices_historicalcomment (content_type_id, object_id);",
+     "DROP INDEX IF EXISTS whispers_hist_comment_object_idx;")
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0047_organization_ancestors'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql, reverse_sql) for sql, reverse_sql in HISTORY_TIMELINE_SQL
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.9 on 2026-10-19 16:57
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0048_history_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.TextField(blank=True, default='', help_text='An alphanumeric value of the subject of this email')),
+                ('body', models.TextField(blank=True, default='', help_text='An alphanumeric value of the plain text body of this email')),
+                ('html_body', models.TextField(blank=True, default='', help_text='An alphanumeric value of the HTML body of this email (if any)')),
+                ('from_address', models.CharField(help_text='An alphanumeric value of the from address of this email', max_length=254)),
+                ('to', django.contrib.postgres.fields.jsonb.JSONField(default=list, help_text='A JSON array containing the to addresses of this email')),
+                ('cc', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=list, help_text='A JSON array containing the cc addresses of this email')),
+                ('bcc', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=list, help_text='A JSON array containing the bcc addresses of this email')),
+                ('reply_to', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=list, help_text='A JSON array containing the reply to addresses of this email')),
+                ('headers', django.contrib.postgres.fields.jsonb.JSONField(blank=True, help_text='A JSON object containing the extra headers of this email', null=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('sent', 'Sent'), ('failed', 'Failed')], default='queued', help_text='An alphanumeric value of the status of this email (queued, sent, or failed)', max_length=8)),
+                ('attempts', models.IntegerField(default=0, help_text='An integer value of the number of failed attempts to send this email')),
+                ('last_error', models.TextField(blank=True, default='', help_text='An alphanumeric value of the error of the last failed attempt to send this email')),
+                ('send_after', models.DateTimeField(default=django.utils.timezone.now, help_text='A date and time value of when this email can be sent (later after each failed attempt)')),
+                ('created_date', models.DateTimeField(blank=True, db_index=True, default=django.utils.timezone.now, help_text='A date and time value of when this email was queued')),
+                ('sent_date', models.DateTimeField(blank=True, help_text='A date and time value of when this email was sent', null=True)),
+            ],
+            options={
+                'db_table': 'whispers_outboundemail',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboundemail',
+            index=models.Index(fields=['status', 'send_after'], name='whispers_outemail_queue_idx'),
+        ),
+    ]
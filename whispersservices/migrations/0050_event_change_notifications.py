@@ -0,0 +1,53 @@
+# Generated by Django 2.2.9 on 2026-10-19 17:00
+
+from django.conf import settings
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0049_outbound_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(blank=True, default='', help_text='An alphanumeric value of the subject of this notification', max_length=128)),
+                ('message', models.TextField(blank=True, default='', help_text='An alphanumeric value of the message of this notification')),
+                ('events', django.contrib.postgres.fields.jsonb.JSONField(default=list, help_text='A JSON array containing the IDs of the changed events')),
+                ('read', models.BooleanField(default=False, help_text='A boolean value indicating if the user has read this notification')),
+                ('created_date', models.DateTimeField(blank=True, default=django.utils.timezone.now, help_text='A date and time value of when this notification was created')),
+                ('recipient', models.ForeignKey(help_text='A foreign key integer value identifying the user this notification is for', on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'whispers_notification',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.IntegerField(help_text='An integer value identifying the changed event')),
+                ('changed_date', models.DateTimeField(default=django.utils.timezone.now, help_text='A date and time value of the first change to the event by the user since the last digest')),
+                ('changed_by', models.ForeignKey(help_text='A foreign key integer value identifying a user who changed the event', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='eventchanges', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'whispers_eventchange',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'read'], name='whispers_notification_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='eventchange',
+            unique_together={('event_id', 'changed_by')},
+        ),
+    ]
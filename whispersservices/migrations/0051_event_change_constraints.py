@@ -0,0 +1,36 @@
+# Generated by Django 2.2.9 on 2026-10-19 17:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whispersservices', '0050_event_change_notifications'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventchange',
+            name='changed_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='A date and time value of the last change to the event by the user since the last digest'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='eventchange',
+            unique_together=set(),
+        ),
+        # the old unique constraint never matched changes without a user, so remove their duplicates first
+        migrations.RunSQL(
+            "DELETE FROM whispers_eventchange a USING whispers_eventchange b WHERE a.changed_by_id IS NULL "
+            "AND b.changed_by_id IS NULL AND a.event_id = b.event_id AND a.id > b.id;",
+            migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='eventchange',
+            constraint=models.UniqueConstraint(condition=models.Q(changed_by__isnull=False), fields=('event_id', 'changed_by'), name='whispers_eventchange_user_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventchange',
+            constraint=models.UniqueConstraint(condition=models.Q(changed_by__isnull=True), fields=('event_id',), name='whispers_eventchange_nouser_uniq'),
+        ),
+    ]
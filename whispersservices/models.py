@@ -1,11 +1,24 @@
-from django.db import models
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from django.db import connection, models, transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
 from datetime import date
 from django.contrib.auth.models import AbstractUser
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
 from simple_history.models import HistoricalRecords
+from simple_history.utils import bulk_create_with_history
 
 
 # Default fields of the core User model: username, first_name, last_name, email, password, groups, user_permissions,
@@ -39,7 +52,7 @@ def determine_create_permission(request, event):
                     and (request.user.role.is_partneradmin or request.user.role.is_partnermanager))):
             return True
         else:
-            write_collaborators = list(User.objects.filter(writeevents__in=[event.id]).values_list('id', flat=True))
+            write_collaborators = get_event_write_collaborator_ids(event.id)
             return request.user.id in write_collaborators
 
 
@@ -52,10 +65,251 @@ def determine_object_update_permission(self, request, event_id):
               and (request.user.role.is_partneradmin or request.user.role.is_partnermanager))):
         return True
     else:
-        write_collaborators = list(User.objects.filter(writeevents__in=[event_id]).values_list('id', flat=True))
+        write_collaborators = get_event_write_collaborator_ids(event_id)
         return request.user.id in write_collaborators
 
 
+def get_event_read_collaborator_ids(event_id):
+    # the users an event is shared with for reading, directly or as members of a circle
+    # (circle members are precomputed, see expand_event_circles, so circle access is a single indexed join)
+    return list(User.objects.filter(
+        models.Q(readevents__in=[event_id])
+        | models.Q(eventcircleusers__event=event_id, eventcircleusers__write=False)
+    ).values_list('id', flat=True).distinct())
+
+
+def get_event_write_collaborator_ids(event_id):
+    # the users an event is shared with for writing, directly or as members of a circle
+    return list(User.objects.filter(
+        models.Q(writeevents__in=[event_id])
+        | models.Q(eventcircleusers__event=event_id, eventcircleusers__write=True)
+    ).values_list('id', flat=True).distinct())
+
+
+def get_event_collaborator_ids(event_id):
+    # the users an event is shared with for reading or writing, directly or as members of a circle
+    return list(User.objects.filter(
+        models.Q(readevents__in=[event_id]) | models.Q(writeevents__in=[event_id])
+        | models.Q(eventcircleusers__event=event_id)
+    ).values_list('id', flat=True).distinct())
+
+
+EVENT_DATA_VERSION_CACHE_KEY = 'whispers_event_data_version'
+EVENT_VERSION_CACHE_KEY_PREFIX = 'whispers_event_version_'
+EVENT_LOOKUP_VERSION_CACHE_KEY = 'whispers_event_lookup_version'
+
+
+def get_version_stamp(cache_key):
+    # a version stamp is a pair of a random ID and the time it was made, and is replaced whenever the data it covers
+    # is written, so that anything cached from that data can include it in its cache key and never be served stale
+    stamp = cache.get(cache_key)
+    if stamp is None:
+        # a random ID (rather than a counter) ensures an evicted version can never be reused
+        cache.add(cache_key, (uuid.uuid4().hex, time.time()), None)
+        stamp = cache.get(cache_key)
+    return stamp
+
+
+def bump_version_stamp(cache_key):
+    # wait until the write is committed so that a concurrent request cannot cache uncommitted data under the new stamp
+    # (and replace the stamp only once per transaction, however many of its writes the stamp covers)
+    on_commit_once(('version_stamp', cache_key), lambda: cache.set(cache_key, (uuid.uuid4().hex, time.time()), None))
+
+
+def on_commit_once(key, func):
+    # run a function once the transaction commits, only once per key however often it is requested in the transaction
+    # (a request is dropped with the savepoint it was made in, just as by on_commit, and is then made again by the
+    # next request for the same key, since the requests still waiting to run are looked up among the callbacks)
+    for savepoint_ids, callback in transaction.get_connection().run_on_commit:
+        if getattr(callback, 'on_commit_key', None) == key:
+            return
+    callback = lambda: func()
+    callback.on_commit_key = key
+    transaction.on_commit(callback)
+
+
+def get_event_data_version():
+    # the event data version covers every event tree (i.e., it changes whenever any part of any event is written)
+    return get_version_stamp(EVENT_DATA_VERSION_CACHE_KEY)
+
+
+def bump_event_data_version():
+    bump_version_stamp(EVENT_DATA_VERSION_CACHE_KEY)
+
+
+def get_event_version(event_id):
+    # the event version covers everything shown in the details of a single event
+    return get_version_stamp(EVENT_VERSION_CACHE_KEY_PREFIX + str(event_id))
+
+
+def bump_event_version(event_id):
+    bump_version_stamp(EVENT_VERSION_CACHE_KEY_PREFIX + str(event_id))
+
+
+def get_event_lookup_version():
+    # the event lookup version covers the lookup tables whose values are shown in the details of every event
+    # (and so also covers the reference data bundle)
+    return get_version_stamp(EVENT_LOOKUP_VERSION_CACHE_KEY)
+
+
+def bump_event_lookup_version():
+    bump_version_stamp(EVENT_LOOKUP_VERSION_CACHE_KEY)
+
+
+# the text search configuration of the search vectors (which are maintained by database triggers, see migrations)
+TEXT_SEARCH_CONFIG = 'english'
+
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 12
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    # a geohash interleaves the bits of repeated halvings of the longitude and latitude ranges (longitude first),
+    # so every prefix of a geohash is a grid cell that contains the cells of all the longer geohashes that share it
+    latitude_range = [-90.0, 90.0]
+    longitude_range = [-180.0, 180.0]
+    latitude = float(latitude)
+    longitude = float(longitude)
+    geohash = ''
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geohash) < precision:
+        value_range, value = (longitude_range, longitude) if even else (latitude_range, latitude)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            value_range[0] = mid
+        else:
+            bits = bits * 2
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash += GEOHASH_BASE32[bits]
+            bits = 0
+            bit_count = 0
+    return geohash
+
+
+# the objects whose deletion history bulk_delete_with_history has already recorded (per thread, None when deleting
+# nothing), so that their historical records are not written a second time by the post_delete signal
+DELETE_HISTORY_RECORDED = threading.local()
+
+
+def bulk_delete_with_history(queryset, history_user):
+    # delete the objects of a queryset, recording their history with one insert
+    # (a plain queryset delete records the history of each object in its own insert, through the post_delete signal,
+    # so the delete skips the records of these objects, while still recording those of any cascade-deleted objects)
+    objs = list(queryset)
+    if not objs:
+        return 0
+    history_model = queryset.model.history.model
+    history_date = timezone.now()
+    historical_instances = [history_model(
+        history_date=history_date, history_user=history_user, history_change_reason='', history_type='-',
+        **{field.attname: getattr(obj, field.attname) for field in obj._meta.fields
+           if field.name not in history_model._history_excluded_fields}) for obj in objs]
+    with transaction.atomic():
+        history_model.objects.bulk_create(historical_instances)
+        DELETE_HISTORY_RECORDED.objects = {(queryset.model, obj.pk) for obj in objs}
+        try:
+            queryset.model.objects.filter(pk__in=[obj.pk for obj in objs]).delete()
+        finally:
+            DELETE_HISTORY_RECORDED.objects = None
+    return len(objs)
+
+
+def set_relates(model, owner_field, owner, related_field, related_ids, user):
+    # make the relates (many-to-many rows) of an owner match the submitted related IDs, as set differences:
+    # one bulk delete of the relates that are no longer submitted and one bulk insert of the new ones (with history)
+    # NOTE: bulk inserts skip the model signals, so callers must follow up on the returned changes themselves
+    old_ids = set(model.objects.filter(**{owner_field: owner}).values_list(related_field, flat=True))
+    new_ids = set(related_ids)
+    delete_ids = old_ids - new_ids
+    add_ids = new_ids - old_ids
+    if delete_ids:
+        bulk_delete_with_history(
+            model.objects.filter(**{owner_field: owner, related_field + '__in': delete_ids}), user)
+    if add_ids:
+        new_relates = []
+        for related_id in add_ids:
+            new_relate = model(**{owner_field: owner, related_field + '_id': related_id})
+            new_relate.created_by = user
+            new_relate.modified_by = user
+            new_relate._history_user = user
+            new_relates.append(new_relate)
+        bulk_create_with_history(new_relates, model)
+    return add_ids, delete_ids
+
+
+# the historical records being collected by buffered_history (per thread, None when not buffering)
+HISTORY_BUFFER = threading.local()
+
+
+class BufferedHistoricalRecords(HistoricalRecords):
+    """
+    Historical records that can be collected and written with one bulk insert per model (see buffered_history),
+    and whose updates can be skipped for system-only changes (see system_change)
+    """
+
+    def create_historical_record(self, instance, history_type, using=None):
+        if (history_type == '~' and getattr(instance, '_system_change', False)
+                and getattr(settings, 'SKIP_SYSTEM_CHANGE_HISTORY', False)):
+            return
+        if history_type == '-' and (instance.__class__, instance.pk) in (
+                getattr(DELETE_HISTORY_RECORDED, 'objects', None) or ()):
+            return
+        records = getattr(HISTORY_BUFFER, 'records', None)
+        # records made within a savepoint inside the buffered block are written at once, since the savepoint can be
+        # rolled back (e.g., by an inner atomic block that raised), and a buffered record would outlive its change
+        if records is None or len(transaction.get_connection(using).savepoint_ids) > HISTORY_BUFFER.savepoint_depth:
+            return super(BufferedHistoricalRecords, self).create_historical_record(instance, history_type, using)
+
+        # build the historical record just as the base class does, but keep it to be written later
+        # (NOTE: the pre and post create historical record signals are not sent for buffered records)
+        manager = getattr(instance, self.manager_name)
+        attrs = {field.attname: getattr(instance, field.attname) for field in self.fields_included(instance)}
+        history_instance = manager.model(
+            history_date=getattr(instance, '_history_date', timezone.now()),
+            history_type=history_type,
+            history_user=self.get_history_user(instance),
+            history_change_reason=getattr(instance, 'changeReason', None),
+            **attrs
+        )
+        records.setdefault(manager.model, []).append(history_instance)
+
+
+@contextmanager
+def buffered_history():
+    # collect the historical records written within the block (in its own transaction), and write them with one bulk
+    # insert per model just before the transaction commits (nested blocks share the buffer of the outermost block)
+    with transaction.atomic():
+        if getattr(HISTORY_BUFFER, 'records', None) is not None:
+            yield
+            return
+        HISTORY_BUFFER.records = OrderedDict()
+        HISTORY_BUFFER.savepoint_depth = len(transaction.get_connection().savepoint_ids)
+        try:
+            yield
+            for history_model, history_instances in HISTORY_BUFFER.records.items():
+                history_model.objects.bulk_create(history_instances)
+        finally:
+            HISTORY_BUFFER.records = None
+
+
+@contextmanager
+def system_change(instance):
+    # mark the saves of an instance within the block as system-only changes (e.g., counters and derived fields),
+    # whose history is not recorded when the SKIP_SYSTEM_CHANGE_HISTORY setting is enabled
+    instance._system_change = True
+    try:
+        yield instance
+    finally:
+        del instance._system_change
+
+
 ######
 #
 #  Abstract Base Classes
@@ -74,7 +328,8 @@ class HistoryModel(models.Model):
     modified_date = models.DateField(auto_now=True, null=True, blank=True, help_text='The date this object was last modified on in "YYYY-MM-DD" format')
     modified_by = models.ForeignKey(settings.AUTH_USER_MODEL, models.PROTECT, null=True, blank=True, db_index=True,
                                     related_name='%(class)s_modifier', help_text='A foreign key integer identifying the user who last modified the object')
-    history = HistoricalRecords(inherit=True)
+    # (the full-text search vectors are derived by the database, so they are left out of the history)
+    history = BufferedHistoricalRecords(inherit=True, excluded_fields=['search_vector'])
 
     class Meta:
         abstract = True
@@ -200,6 +455,43 @@ class PermissionsHistoryModel(HistoryModel):
         abstract = True
 
 
+class EventSharePermissionsHistoryModel(PermissionsHistoryModel):
+    """
+    An abstract base class model for the permissions of the tables that share an event with users or circles.
+    """
+
+    @staticmethod
+    def has_create_permission(request):
+        event = Event.objects.get(pk=int(request.data['event']))
+        # only admins or the event creator or a manager/admin member of the creator's org can create
+        if (not request or not request.user or not request.user.is_authenticated
+                or request.user.role.is_public or request.user.role.is_affiliate):
+            return False
+        elif request.user.role.is_superadmin or request.user.role.is_admin:
+            return True
+        else:
+            if (request.user.id == event.created_by.id
+                    or (request.user.organization.id == event.created_by.organization.id
+                        and (request.user.role.is_partneradmin or request.user.role.is_partnermanager))):
+                return True
+            else:
+                return False
+
+    def has_object_update_permission(self, request):
+        # Only admins or the creator or a manager/admin member of the creator's org can update
+        if not request or not request.user or not request.user.is_authenticated or request.user.role.is_public:
+            return False
+        elif (request.user.role.is_superadmin or request.user.role.is_admin or request.user.id == self.created_by.id
+              or (request.user.organization.id == self.created_by.organization.id
+                  and (request.user.role.is_partneradmin or request.user.role.is_partnermanager))):
+            return True
+        else:
+            return False
+
+    class Meta:
+        abstract = True
+
+
 class AdminPermissionsHistoryModel(HistoryModel):
     """
     An abstract base class model for administrator-only permissions.
@@ -272,10 +564,15 @@ class Event(PermissionsHistoryModel):
         'User', through='EventReadUser', through_fields=('event', 'user'), related_name='readevents')
     write_collaborators = models.ManyToManyField(
         'User', through='EventWriteUser', through_fields=('event', 'user'), related_name='writeevents')
+    read_circles = models.ManyToManyField(
+        'Circle', through='EventReadCircle', through_fields=('event', 'circle'), related_name='readevents')
+    write_circles = models.ManyToManyField(
+        'Circle', through='EventWriteCircle', through_fields=('event', 'circle'), related_name='writeevents')
     eventgroups = models.ManyToManyField('EventGroup', through='EventEventGroup', related_name='events', help_text='A foreign key integer identifying the user who last modified the object')
     organizations = models.ManyToManyField('Organization', through='EventOrganization', related_name='events', help_text='A many to many releationship of organizations based on a foreign key integer value indentifying an organization')
     contacts = models.ManyToManyField('Contact', through='EventContact', related_name='event')
     comments = GenericRelation('Comment', related_name='events')
+    search_vector = SearchVectorField(null=True, editable=False, help_text='The full-text search vector of the event reference of this event (maintained by the database)')
 
     @staticmethod
     def has_create_permission(request):
@@ -367,10 +664,26 @@ class Event(PermissionsHistoryModel):
     class Meta:
         db_table = "whispers_event"
         ordering = ['-id']
+        indexes = [GinIndex(fields=['search_vector'], name='whispers_event_search_idx')]
         # TODO: 'unique together' fields
         # The event record must be uniquely identified by the submission agency, event date, and location.
 
 
+class EventSummaryDocument(models.Model):
+    """
+    Event Summary Document (a precomputed copy of the event summary data gathered from the children of an event)
+    """
+
+    event = models.OneToOneField('Event', models.CASCADE, related_name='summarydocument', help_text='A foreign key integer value identifying an event')
+    data = JSONField(help_text='A JSON object containing the precomputed event summary data')
+
+    def __str__(self):
+        return str(self.event_id)
+
+    class Meta:
+        db_table = "whispers_eventsummarydocument"
+
+
 class EventEventGroup(AdminPermissionsHistoryModel):
     """
     Table to allow many-to-many relationship between Events and Super Events.
@@ -488,6 +801,7 @@ class EventAbstract(PermissionsHistoryModel):
     event = models.ForeignKey('Event', models.CASCADE, related_name='eventabstracts', help_text='A foreign key integer value identifying an event')
     text = models.TextField(blank=True, help_text='An alphanumeric value of information')
     lab_id = models.IntegerField(null=True, help_text='An integer value identifying a lab')
+    search_vector = SearchVectorField(null=True, editable=False, help_text='The full-text search vector of the text of this event abstract (maintained by the database)')
 
     @staticmethod
     def has_create_permission(request):
@@ -507,6 +821,7 @@ class EventAbstract(PermissionsHistoryModel):
     class Meta:
         db_table = "whispers_eventabstract"
         ordering = ['id']
+        indexes = [GinIndex(fields=['search_vector'], name='whispers_evtabs_search_idx')]
 
 
 class EventCase(PermissionsHistoryModel):
@@ -654,6 +969,9 @@ class EventLocation(PermissionsHistoryModel):
     flyways = models.ManyToManyField('Flyway', through='EventLocationFlyway', related_name='eventlocations')
     gnis_name = models.CharField(max_length=256, blank=True, default='', help_text='An alphanumeric value of the GNIS name of this event location')
     gnis_id = models.CharField(max_length=256, blank=True, db_index=True, default='')
+    map_latitude = models.DecimalField(max_digits=8, decimal_places=6, null=True, blank=True, help_text='A fixed-precision decimal number value indentifying the latitude at which this event location is mapped (its own latitude or its county centroid)')
+    map_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, help_text='A fixed-precision decimal number value indentifying the longitude at which this event location is mapped (its own longitude or its county centroid)')
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, default='', help_text='An alphanumeric value of the geohash of the map latitude and longitude of this event location')
     comments = GenericRelation('Comment', related_name='eventlocations')
 
     @staticmethod
@@ -668,8 +986,30 @@ class EventLocation(PermissionsHistoryModel):
         event_id = self.event.id
         return determine_object_update_permission(self, request, event_id)
 
+    # determine where this event location is mapped: its own coordinates, else the centroid of its county
+    # (or of its administrative level one), along with the geohash of that point, used to cluster and search maps
+    def set_map_point(self):
+        self.map_latitude = None
+        self.map_longitude = None
+        if self.latitude is not None and self.longitude is not None:
+            self.map_latitude = self.latitude
+            self.map_longitude = self.longitude
+        else:
+            for admin_level in [self.administrative_level_two, self.administrative_level_one]:
+                if (admin_level is not None and admin_level.centroid_latitude is not None
+                        and admin_level.centroid_longitude is not None):
+                    self.map_latitude = admin_level.centroid_latitude
+                    self.map_longitude = admin_level.centroid_longitude
+                    break
+        if self.map_latitude is not None:
+            self.geohash = encode_geohash(self.map_latitude, self.map_longitude)
+        else:
+            self.geohash = ''
+
     # override the save method to calculate the parent event's start_date and end_date and affected_count
+    # (and this event location's map point)
     def save(self, *args, **kwargs):
+        self.set_map_point()
         super(EventLocation, self).save(*args, **kwargs)
 
         event = Event.objects.filter(id=self.event.id).first()
@@ -714,7 +1054,8 @@ class EventLocation(PermissionsHistoryModel):
                 # positive_counts = [dx.get('positive_count') or 0 for dx in species_dx]
                 event.affected_count = sum(species_dx_positive_counts) if len(species_dx_positive_counts) == 0 else None
 
-        event.save()
+        with system_change(event):
+            event.save()
 
     def __str__(self):
         return self.name
@@ -722,6 +1063,8 @@ class EventLocation(PermissionsHistoryModel):
     class Meta:
         db_table = "whispers_eventlocation"
         ordering = ['event', 'priority']
+        # supports the bounding box (and radius and polygon) searches of event locations
+        indexes = [models.Index(fields=['map_latitude', 'map_longitude'], name='whispers_evtloc_map_point_idx')]
 
 
 class EventLocationContact(PermissionsHistoryModel):
@@ -777,6 +1120,8 @@ class AdministrativeLevelOne(AdminPermissionsHistoryNameModel):
 
     country = models.ForeignKey('Country', models.CASCADE, related_name='administrativelevelones', help_text='A foreign key integer value identifying the country to with this administrative level one belongs')
     abbreviation = models.CharField(max_length=128, blank=True, default='', help_text='An alphanumeric value of the usual abbreviation of this administrative level one')
+    centroid_latitude = models.DecimalField(max_digits=8, decimal_places=6, null=True, blank=True, help_text='A fixed-precision decimal number value indentifying the latitude for this administrative level one')
+    centroid_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, help_text='A fixed-precision decimal number value indentifying the longitude for this administrative level one')
 
     def __str__(self):
         return self.name
@@ -951,7 +1296,8 @@ class LocationSpecies(PermissionsHistoryModel):
                 # positive_counts = [dx.get('positive_count') or 0 for dx in species_dx]
                 event.affected_count = sum(species_dx_positive_counts) if len(species_dx_positive_counts) == 0 else None
 
-        event.save()
+        with system_change(event):
+            event.save()
 
     def __str__(self):
         return str(self.id)
@@ -988,6 +1334,11 @@ class Species(AdminPermissionsHistoryModel):
         db_table = "whispers_species"
         verbose_name_plural = "species"
         ordering = ['id']
+        # support the typeahead search of species (prefix and fuzzy matches)
+        indexes = [
+            GinIndex(fields=['name'], name='whispers_species_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['species_latin_name'], name='whispers_species_latin_trgm', opclasses=['gin_trgm_ops']),
+        ]
 
 
 class AgeBias(AdminPermissionsHistoryNameModel):
@@ -1219,14 +1570,16 @@ class SpeciesDiagnosis(PermissionsHistoryModel):
                 positive_counts = [dx or 0 for dx in species_dx_positive_counts]
                 event.affected_count = sum(positive_counts)
 
-        event.save()
+        with system_change(event):
+            event.save()
 
         # if any speciesdiagnosis is confirmed, then the eventdiagnosis with the same diagnosis is also confirmed
         if not self.suspect:
             matching_eventdiagnosis = EventDiagnosis.objects.filter(diagnosis=diagnosis.id, event=event.id).first()
             if matching_eventdiagnosis:
                 matching_eventdiagnosis.suspect = False if matching_eventdiagnosis else True
-                matching_eventdiagnosis.save()
+                with system_change(matching_eventdiagnosis):
+                    matching_eventdiagnosis.save()
 
         # conversely, if all speciesdiagnoses with the same diagnosis are un-confirmed (suspect set to True),
         # then the eventdiagnosis with the same diagnosis is also un-confirmed
@@ -1242,7 +1595,8 @@ class SpeciesDiagnosis(PermissionsHistoryModel):
                 matching_eventdiagnosis = EventDiagnosis.objects.filter(diagnosis=diagnosis.id, event=event.id).first()
                 if matching_eventdiagnosis:
                     matching_eventdiagnosis.suspect = True
-                    matching_eventdiagnosis.save()
+                    with system_change(matching_eventdiagnosis):
+                        matching_eventdiagnosis.save()
 
     # override the delete method to ensure that when all speciesdiagnoses with a particular diagnosis are deleted,
     # then eventdiagnosis of same diagnosis for this parent event needs to be deleted as well
@@ -1425,6 +1779,7 @@ class Comment(PermissionsHistoryModel):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, help_text='A foreign key integer value identifying the content type for this comment')
     object_id = models.PositiveIntegerField(help_text='A positive integer value identifying an object')
     content_object = GenericForeignKey()
+    search_vector = SearchVectorField(null=True, editable=False, help_text='The full-text search vector of the comment of this object (maintained by the database)')
 
     @staticmethod
     def has_create_permission(request):
@@ -1458,8 +1813,7 @@ class Comment(PermissionsHistoryModel):
                                 and (request.user.role.is_partneradmin or request.user.role.is_partnermanager))):
                         return True
                     else:
-                        write_collaborators = list(
-                            User.objects.filter(writeevents__in=[event.id]).values_list('id', flat=True))
+                        write_collaborators = get_event_write_collaborator_ids(event.id)
                         return request.user.id in write_collaborators
                 else:
                     return False
@@ -1479,6 +1833,7 @@ class Comment(PermissionsHistoryModel):
     class Meta:
         db_table = "whispers_comment"
         ordering = ['id']
+        indexes = [GinIndex(fields=['search_vector'], name='whispers_comment_search_idx')]
 
 
 class CommentType(AdminPermissionsHistoryNameModel):
@@ -1519,6 +1874,147 @@ class Artifact(PermissionsHistoryModel):  # TODO: implement file fields
         ordering = ['id']
 
 
+class OutboundEmail(models.Model):
+    """
+    Outbound Email: an email message queued by the request that sends it (see queue_email) and sent later by the
+    send_queued_email command, with retries, so that requests never wait on the mail server
+    (and without history, since it is not a record of the application)
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = ((STATUS_QUEUED, 'Queued'), (STATUS_SENT, 'Sent'), (STATUS_FAILED, 'Failed'))
+
+    subject = models.TextField(blank=True, default='', help_text='An alphanumeric value of the subject of this email')
+    body = models.TextField(blank=True, default='', help_text='An alphanumeric value of the plain text body of this email')
+    html_body = models.TextField(blank=True, default='', help_text='An alphanumeric value of the HTML body of this email (if any)')
+    from_address = models.CharField(max_length=254, help_text='An alphanumeric value of the from address of this email')
+    to = JSONField(default=list, help_text='A JSON array containing the to addresses of this email')
+    cc = JSONField(default=list, blank=True, help_text='A JSON array containing the cc addresses of this email')
+    bcc = JSONField(default=list, blank=True, help_text='A JSON array containing the bcc addresses of this email')
+    reply_to = JSONField(default=list, blank=True, help_text='A JSON array containing the reply to addresses of this email')
+    headers = JSONField(null=True, blank=True, help_text='A JSON object containing the extra headers of this email')
+    status = models.CharField(max_length=8, choices=STATUS_CHOICES, default=STATUS_QUEUED, help_text='An alphanumeric value of the status of this email (queued, sent, or failed)')
+    attempts = models.IntegerField(default=0, help_text='An integer value of the number of failed attempts to send this email')
+    last_error = models.TextField(blank=True, default='', help_text='An alphanumeric value of the error of the last failed attempt to send this email')
+    send_after = models.DateTimeField(default=timezone.now, help_text='A date and time value of when this email can be sent (later after each failed attempt)')
+    created_date = models.DateTimeField(default=timezone.now, blank=True, db_index=True, help_text='A date and time value of when this email was queued')
+    sent_date = models.DateTimeField(null=True, blank=True, help_text='A date and time value of when this email was sent')
+
+    def to_message(self, connection=None):
+        # rebuild the email message to send it
+        email = EmailMultiAlternatives(self.subject, self.body, self.from_address, self.to, self.bcc,
+                                       connection=connection, headers=self.headers, cc=self.cc, reply_to=self.reply_to)
+        if self.html_body:
+            email.attach_alternative(self.html_body, "text/html")
+        return email
+
+    def __str__(self):
+        return str(self.id)
+
+    class Meta:
+        db_table = "whispers_outboundemail"
+        ordering = ['id']
+        # support the worker's query of the queued emails that can be sent
+        indexes = [models.Index(fields=['status', 'send_after'], name='whispers_outemail_queue_idx')]
+
+
+def queue_email(email):
+    # persist an email message (an EmailMessage or EmailMultiAlternatives) to be sent by the send_queued_email command
+    # (queued in the transaction of the request, so an email is only sent if the changes it describes are saved)
+    html_body = ''
+    for content, mimetype in getattr(email, 'alternatives', []):
+        if mimetype == 'text/html':
+            html_body = content
+    return OutboundEmail.objects.create(
+        subject=email.subject, body=email.body, html_body=html_body, from_address=email.from_email,
+        to=list(email.to), cc=list(email.cc), bcc=list(email.bcc), reply_to=list(email.reply_to),
+        headers=email.extra_headers or None)
+
+
+class EventChange(models.Model):
+    """
+    Event Change: an event that has changed since the last notification digest, and a user who changed it
+    (recorded by the event tree signals, see record_event_change, and coalesced into digests by the send_notifications
+    command, with the ID of the event rather than a foreign key, so that deleting an event never waits on or fails
+    for the changes recorded by the deletes of its children; the changes of deleted events are dropped by the digest)
+    """
+
+    event_id = models.IntegerField(help_text='An integer value identifying the changed event')
+    changed_by = models.ForeignKey('User', models.CASCADE, null=True, related_name='eventchanges', help_text='A foreign key integer value identifying a user who changed the event')
+    changed_date = models.DateTimeField(default=timezone.now, help_text='A date and time value of the last change to the event by the user since the last digest')
+
+    def __str__(self):
+        return str(self.id)
+
+    class Meta:
+        db_table = "whispers_eventchange"
+        # one change per event and user, and one per event for changes without a user
+        # (a unique constraint on both fields would not apply to the latter, since nulls are never equal)
+        constraints = [
+            models.UniqueConstraint(fields=['event_id', 'changed_by'], condition=models.Q(changed_by__isnull=False),
+                                    name='whispers_eventchange_user_uniq'),
+            models.UniqueConstraint(fields=['event_id'], condition=models.Q(changed_by__isnull=True),
+                                    name='whispers_eventchange_nouser_uniq'),
+        ]
+
+
+def record_event_change(event_id, changed_by_id=None):
+    # record that a user changed an event, once per event and user until the next digest
+    # (once the transaction of the change commits, so that changes that are rolled back are never notified,
+    # and only once per transaction, however many parts of the event it writes)
+    if settings.EVENT_CHANGE_NOTIFICATIONS:
+        on_commit_once(('event_change', event_id, changed_by_id), lambda: write_event_change(event_id, changed_by_id))
+
+
+def write_event_change(event_id, changed_by_id):
+    # the change is upserted, so that a change to a row already locked by a digest waits for the digest to delete it,
+    # then is inserted again for the next digest, rather than being ignored as a duplicate and deleted with the row
+    conflict = ('(event_id, changed_by_id) WHERE changed_by_id IS NOT NULL' if changed_by_id is not None
+                else '(event_id) WHERE changed_by_id IS NULL')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO " + EventChange._meta.db_table + " (event_id, changed_by_id, changed_date) "
+            "VALUES (%s, %s, %s) ON CONFLICT " + conflict + " DO UPDATE SET changed_date = EXCLUDED.changed_date",
+            [event_id, changed_by_id, timezone.now()])
+
+
+def get_event_notification_recipients(event_ids):
+    # the users to notify of changes to events: the creators, the collaborators, and the members of the circles
+    # the events are shared with (as a dict of sets of user IDs, by event ID)
+    recipients = {event_id: set() for event_id in event_ids}
+    for event_id, user_id in Event.objects.filter(id__in=event_ids).values_list('id', 'created_by'):
+        recipients[event_id].add(user_id)
+    for model in [EventReadUser, EventWriteUser, EventCircleUser]:
+        for event_id, user_id in model.objects.filter(event__in=event_ids).values_list('event', 'user'):
+            recipients[event_id].add(user_id)
+    return recipients
+
+
+class Notification(models.Model):
+    """
+    Notification: a digest of the changes made by other users to the events a user created or collaborates on
+    (created by the send_notifications command, and also emailed when NOTIFICATION_DIGEST_EMAIL is enabled)
+    """
+
+    recipient = models.ForeignKey('User', models.CASCADE, related_name='notifications', help_text='A foreign key integer value identifying the user this notification is for')
+    subject = models.CharField(max_length=128, blank=True, default='', help_text='An alphanumeric value of the subject of this notification')
+    message = models.TextField(blank=True, default='', help_text='An alphanumeric value of the message of this notification')
+    events = JSONField(default=list, help_text='A JSON array containing the IDs of the changed events')
+    read = models.BooleanField(default=False, help_text='A boolean value indicating if the user has read this notification')
+    created_date = models.DateTimeField(default=timezone.now, blank=True, help_text='A date and time value of when this notification was created')
+
+    def __str__(self):
+        return str(self.id)
+
+    class Meta:
+        db_table = "whispers_notification"
+        # newest first
+        ordering = ['-id']
+        indexes = [models.Index(fields=['recipient', 'read'], name='whispers_notification_idx')]
+
+
 ######
 #
 #  Users
@@ -1588,7 +2084,7 @@ class User(AbstractUser):
     active_key = models.TextField(blank=True, default='', help_text='An alphanumeric value of the active key for this user')
     user_status = models.CharField(max_length=128, blank=True, default='', help_text='An alphanumeric value of the status for this user')
 
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords()
 
     def __str__(self):
         return self.username
@@ -1639,7 +2135,7 @@ class Role(AdminPermissionsHistoryNameModel):
         ordering = ['id']
 
 
-class EventReadUser(PermissionsHistoryModel):
+class EventReadUser(EventSharePermissionsHistoryModel):
     """
     Table to allow many-to-many relationship between Events and Read-Only Users.
     """
@@ -1647,34 +2143,6 @@ class EventReadUser(PermissionsHistoryModel):
     event = models.ForeignKey('Event', models.CASCADE, related_name='eventreadusers')
     user = models.ForeignKey('User', models.CASCADE, related_name='eventreadusers')
 
-    @staticmethod
-    def has_create_permission(request):
-        event = Event.objects.get(pk=int(request.data['event']))
-        # only admins or the event creator or a manager/admin member of the creator's org can create
-        if (not request or not request.user or not request.user.is_authenticated
-                or request.user.role.is_public or request.user.role.is_affiliate):
-            return False
-        elif request.user.role.is_superadmin or request.user.role.is_admin:
-            return True
-        else:
-            if (request.user.id == event.created_by.id
-                    or (request.user.organization.id == event.created_by.organization.id
-                        and (request.user.role.is_partneradmin or request.user.role.is_partnermanager))):
-                return True
-            else:
-                return False
-
-    def has_object_update_permission(self, request):
-        # Only admins or the creator or a manager/admin member of the creator's org can update
-        if not request or not request.user or not request.user.is_authenticated or request.user.role.is_public:
-            return False
-        elif (request.user.role.is_superadmin or request.user.role.is_admin or request.user.id == self.created_by.id
-              or (request.user.organization.id == self.created_by.organization.id
-                  and (request.user.role.is_partneradmin or request.user.role.is_partnermanager))):
-            return True
-        else:
-            return False
-
     def __str__(self):
         return str(self.id)
 
@@ -1683,7 +2151,7 @@ class EventReadUser(PermissionsHistoryModel):
         ordering = ['id']
 
 
-class EventWriteUser(PermissionsHistoryModel):
+class EventWriteUser(EventSharePermissionsHistoryModel):
     """
     Table to allow many-to-many relationship between Events and Read+Write Users.
     """
@@ -1691,34 +2159,6 @@ class EventWriteUser(PermissionsHistoryModel):
     event = models.ForeignKey('Event', models.CASCADE, related_name='eventwriteusers')
     user = models.ForeignKey('User', models.CASCADE, related_name='eventwriteusers')
 
-    @staticmethod
-    def has_create_permission(request):
-        event = Event.objects.get(pk=int(request.data['event']))
-        # only admins or the event creator or a manager/admin member of the creator's org can create
-        if (not request or not request.user or not request.user.is_authenticated
-                or request.user.role.is_public or request.user.role.is_affiliate):
-            return False
-        elif request.user.role.is_superadmin or request.user.role.is_admin:
-            return True
-        else:
-            if (request.user.id == event.created_by.id
-                    or (request.user.organization.id == event.created_by.organization.id
-                        and (request.user.role.is_partneradmin or request.user.role.is_partnermanager))):
-                return True
-            else:
-                return False
-
-    def has_object_update_permission(self, request):
-        # Only admins or the creator or a manager/admin member of the creator's org can update
-        if not request or not request.user or not request.user.is_authenticated or request.user.role.is_public:
-            return False
-        elif (request.user.role.is_superadmin or request.user.role.is_admin or request.user.id == self.created_by.id
-              or (request.user.organization.id == self.created_by.organization.id
-                  and (request.user.role.is_partneradmin or request.user.role.is_partnermanager))):
-            return True
-        else:
-            return False
-
     def __str__(self):
         return str(self.id)
 
@@ -1791,6 +2231,95 @@ class CircleUser(PermissionsHistoryModel):
         ordering = ['id']
 
 
+class EventReadCircle(EventSharePermissionsHistoryModel):
+    """
+    Table to allow many-to-many relationship between Events and Read-Only Circles.
+    """
+
+    event = models.ForeignKey('Event', models.CASCADE, related_name='eventreadcircles')
+    circle = models.ForeignKey('Circle', models.CASCADE, related_name='eventreadcircles')
+
+    def __str__(self):
+        return str(self.id)
+
+    class Meta:
+        db_table = "whispers_eventreadcircle"
+        ordering = ['id']
+
+
+class EventWriteCircle(EventSharePermissionsHistoryModel):
+    """
+    Table to allow many-to-many relationship between Events and Read+Write Circles.
+    """
+
+    event = models.ForeignKey('Event', models.CASCADE, related_name='eventwritecircles')
+    circle = models.ForeignKey('Circle', models.CASCADE, related_name='eventwritecircles')
+
+    def __str__(self):
+        return str(self.id)
+
+    class Meta:
+        db_table = "whispers_eventwritecircle"
+        ordering = ['id']
+
+
+class EventCircleUser(models.Model):
+    """
+    Event Circle User: the members of the circles an event is shared with, precomputed from the circle memberships
+    (see expand_event_circles), so that circle access is checked with one indexed join (and without history,
+    since it is derived entirely from EventReadCircle, EventWriteCircle, and CircleUser)
+    """
+
+    event = models.ForeignKey('Event', models.CASCADE, related_name='eventcircleusers', help_text='A foreign key integer value identifying an event')
+    user = models.ForeignKey('User', models.CASCADE, related_name='eventcircleusers', help_text='A foreign key integer value identifying a member of a circle the event is shared with')
+    write = models.BooleanField(default=False, help_text='A boolean value indicating if the user can write the event (through any circle) or only read it')
+
+    def __str__(self):
+        return str(self.id)
+
+    class Meta:
+        db_table = "whispers_eventcircleuser"
+        unique_together = ('event', 'user')
+        indexes = [models.Index(fields=['user', 'event'], name='whispers_evtcircleuser_idx')]
+
+
+def expand_event_circles(event_ids, user_ids=None):
+    # replace the precomputed circle members of events (optionally only of some users) in bulk:
+    # members of any circle an event is shared with for writing can write it, other members can only read it
+    event_ids = list(Event.objects.filter(id__in=set(event_ids)).values_list('id', flat=True))
+    if not event_ids:
+        return
+    write_members = CircleUser.objects.filter(circle__eventwritecircles__event__in=event_ids)
+    read_members = CircleUser.objects.filter(circle__eventreadcircles__event__in=event_ids)
+    old_members = EventCircleUser.objects.filter(event__in=event_ids)
+    if user_ids is not None:
+        write_members = write_members.filter(user__in=user_ids)
+        read_members = read_members.filter(user__in=user_ids)
+        old_members = old_members.filter(user__in=user_ids)
+    write_pairs = set(write_members.values_list('circle__eventwritecircles__event', 'user'))
+    read_pairs = set(read_members.values_list('circle__eventreadcircles__event', 'user')) - write_pairs
+
+    with transaction.atomic():
+        old_members.delete()
+        EventCircleUser.objects.bulk_create(
+            [EventCircleUser(event_id=event_id, user_id=user_id, write=True) for event_id, user_id in write_pairs]
+            + [EventCircleUser(event_id=event_id, user_id=user_id, write=False) for event_id, user_id in read_pairs])
+
+    # the events visible to the members have changed, and so have the details of each of those events
+    # (whose conditionally retrieved versions must not be reused)
+    bump_event_data_version()
+    for event_id in event_ids:
+        bump_event_version(event_id)
+
+
+def expand_circle(circle_id, user_ids=None):
+    # replace the precomputed members of a circle (optionally only some users) in all the events shared with it
+    event_ids = Event.objects.filter(
+        models.Q(eventreadcircles__circle=circle_id) | models.Q(eventwritecircles__circle=circle_id)
+    ).values_list('id', flat=True).distinct()
+    expand_event_circles(event_ids, user_ids)
+
+
 class Organization(AdminPermissionsHistoryNameModel):
     """
     Organization
@@ -1819,6 +2348,72 @@ class Organization(AdminPermissionsHistoryNameModel):
     class Meta:
         db_table = "whispers_organization"
         ordering = ['id']
+        # support the typeahead search of organizations (prefix and fuzzy matches)
+        indexes = [GinIndex(fields=['name'], name='whispers_org_name_trgm', opclasses=['gin_trgm_ops'])]
+
+
+class OrganizationAncestor(models.Model):
+    """
+    Organization Ancestor: the closure of the organization hierarchy, linking every organization to itself and to each
+    of its ancestors (parent, grandparent, etc.), so that an organization and all its sub-organizations are found
+    with one indexed join (kept current by the signals below, and without history, since it is derived entirely
+    from Organization.parent_organization)
+    """
+
+    organization = models.ForeignKey('Organization', models.CASCADE, related_name='organizationancestors', help_text='A foreign key integer value identifying an organization')
+    ancestor = models.ForeignKey('Organization', models.CASCADE, related_name='organizationdescendants', help_text='A foreign key integer value identifying the organization itself or one of its ancestors')
+    depth = models.IntegerField(default=0, help_text='An integer value of the number of levels between the organization and the ancestor (zero for the organization itself)')
+
+    def __str__(self):
+        return str(self.id)
+
+    class Meta:
+        db_table = "whispers_organizationancestor"
+        unique_together = ('organization', 'ancestor')
+        indexes = [models.Index(fields=['ancestor', 'organization'], name='whispers_organcestor_idx')]
+
+
+def update_organization_ancestors(organization):
+    # relink an organization and its sub-organizations to the ancestors of its (new) parent organization
+    subtree = list(OrganizationAncestor.objects.filter(ancestor=organization.id).values_list('organization', 'depth'))
+    new_links = []
+    if not subtree:
+        subtree = [(organization.id, 0)]
+        new_links.append(OrganizationAncestor(organization_id=organization.id, ancestor_id=organization.id, depth=0))
+    subtree_ids = [org_id for org_id, depth in subtree]
+    # (a parent organization within the subtree would be a cycle, so the subtree is never linked below itself)
+    parent_links = []
+    parent_id = organization.parent_organization_id
+    if parent_id is not None and parent_id not in subtree_ids:
+        parent_links = list(OrganizationAncestor.objects.filter(organization=parent_id).values_list('ancestor', 'depth'))
+    new_links.extend(
+        OrganizationAncestor(organization_id=org_id, ancestor_id=ancestor_id, depth=parent_depth + 1 + depth)
+        for ancestor_id, parent_depth in parent_links for org_id, depth in subtree)
+
+    with transaction.atomic():
+        OrganizationAncestor.objects.filter(organization__in=subtree_ids).exclude(ancestor__in=subtree_ids).delete()
+        OrganizationAncestor.objects.bulk_create(new_links)
+
+    # the organizations whose records are visible to the members of each organization have changed, and so have the
+    # details of the events created by the members of the moved organizations, which are now shown to the members of
+    # other ancestor organizations (and whose conditionally retrieved versions must not be reused)
+    bump_event_data_version()
+    for event_id in Event.objects.filter(created_by__organization__in=subtree_ids).values_list('id', flat=True):
+        bump_event_version(event_id)
+
+
+def get_sub_organizations(organization_id):
+    # the IDs of an organization and all its sub-organizations, as a subquery
+    # (filtering on this, rather than joining the closure table in the outer query, matches each record only once)
+    return OrganizationAncestor.objects.filter(ancestor=organization_id).values('organization')
+
+
+def get_user_organization_ids(user):
+    # the IDs of the user's organization and all its sub-organizations, loaded once per user object (i.e., per request)
+    if not hasattr(user, '_organization_ids'):
+        user._organization_ids = set(get_sub_organizations(user.organization_id).values_list(
+            'organization', flat=True)) | {user.organization_id}
+    return user._organization_ids
 
 
 class Contact(PermissionsHistoryModel):
@@ -1865,6 +2460,12 @@ class Contact(PermissionsHistoryModel):
     class Meta:
         db_table = "whispers_contact"
         ordering = ['id']
+        # support the typeahead search of contacts (prefix and fuzzy matches)
+        indexes = [
+            GinIndex(fields=['first_name'], name='whispers_contact_first_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['last_name'], name='whispers_contact_last_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['email'], name='whispers_contact_email_trgm', opclasses=['gin_trgm_ops']),
+        ]
 
 
 class ContactType(AdminPermissionsHistoryModel):
@@ -1961,3 +2562,176 @@ class FlatEventDetails(models.Model):
     class Meta:
         db_table = "flat_event_details"
         managed = False
+
+
+######
+#
+#  Signals
+#
+######
+
+
+# models whose writes can change the results of event queries (e.g., event summaries and counts),
+# and the path from each to the ID of its event
+EVENT_TREE_MODELS = {
+    Event: 'id',
+    EventEventGroup: 'event_id',
+    EventOrganization: 'event_id',
+    EventContact: 'event_id',
+    EventLocation: 'event_id',
+    EventLocationContact: 'event_location.event_id',
+    EventLocationFlyway: 'event_location.event_id',
+    LocationSpecies: 'event_location.event_id',
+    EventDiagnosis: 'event_id',
+    SpeciesDiagnosis: 'location_species.event_location.event_id',
+    SpeciesDiagnosisOrganization: 'species_diagnosis.location_species.event_location.event_id',
+    EventReadUser: 'event_id',
+    EventWriteUser: 'event_id',
+    EventReadCircle: 'event_id',
+    EventWriteCircle: 'event_id',
+}
+
+# models that are only shown in the details of an event, and the path from each to its event (or its event's ID)
+EVENT_DETAIL_MODELS = {
+    ServiceRequest: 'event_id',
+    Comment: 'content_object',
+}
+
+# lookup models whose values are copied into event summary documents, and the paths from an event to each
+# (a user is only such a lookup when the username changes, see user_saving)
+EVENT_SUMMARY_LOOKUP_MODELS = {
+    Organization: ['organizations'],
+    Species: ['eventlocations__locationspecies__species'],
+    Diagnosis: ['eventdiagnoses__diagnosis'],
+    DiagnosisType: ['eventdiagnoses__diagnosis__diagnosis_type'],
+    Country: ['eventlocations__administrative_level_two__administrative_level_one__country'],
+    AdministrativeLevelOne: ['eventlocations__administrative_level_one',
+                             'eventlocations__administrative_level_two__administrative_level_one'],
+    AdministrativeLevelTwo: ['eventlocations__administrative_level_two'],
+    Flyway: ['eventlocations__flyways'],
+    User: ['eventdiagnoses__created_by', 'eventdiagnoses__modified_by'],
+}
+
+# lookup models whose values are only shown in the details of an event (or in the reference data bundle)
+EVENT_DETAIL_LOOKUP_MODELS = [
+    EventType, EventStatus, Staff, LegalStatus, EventGroup, Contact, ContactType, LandOwnership, AgeBias, SexBias,
+    DiagnosisBasis, DiagnosisCause, ServiceRequestType, ServiceRequestResponse, CommentType,
+    AdministrativeLevelLocality,
+]
+
+
+def get_event_id(instance):
+    # follow the path from an object in an event tree up to the ID of its event
+    path = EVENT_TREE_MODELS.get(instance.__class__) or EVENT_DETAIL_MODELS.get(instance.__class__)
+    if path is None:
+        return None
+    value = instance
+    try:
+        for attr in path.split('.'):
+            value = getattr(value, attr)
+    except ObjectDoesNotExist:
+        # a parent in the path was deleted (so the whole event tree is being deleted)
+        return None
+    # a path may end at another object in an event tree (e.g., a comment on an event location)
+    return get_event_id(value) if isinstance(value, models.Model) else value
+
+
+def event_tree_changed(sender, instance, **kwargs):
+    event_changed(get_event_id(instance), getattr(instance, 'modified_by_id', None))
+
+
+def event_changed(event_id, changed_by_id=None):
+    bump_event_data_version()
+    if event_id is not None:
+        bump_event_version(event_id)
+        # rebuild the stored summary document of the event once the change is committed
+        # (once per transaction, however many parts of the event it writes)
+        on_commit_once(('event_summary_document', event_id), lambda: rebuild_event_summary_documents([event_id]))
+        # notify the creator and the collaborators of the event in the next digest
+        record_event_change(event_id, changed_by_id)
+
+
+def event_detail_changed(sender, instance, **kwargs):
+    event_id = get_event_id(instance)
+    if event_id is not None:
+        bump_event_version(event_id)
+
+
+def event_circle_changed(sender, instance, **kwargs):
+    # expand the circle members of the event once the change is committed, once however many of its shares it writes
+    # (when the whole event is being deleted, the expansion then finds that the event no longer exists)
+    event_id = instance.event_id
+    on_commit_once(('expand_event_circles', event_id), lambda: expand_event_circles([event_id]))
+
+
+def organization_saved(sender, instance, created, **kwargs):
+    # only relink the hierarchy when an organization is new or has moved to another parent organization
+    # (deleted organizations lose their links, and their sub-organizations, through the cascading foreign keys)
+    parent_id = OrganizationAncestor.objects.filter(
+        organization=instance.id, depth=1).values_list('ancestor', flat=True).first()
+    if created or parent_id != instance.parent_organization_id:
+        update_organization_ancestors(instance)
+
+
+def rebuild_event_summary_documents(event_ids):
+    # the summary documents are built by the serializers (which import this module, so they are imported here)
+    from whispersservices.serializers import update_event_summary_documents
+    update_event_summary_documents(event_ids)
+
+
+def event_summary_lookup_changed(sender, instance, **kwargs):
+    if sender is User and not getattr(instance, '_username_changed', False):
+        return
+    bump_event_data_version()
+    bump_event_lookup_version()
+    # rebuild the summary documents of the events the lookup is copied into
+    # (before a lookup is deleted, while the events still refer to it)
+    lookup_filter = models.Q()
+    for path in EVENT_SUMMARY_LOOKUP_MODELS[sender]:
+        lookup_filter |= models.Q(**{path: instance.pk})
+    event_ids = list(Event.objects.filter(lookup_filter).values_list('id', flat=True).distinct())
+    if event_ids:
+        transaction.on_commit(lambda: rebuild_event_summary_documents(event_ids))
+
+
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    # note whether the username of a user is changing, since it is copied into event summary documents,
+    # but users are saved much more often (e.g., on every login, which only updates the last login)
+    instance._username_changed = (
+        instance.pk is not None and (update_fields is None or 'username' in update_fields)
+        and User.objects.filter(id=instance.pk).exclude(username=instance.username).exists())
+
+
+def event_detail_lookup_changed(sender, **kwargs):
+    bump_event_lookup_version()
+
+
+for event_tree_model in EVENT_TREE_MODELS:
+    post_save.connect(event_tree_changed, sender=event_tree_model, dispatch_uid='event_tree_saved_' + event_tree_model.__name__)
+    post_delete.connect(event_tree_changed, sender=event_tree_model, dispatch_uid='event_tree_deleted_' + event_tree_model.__name__)
+
+for event_detail_model in EVENT_DETAIL_MODELS:
+    post_save.connect(event_detail_changed, sender=event_detail_model, dispatch_uid='event_detail_saved_' + event_detail_model.__name__)
+    post_delete.connect(event_detail_changed, sender=event_detail_model, dispatch_uid='event_detail_deleted_' + event_detail_model.__name__)
+
+for event_circle_model in [EventReadCircle, EventWriteCircle]:
+    post_save.connect(event_circle_changed, sender=event_circle_model,
+                      dispatch_uid='event_circle_saved_' + event_circle_model.__name__)
+    post_delete.connect(event_circle_changed, sender=event_circle_model,
+                        dispatch_uid='event_circle_deleted_' + event_circle_model.__name__)
+
+post_save.connect(organization_saved, sender=Organization, dispatch_uid='organization_saved')
+
+for event_summary_lookup_model in EVENT_SUMMARY_LOOKUP_MODELS:
+    post_save.connect(event_summary_lookup_changed, sender=event_summary_lookup_model,
+                      dispatch_uid='event_summary_lookup_saved_' + event_summary_lookup_model.__name__)
+    pre_delete.connect(event_summary_lookup_changed, sender=event_summary_lookup_model,
+                       dispatch_uid='event_summary_lookup_deleted_' + event_summary_lookup_model.__name__)
+
+pre_save.connect(user_saving, sender=User, dispatch_uid='user_saving')
+
+for event_detail_lookup_model in EVENT_DETAIL_LOOKUP_MODELS:
+    post_save.connect(event_detail_lookup_changed, sender=event_detail_lookup_model,
+                      dispatch_uid='event_detail_lookup_saved_' + event_detail_lookup_model.__name__)
+    post_delete.connect(event_detail_lookup_changed, sender=event_detail_lookup_model,
+                        dispatch_uid='event_detail_lookup_deleted_' + event_detail_lookup_model.__name__)
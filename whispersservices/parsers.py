@@ -0,0 +1,30 @@
+import io
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+# orjson is optional: without it, the fast parser parses exactly as the default JSON parser
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONParser(JSONParser):
+    """
+    Parses UTF-8 JSON with orjson (when it is installed), and anything orjson rejects again with the default JSON
+    parser, so that invalid JSON (and JSON orjson does not support, e.g., numbers beyond the range of a double)
+    gets the same result or error as before
+    NOTE: orjson parses integers beyond 64 bits as floats
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super(FastJSONParser, self).parse(stream, media_type, parser_context)
+
+        data = stream.read()
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return super(FastJSONParser, self).parse(io.BytesIO(data), media_type, parser_context)
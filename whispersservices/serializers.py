@@ -3,12 +3,15 @@ import requests
 import json
 from operator import itemgetter
 from datetime import datetime, timedelta
+from decimal import Decimal
 from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.db import IntegrityError, transaction
 from django.db.models import F, Q, Sum
 from django.db.models.functions import Coalesce
 from django.forms.models import model_to_dict
 from rest_framework import serializers, validators
 from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
 from whispersservices.models import *
 from dry_rest_permissions.generics import DRYPermissionsField
 
@@ -61,11 +64,11 @@ def determine_permission_source(user, obj):
         permission_source = ''
     elif user.id == obj.created_by.id:
         permission_source = 'user'
-    elif user.organization.id == obj.created_by.organization.id:
+    elif obj.created_by.organization_id in get_user_organization_ids(user):
         permission_source = 'organization'
     elif ContentType.objects.get_for_model(obj, for_concrete_model=True).model == 'event':
-        write_collaborators = list(User.objects.filter(writeevents__in=[obj.id]).values_list('id', flat=True))
-        read_collaborators = list(User.objects.filter(readevents__in=[obj.id]).values_list('id', flat=True))
+        write_collaborators = get_event_write_collaborator_ids(obj.id)
+        read_collaborators = get_event_read_collaborator_ids(obj.id)
         if user.id in write_collaborators:
             permission_source = 'write_collaborators'
         elif user.id in read_collaborators:
@@ -77,6 +80,39 @@ def determine_permission_source(user, obj):
     return permission_source
 
 
+def get_shareable_circles(user, event=None):
+    # the circles a user can share an event with: any circle for admins, otherwise only the circles the user created
+    # (and the circles the event is already shared with, so that replacing the list does not drop another user's circle)
+    circles = Circle.objects.all()
+    if not (user.role.is_superadmin or user.role.is_admin):
+        shareable = Q(created_by=user.id)
+        if event is not None:
+            shareable |= (Q(id__in=EventReadCircle.objects.filter(event=event.id).values('circle'))
+                          | Q(id__in=EventWriteCircle.objects.filter(event=event.id).values('circle')))
+        circles = circles.filter(shareable)
+    return circles
+
+
+def set_event_circles(event, read_circles, write_circles, user, partial=False):
+    # replace the circles an event is shared with, in bulk (silently ignoring unknown IDs and the circles the user
+    # cannot share with), and return whether any circle share was added or removed;
+    # a circle in both lists is only shared for writing, and a partial update leaves an empty list unchanged
+    write_circle_ids = set(write_circles) if write_circles else set([])
+    read_circle_ids = (set(read_circles) if read_circles else set([])) - write_circle_ids
+    circles_changed = False
+    if not partial or read_circles:
+        read_circle_ids = get_shareable_circles(user, event).filter(
+            id__in=read_circle_ids).values_list('id', flat=True)
+        circles_changed |= any(set_relates(EventReadCircle, 'event', event, 'circle', read_circle_ids, user))
+    if not partial or write_circles:
+        write_circle_ids = get_shareable_circles(user, event).filter(
+            id__in=write_circle_ids).values_list('id', flat=True)
+        circles_changed |= any(set_relates(EventWriteCircle, 'event', event, 'circle', write_circle_ids, user))
+    if circles_changed:
+        expand_event_circles([event.id])
+    return circles_changed
+
+
 def construct_service_request_email(event_id, requester_org_name, request_type_name, requester_email, comments):
     # construct and send the request email
     event_id_string = str(event_id)
@@ -103,11 +139,7 @@ def construct_service_request_email(event_id, requester_org_name, request_type_n
     email = EmailMultiAlternatives(subject, body, from_address, to_list, bcc_list, reply_to=reply_list, headers=headers)
     email.attach_alternative(html_body, "text/html")
     if settings.ENVIRONMENT in ['production', 'test']:
-        try:
-            email.send(fail_silently=False)
-        except TypeError:
-            message = "Service Request saved but send email failed, please contact the administrator."
-            raise serializers.ValidationError(jsonify_errors(message))
+        queue_email(email)
     return email
 
 
@@ -123,11 +155,7 @@ def construct_user_request_email(requester_email, message):
     headers = None  # {'Message-ID': 'foo'}
     email = EmailMessage(subject, body, from_address, to_list, bcc_list, reply_to=reply_list, headers=headers)
     if settings.ENVIRONMENT in ['production', 'test']:
-        try:
-            email.send(fail_silently=False)
-        except TypeError:
-            message = "User saved but send email failed, please contact the administrator."
-            raise serializers.ValidationError(jsonify_errors(message))
+        queue_email(email)
     return email
 
 
@@ -142,11 +170,7 @@ def construct_email(subject, message):
     headers = None
     email = EmailMessage(subject, body, from_address, to_list, bcc_list, reply_to=reply_list, headers=headers)
     if settings.ENVIRONMENT in ['production', 'test']:
-        try:
-            email.send(fail_silently=False)
-        except TypeError:
-            message = "Send email failed, please contact the administrator."
-            raise serializers.ValidationError(jsonify_errors(message))
+        queue_email(email)
     return email
 
 
@@ -194,7 +218,8 @@ def calculate_priority_event_organization(instance):
             instance.priority = priority
         else:
             evt_org.priority = priority
-            evt_org.save()
+            with system_change(evt_org):
+                evt_org.save()
         priority += 1
 
     return instance.priority
@@ -221,7 +246,8 @@ def calculate_priority_event_diagnosis(instance):
             priority += 1
             self_priority_updated = True
         evtdiag.priority = priority
-        evtdiag.save()
+        with system_change(evtdiag):
+            evtdiag.save()
         priority += 1
 
     return instance.priority if self_priority_updated else priority
@@ -287,7 +313,8 @@ def calculate_priority_event_location(instance):
                         priority += 1
                         self_priority_updated = True
             evtloc.priority = priority
-            evtloc.save()
+            with system_change(evtloc):
+                evtloc.save()
             priority += 1
 
     return instance.priority if self_priority_updated else priority
@@ -339,7 +366,8 @@ def calculate_priority_location_species(instance):
                         priority += 1
                         self_priority_updated = True
             locspec.priority = priority
-            locspec.save()
+            with system_change(locspec):
+                locspec.save()
             priority += 1
 
     return instance.priority if self_priority_updated else priority
@@ -394,7 +422,8 @@ def calculate_priority_species_diagnosis(instance):
                     priority += 1
                     self_priority_updated = True
         specdiag.priority = priority
-        specdiag.save()
+        with system_change(specdiag):
+            specdiag.save()
         priority += 1
 
     return instance.priority if self_priority_updated else priority
@@ -419,6 +448,17 @@ class CommentSerializer(serializers.ModelSerializer):
     created_by_organization_string = serializers.StringRelatedField(source='created_by.organization.name')
     content_type_string = serializers.SerializerMethodField()
     new_content_type = serializers.CharField(write_only=True, required=False)
+    search_rank = serializers.FloatField(read_only=True)
+    search_snippet = serializers.CharField(read_only=True)
+
+    # the search rank and snippet are only present for full-text searches (with the search param)
+    def get_fields(self):
+        fields = super(CommentSerializer, self).get_fields()
+        request = self.context.get('request', None)
+        if not request or 'search' not in request.query_params:
+            fields.pop('search_rank')
+            fields.pop('search_snippet')
+        return fields
 
     def validate(self, data):
         if not self.instance:
@@ -458,7 +498,7 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'comment', 'comment_type', 'object_id', 'content_type_string', 'new_content_type',
                   'created_date', 'created_by', 'created_by_string', 'created_by_first_name', 'created_by_last_name',
                   'created_by_organization', 'created_by_organization_string',
-                  'modified_date', 'modified_by', 'modified_by_string',)
+                  'modified_date', 'modified_by', 'modified_by_string', 'search_rank', 'search_snippet',)
         extra_kwargs = {'object_id': {'required': False}}
 
 
@@ -522,6 +562,8 @@ class EventSerializer(serializers.ModelSerializer):
     new_service_request = serializers.JSONField(write_only=True, required=False)
     new_read_collaborators = serializers.ListField(write_only=True, required=False)
     new_write_collaborators = serializers.ListField(write_only=True, required=False)
+    new_read_circles = serializers.ListField(write_only=True, required=False)
+    new_write_circles = serializers.ListField(write_only=True, required=False)
     service_request_email = serializers.JSONField(read_only=True)
 
     def get_permission_source(self, obj):
@@ -910,6 +952,10 @@ class EventSerializer(serializers.ModelSerializer):
         else:
             new_write_user_ids = set([])
 
+        # pull out circle ID lists from the request
+        new_read_circles = validated_data.pop('new_read_circles', None)
+        new_write_circles = validated_data.pop('new_write_circles', None)
+
         # remove users from the read list if they are also in the write list (these lists are already unique sets)
         new_read_user_ids = new_read_user_ids_prelim - new_write_user_ids
 
@@ -945,18 +991,15 @@ class EventSerializer(serializers.ModelSerializer):
 
         user = get_user(self.context, self.initial_data)
 
-        # create the child collaborators for this event
-        if new_read_user_ids is not None:
-            for read_user_id in new_read_user_ids:
-                read_user = User.objects.filter(id=read_user_id).first()
-                if read_user is not None:
-                    EventReadUser.objects.create(user=read_user, event=event, created_by=user, modified_by=user)
+        # create the child collaborators and circle shares for this event, in bulk (silently ignoring unknown IDs)
+        new_read_user_ids = User.objects.filter(id__in=new_read_user_ids).values_list('id', flat=True)
+        set_relates(EventReadUser, 'event', event, 'user', new_read_user_ids, user)
+        new_write_user_ids = User.objects.filter(id__in=new_write_user_ids).values_list('id', flat=True)
+        set_relates(EventWriteUser, 'event', event, 'user', new_write_user_ids, user)
+        set_event_circles(event, new_read_circles, new_write_circles, user)
 
-        if new_write_user_ids is not None:
-            for write_user_id in new_write_user_ids:
-                write_user = User.objects.filter(id=write_user_id).first()
-                if write_user is not None:
-                    EventWriteUser.objects.create(user=write_user, event=event, created_by=user, modified_by=user)
+        # bulk writes skip the model signals, so update the event caches here
+        event_changed(event.id, user.id if user else None)
 
         # create the child organizations for this event
         if new_organizations is not None:
@@ -1228,45 +1271,30 @@ class EventSerializer(serializers.ModelSerializer):
         else:
             new_write_user_ids = []
 
+        # pull out circle ID lists from the request
+        new_read_circles = validated_data.pop('new_read_circles', None)
+        new_write_circles = validated_data.pop('new_write_circles', None)
+
         request_method = self.context['request'].method
 
-        # update the read_collaborators list if new_read_collaborators submitted
+        # update the collaborator and circle lists if submitted, in bulk (silently ignoring unknown IDs)
+        relates_changed = False
         if request_method == 'PUT' or (new_read_user_ids_prelim and request_method == 'PATCH'):
-            # get the old (current) read collaborator ID list for this event
-            old_read_users = User.objects.filter(readevents=instance.id)
             # remove users from the read list if they are also in the write list (these lists are already unique sets)
             new_read_user_ids = new_read_user_ids_prelim - new_write_user_ids
-            # get the new (submitted) read collaborator ID list for this event
-            new_read_users = User.objects.filter(id__in=new_read_user_ids)
+            new_read_user_ids = User.objects.filter(id__in=new_read_user_ids).values_list('id', flat=True)
+            relates_changed |= any(set_relates(EventReadUser, 'event', instance, 'user', new_read_user_ids, user))
 
-            # identify and delete relates where user IDs are present in old read list but not new read list
-            delete_read_users = list(set(old_read_users) - set(new_read_users))
-            for user_id in delete_read_users:
-                delete_user = EventReadUser.objects.filter(user=user_id, event=instance)
-                delete_user.delete()
+        if request_method == 'PUT' or (new_write_user_ids and request_method == 'PATCH'):
+            new_write_user_ids = User.objects.filter(id__in=new_write_user_ids).values_list('id', flat=True)
+            relates_changed |= any(set_relates(EventWriteUser, 'event', instance, 'user', new_write_user_ids, user))
 
-            # identify and create relates where user IDs are present in new read list but not old read list
-            add_read_users = list(set(new_read_users) - set(old_read_users))
-            for user_id in add_read_users:
-                EventReadUser.objects.create(user=user_id, event=instance, created_by=user, modified_by=user)
+        relates_changed |= set_event_circles(
+            instance, new_read_circles, new_write_circles, user, partial=request_method == 'PATCH')
 
-        # update the write_collaborators list if new_write_user_ids submitted
-        if request_method == 'PUT' or (new_write_user_ids and request_method == 'PATCH'):
-            # get the old (current) write collaborator ID list for this event
-            old_write_users = User.objects.filter(writeevents=instance.id)
-            # get the new (submitted) write collaborator ID list for this event
-            new_write_users = User.objects.filter(id__in=new_write_user_ids)
-
-            # identify and delete relates where user IDs are present in old write list but not new write list
-            delete_write_users = list(set(old_write_users) - set(new_write_users))
-            for user_id in delete_write_users:
-                delete_user = EventWriteUser.objects.filter(user=user_id, event=instance)
-                delete_user.delete()
-
-            # identify and create relates where user IDs are present in new write list but not old write list
-            add_write_users = list(set(new_write_users) - set(old_write_users))
-            for user_id in add_write_users:
-                EventWriteUser.objects.create(user=user_id, event=instance, created_by=user, modified_by=user)
+        # bulk writes skip the model signals, so update the event caches here
+        if relates_changed:
+            event_changed(instance.id, user.id if user else None)
 
         # update the Event object
         instance.event_type = validated_data.get('event_type', instance.event_type)
@@ -1308,9 +1336,10 @@ class EventSerializer(serializers.ModelSerializer):
         model = Event
         fields = ('id', 'event_type', 'event_type_string', 'event_reference', 'complete', 'start_date', 'end_date',
                   'affected_count', 'event_status', 'event_status_string', 'public', 'read_collaborators',
-                  'write_collaborators', 'organizations', 'contacts', 'comments', 'new_event_diagnoses',
-                  'new_organizations', 'new_comments', 'new_event_locations', 'new_eventgroups',
-                  'new_service_request', 'new_read_collaborators', 'new_write_collaborators', 'created_date',
+                  'write_collaborators', 'read_circles', 'write_circles', 'organizations', 'contacts', 'comments',
+                  'new_event_diagnoses', 'new_organizations', 'new_comments', 'new_event_locations', 'new_eventgroups',
+                  'new_service_request', 'new_read_collaborators', 'new_write_collaborators', 'new_read_circles',
+                  'new_write_circles', 'created_date',
                   'created_by', 'created_by_string', 'modified_date', 'modified_by', 'modified_by_string',
                   'service_request_email', 'permissions', 'permission_source',)
 
@@ -1333,6 +1362,8 @@ class EventAdminSerializer(serializers.ModelSerializer):
     new_service_request = serializers.JSONField(write_only=True, required=False)
     new_read_collaborators = serializers.ListField(write_only=True, required=False)
     new_write_collaborators = serializers.ListField(write_only=True, required=False)
+    new_read_circles = serializers.ListField(write_only=True, required=False)
+    new_write_circles = serializers.ListField(write_only=True, required=False)
     service_request_email = serializers.JSONField(read_only=True)
 
     def get_permission_source(self, obj):
@@ -1720,6 +1751,10 @@ class EventAdminSerializer(serializers.ModelSerializer):
         else:
             new_write_user_ids = set([])
 
+        # pull out circle ID lists from the request
+        new_read_circles = validated_data.pop('new_read_circles', None)
+        new_write_circles = validated_data.pop('new_write_circles', None)
+
         # remove users from the read list if they are also in the write list (these lists are already unique sets)
         new_read_user_ids = new_read_user_ids_prelim - new_write_user_ids
 
@@ -1755,18 +1790,15 @@ class EventAdminSerializer(serializers.ModelSerializer):
 
         user = get_user(self.context, self.initial_data)
 
-        # create the child collaborators for this event
-        if new_read_user_ids is not None:
-            for read_user_id in new_read_user_ids:
-                read_user = User.objects.filter(id=read_user_id).first()
-                if read_user is not None:
-                    EventReadUser.objects.create(user=read_user, event=event, created_by=user, modified_by=user)
+        # create the child collaborators and circle shares for this event, in bulk (silently ignoring unknown IDs)
+        new_read_user_ids = User.objects.filter(id__in=new_read_user_ids).values_list('id', flat=True)
+        set_relates(EventReadUser, 'event', event, 'user', new_read_user_ids, user)
+        new_write_user_ids = User.objects.filter(id__in=new_write_user_ids).values_list('id', flat=True)
+        set_relates(EventWriteUser, 'event', event, 'user', new_write_user_ids, user)
+        set_event_circles(event, new_read_circles, new_write_circles, user)
 
-        if new_write_user_ids is not None:
-            for write_user_id in new_write_user_ids:
-                write_user = User.objects.filter(id=write_user_id).first()
-                if write_user is not None:
-                    EventWriteUser.objects.create(user=write_user, event=event, created_by=user, modified_by=user)
+        # bulk writes skip the model signals, so update the event caches here
+        event_changed(event.id, user.id if user else None)
 
         # create the child organizations for this event
         if new_organizations is not None:
@@ -2034,46 +2066,31 @@ class EventAdminSerializer(serializers.ModelSerializer):
         else:
             new_write_user_ids = set([])
 
+        # pull out circle ID lists from the request
+        new_read_circles = validated_data.pop('new_read_circles', None)
+        new_write_circles = validated_data.pop('new_write_circles', None)
+
         user = get_user(self.context, self.initial_data)
         request_method = self.context['request'].method
 
-        # update the read_collaborators list if new_read_collaborators submitted
+        # update the collaborator and circle lists if submitted, in bulk (silently ignoring unknown IDs)
+        relates_changed = False
         if request_method == 'PUT' or (new_read_user_ids_prelim and request_method == 'PATCH'):
-            # get the old (current) read collaborator ID list for this event
-            old_read_users = User.objects.filter(readevents=instance.id)
             # remove users from the read list if they are also in the write list (these lists are already unique sets)
             new_read_user_ids = new_read_user_ids_prelim - new_write_user_ids
-            # get the new (submitted) read collaborator ID list for this event
-            new_read_users = User.objects.filter(id__in=new_read_user_ids)
+            new_read_user_ids = User.objects.filter(id__in=new_read_user_ids).values_list('id', flat=True)
+            relates_changed |= any(set_relates(EventReadUser, 'event', instance, 'user', new_read_user_ids, user))
 
-            # identify and delete relates where user IDs are present in old read list but not new read list
-            delete_read_users = list(set(old_read_users) - set(new_read_users))
-            for user_id in delete_read_users:
-                delete_user = EventReadUser.objects.filter(user=user_id, event=instance)
-                delete_user.delete()
+        if request_method == 'PUT' or (new_write_user_ids and request_method == 'PATCH'):
+            new_write_user_ids = User.objects.filter(id__in=new_write_user_ids).values_list('id', flat=True)
+            relates_changed |= any(set_relates(EventWriteUser, 'event', instance, 'user', new_write_user_ids, user))
 
-            # identify and create relates where user IDs are present in new read list but not old read list
-            add_read_users = list(set(new_read_users) - set(old_read_users))
-            for user_id in add_read_users:
-                EventReadUser.objects.create(user=user_id, event=instance, created_by=user, modified_by=user)
+        relates_changed |= set_event_circles(
+            instance, new_read_circles, new_write_circles, user, partial=request_method == 'PATCH')
 
-        # update the write_collaborators list if new_write_user_ids submitted
-        if request_method == 'PUT' or (new_write_user_ids and request_method == 'PATCH'):
-            # get the old (current) write collaborator ID list for this event
-            old_write_users = User.objects.filter(writeevents=instance.id)
-            # get the new (submitted) write collaborator ID list for this event
-            new_write_users = User.objects.filter(id__in=new_write_user_ids)
-
-            # identify and delete relates where user IDs are present in old write list but not new write list
-            delete_write_users = list(set(old_write_users) - set(new_write_users))
-            for user_id in delete_write_users:
-                delete_user = EventWriteUser.objects.filter(user=user_id, event=instance)
-                delete_user.delete()
-
-            # identify and create relates where user IDs are present in new write list but not old write list
-            add_write_users = list(set(new_write_users) - set(old_write_users))
-            for user_id in add_write_users:
-                EventWriteUser.objects.create(user=user_id, event=instance, created_by=user, modified_by=user)
+        # bulk writes skip the model signals, so update the event caches here
+        if relates_changed:
+            event_changed(instance.id, user.id if user else None)
 
         # update the Event object
         instance.event_type = validated_data.get('event_type', instance.event_type)
@@ -2121,8 +2138,9 @@ class EventAdminSerializer(serializers.ModelSerializer):
         fields = ('id', 'event_type', 'event_type_string', 'event_reference', 'complete', 'start_date', 'end_date',
                   'affected_count', 'staff', 'staff_string', 'event_status', 'event_status_string',
                   'legal_status', 'legal_status_string', 'legal_number', 'quality_check', 'public',
-                  'read_collaborators', 'write_collaborators', 'eventgroups', 'organizations', 'contacts', 'comments',
-                  'new_read_collaborators', 'new_write_collaborators','new_event_diagnoses', 'new_organizations',
+                  'read_collaborators', 'write_collaborators', 'read_circles', 'write_circles', 'eventgroups',
+                  'organizations', 'contacts', 'comments', 'new_read_collaborators', 'new_write_collaborators',
+                  'new_read_circles', 'new_write_circles', 'new_event_diagnoses', 'new_organizations',
                   'new_comments', 'new_event_locations', 'new_eventgroups', 'new_service_request', 'created_date',
                   'created_by', 'created_by_string', 'modified_date', 'modified_by', 'modified_by_string',
                   'service_request_email', 'permissions', 'permission_source',)
@@ -2327,6 +2345,17 @@ class EventStatusSerializer(serializers.ModelSerializer):
 class EventAbstractSerializer(serializers.ModelSerializer):
     created_by_string = serializers.StringRelatedField(source='created_by')
     modified_by_string = serializers.StringRelatedField(source='modified_by')
+    search_rank = serializers.FloatField(read_only=True)
+    search_snippet = serializers.CharField(read_only=True)
+
+    # the search rank and snippet are only present for full-text searches (with the search param)
+    def get_fields(self):
+        fields = super(EventAbstractSerializer, self).get_fields()
+        request = self.context.get('request', None)
+        if not request or 'search' not in request.query_params:
+            fields.pop('search_rank')
+            fields.pop('search_snippet')
+        return fields
 
     def validate(self, data):
 
@@ -2340,7 +2369,7 @@ class EventAbstractSerializer(serializers.ModelSerializer):
     class Meta:
         model = EventAbstract
         fields = ('id', 'event', 'text', 'lab_id', 'created_date', 'created_by', 'created_by_string',
-                  'modified_date', 'modified_by', 'modified_by_string',)
+                  'modified_date', 'modified_by', 'modified_by_string', 'search_rank', 'search_snippet',)
 
 
 class EventCaseSerializer(serializers.ModelSerializer):
@@ -2489,6 +2518,41 @@ class EventLocationSerializer(serializers.ModelSerializer):
     clinical_signs = serializers.CharField(write_only=True, required=False, allow_blank=True)
     comment = serializers.CharField(write_only=True, required=False, allow_blank=True)
 
+    # find the centroid coordinates (lng/lat) for a county or equivalent from its stored centroid
+    def search_local_adm2(self, admin_l2):
+        coords = None
+        if admin_l2.centroid_latitude is not None and admin_l2.centroid_longitude is not None:
+            coords = {'lng': str(admin_l2.centroid_longitude), 'lat': str(admin_l2.centroid_latitude)}
+        return coords
+
+    # find the centroid coordinates (lng/lat) for a state or equivalent from its stored centroid,
+    # first computing and storing it from the stored centroids of its counties (or equivalents) if necessary
+    def search_local_adm1(self, admin_l1):
+        coords = None
+        if admin_l1.centroid_latitude is None or admin_l1.centroid_longitude is None:
+            centroids = list(AdministrativeLevelTwo.objects.filter(
+                administrative_level_one=admin_l1.id, centroid_latitude__isnull=False,
+                centroid_longitude__isnull=False).values_list('centroid_latitude', 'centroid_longitude'))
+            if centroids:
+                lats = [float(centroid[0]) for centroid in centroids]
+                lngs = [float(centroid[1]) for centroid in centroids]
+                # keep areas that cross the antimeridian (e.g., Alaska) together before averaging the longitudes
+                if max(lngs) - min(lngs) > 180:
+                    lngs = [lng + 360 if lng < 0 else lng for lng in lngs]
+                lat = sum(lats) / len(lats)
+                lng = sum(lngs) / len(lngs)
+                lng = lng - 360 if lng > 180 else lng
+                admin_l1.centroid_latitude = Decimal(lat).quantize(Decimal('0.000001'))
+                admin_l1.centroid_longitude = Decimal(lng).quantize(Decimal('0.000001'))
+                # store the computed centroid without creating a history record (it is derived data)
+                AdministrativeLevelOne.objects.filter(id=admin_l1.id).update(
+                    centroid_latitude=admin_l1.centroid_latitude, centroid_longitude=admin_l1.centroid_longitude)
+                # the centroids are copied into event summary documents, and a queryset update sends no signals
+                event_summary_lookup_changed(AdministrativeLevelOne, admin_l1)
+        if admin_l1.centroid_latitude is not None and admin_l1.centroid_longitude is not None:
+            coords = {'lng': str(admin_l1.centroid_longitude), 'lat': str(admin_l1.centroid_latitude)}
+        return coords
+
     # find the centroid coordinates (lng/lat) for a state or equivalent
     def search_geonames_adm1(self, adm1_name, country_code):
         coords = None
@@ -2869,16 +2933,21 @@ class EventLocationSerializer(serializers.ModelSerializer):
                     geom = str(validated_data['longitude']) + ',' + str(validated_data['latitude'])
                     params.update({'geometry': geom})
                 # otherwise if county is present, look up the county centroid and use it to get the intersecting flyway
-                elif admin_l2 and confirm_geonames_api_responsive(geonames_endpoint):
-                    coords = self.search_geonames_adm2(
+                # (the stored centroid is used if there is one, and Geonames is only searched if there is not)
+                elif admin_l2 and (self.search_local_adm2(admin_l2)
+                                   or confirm_geonames_api_responsive(geonames_endpoint)):
+                    coords = self.search_local_adm2(admin_l2) or self.search_geonames_adm2(
                         admin_l2.name, admin_l1.name, admin_l1.abbreviation, country.abbreviation)
                     if coords:
                         params.update({'geometry': coords['lng'] + ',' + coords['lat']})
                 # MT, WY, CO, and NM straddle two flyways, and without lat/lng or county info, flyway
                 # cannot be determined, otherwise look up the state centroid, then use it to get the intersecting flyway
+                # (the stored or computed centroid is used if there is one, and Geonames is only searched if there is not)
                 elif (admin_l1.abbreviation not in ['MT', 'WY', 'CO', 'NM', 'HI']
-                      and confirm_geonames_api_responsive(geonames_endpoint)):
-                    coords = self.search_geonames_adm1(admin_l1.name, country.abbreviation)
+                      and (self.search_local_adm1(admin_l1) or confirm_geonames_api_responsive(geonames_endpoint))):
+                    # (the centroid computed for the condition above is kept on admin_l1, so this does not query again)
+                    coords = (self.search_local_adm1(admin_l1)
+                              or self.search_geonames_adm1(admin_l1.name, country.abbreviation))
                     if coords:
                         params.update({'geometry': coords['lng'] + ',' + coords['lat']})
                 # HI is not in a flyway, so assign it to Pacific ("Include all of Hawaii in with Pacific Americas")
@@ -3064,7 +3133,7 @@ class AdministrativeLevelOneSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = AdministrativeLevelOne
-        fields = ('id', 'name', 'country', 'country_string', 'abbreviation',
+        fields = ('id', 'name', 'country', 'country_string', 'abbreviation', 'centroid_latitude', 'centroid_longitude',
                   'created_date', 'created_by', 'created_by_string',
                   'modified_date', 'modified_by', 'modified_by_string',)
 
@@ -4206,13 +4275,11 @@ class CircleSerlializer(serializers.ModelSerializer):
         # create the Circle object
         circle = Circle.objects.create(**validated_data)
 
-        # create a CicleUser object for each User ID submitted
+        # create the CircleUser objects for the User IDs submitted, in bulk (silently ignoring unknown IDs)
         if new_users:
             user = get_user(self.context, self.initial_data)
-
-            for new_user_id in new_users:
-                new_user = User.objects.get(id=new_user_id)
-                CircleUser.objects.create(user=new_user, circle=circle, created_by=user, modified_by=user)
+            new_user_ids = User.objects.filter(id__in=set(new_users)).values_list('id', flat=True)
+            set_relates(CircleUser, 'circle', circle, 'user', new_user_ids, user)
 
         return circle
 
@@ -4234,23 +4301,15 @@ class CircleSerlializer(serializers.ModelSerializer):
 
         request_method = self.context['request'].method
 
-        # update circle users if new_users submitted
+        # update circle users if new_users submitted, in bulk (silently ignoring unknown IDs)
         if request_method == 'PUT' or (new_user_ids and request_method == 'PATCH'):
-            # get the old (current) user list for this circle
-            old_users = User.objects.filter(circles=instance.id)
-            # get the new (submitted) user list for this circle
-            new_users = User.objects.filter(id__in=new_user_ids)
-
-            # identify and delete relates where user IDs are present in old list but not new list
-            delete_users = list(set(old_users) - set(new_users))
-            for user_id in delete_users:
-                delete_user = CircleUser.objects.filter(user=user_id, circle=instance)
-                delete_user.delete()
-
-            # identify and add relates where user IDs are present in new list but not old list
-            add_users = list(set(new_users) - set(old_users))
-            for user_id in add_users:
-                CircleUser.objects.create(user=user_id, circle=instance, created_by=user, modified_by=user)
+            new_user_ids = User.objects.filter(id__in=set(new_user_ids)).values_list('id', flat=True)
+            add_user_ids, delete_user_ids = set_relates(CircleUser, 'circle', instance, 'user', new_user_ids, user)
+
+            # update the access of the changed users to the events shared with this circle all at once
+            changed_user_ids = add_user_ids | delete_user_ids
+            if changed_user_ids:
+                expand_circle(instance.id, changed_user_ids)
 
         return instance
 
@@ -4383,6 +4442,14 @@ class SearchSerializer(serializers.ModelSerializer):
         extra_kwargs = {'count': {'read_only': True}}
 
 
+class NotificationSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Notification
+        fields = ('id', 'subject', 'message', 'events', 'read', 'created_date',)
+        read_only_fields = ('id', 'subject', 'message', 'events', 'read', 'created_date',)
+
+
 ######
 #
 #  Special
@@ -4570,7 +4637,121 @@ class FlatEventSummarySerializer(serializers.ModelSerializer):
                   'species', 'eventdiagnoses',)
 
 
-# TODO: Make these three EventSummary serializers adhere to DRY Principle
+# the diagnosis fields of event diagnoses that are visible to the public
+EVENT_SUMMARY_PUBLIC_DIAGNOSIS_FIELDS = ['id', 'event', 'diagnosis', 'diagnosis_string', 'diagnosis_type',
+                                         'diagnosis_type_string', 'suspect', 'major', 'priority']
+
+
+def build_event_summary_document(event):
+    # gather the summary data of an event from its children into a single document
+    # (in a fixed number of queries, however many locations, species and flyways the event has)
+    eventdiagnoses = []
+    for event_diagnosis in EventDiagnosis.objects.filter(event=event.id).select_related(
+            'diagnosis__diagnosis_type', 'created_by', 'modified_by'):
+        if event_diagnosis.diagnosis:
+            diag_id = event_diagnosis.diagnosis.id
+            diag_name = event_diagnosis.diagnosis.name
+            if event_diagnosis.suspect:
+                diag_name = diag_name + " suspect"
+            diag_type = event_diagnosis.diagnosis.diagnosis_type
+            diag_type_id = event_diagnosis.diagnosis.diagnosis_type.id if diag_type else None
+            diag_type_name = event_diagnosis.diagnosis.diagnosis_type.name if diag_type else ''
+            created_by = event_diagnosis.created_by.id if event_diagnosis.created_by else None
+            created_by_string = event_diagnosis.created_by.username if event_diagnosis.created_by else ''
+            modified_by = event_diagnosis.modified_by.id if event_diagnosis.modified_by else None
+            modified_by_string = event_diagnosis.modified_by.username if event_diagnosis.modified_by else ''
+            altered_event_diagnosis = {"id": event_diagnosis.id, "event": event_diagnosis.event_id,
+                                       "diagnosis": diag_id, "diagnosis_string": diag_name,
+                                       "diagnosis_type": diag_type_id, "diagnosis_type_string": diag_type_name,
+                                       "suspect": event_diagnosis.suspect, "major": event_diagnosis.major,
+                                       "priority": event_diagnosis.priority,
+                                       "created_by": created_by, "created_by_string": created_by_string,
+                                       "modified_date": event_diagnosis.modified_date, "modified_by": modified_by,
+                                       "modified_by_string": modified_by_string}
+            eventdiagnoses.append(altered_event_diagnosis)
+
+    eventlocations = list(EventLocation.objects.filter(event=event.id).select_related(
+        'administrative_level_one', 'administrative_level_two__administrative_level_one__country'))
+    eventlocation_ids = [eventlocation.id for eventlocation in eventlocations]
+    # the species and flyways of all the locations at once, in the order of each location's own query
+    location_species = {}
+    for alocationspecies in LocationSpecies.objects.filter(
+            event_location__in=eventlocation_ids).select_related('species'):
+        location_species.setdefault(alocationspecies.event_location_id, []).append(alocationspecies.species)
+    location_flyways = {}
+    for location_flyway in EventLocationFlyway.objects.filter(
+            event_location__in=eventlocation_ids).select_related('flyway'):
+        location_flyways.setdefault(location_flyway.event_location_id, []).append(location_flyway.flyway)
+
+    unique_l1_ids = []
+    unique_l1s = []
+    unique_l2_ids = []
+    unique_l2s = []
+    unique_species_ids = []
+    unique_species = []
+    unique_flyway_ids = []
+    unique_flyways = []
+    for eventlocation in eventlocations:
+        al1 = eventlocation.administrative_level_one
+        if al1 is not None and al1.id not in unique_l1_ids:
+            unique_l1_ids.append(al1.id)
+            unique_l1s.append(model_to_dict(al1))
+
+        al2_model = eventlocation.administrative_level_two
+        if al2_model is not None and al2_model.id not in unique_l2_ids:
+            unique_l2_ids.append(al2_model.id)
+            al2_dict = model_to_dict(al2_model)
+            al2_dict.update({'administrative_level_one_string': al2_model.administrative_level_one.name})
+            al2_dict.update({'country': al2_model.administrative_level_one.country.id})
+            al2_dict.update({'country_string': al2_model.administrative_level_one.country.name})
+            unique_l2s.append(al2_dict)
+
+        for species in location_species.get(eventlocation.id, []):
+            if species.id not in unique_species_ids:
+                unique_species_ids.append(species.id)
+                unique_species.append(model_to_dict(species))
+
+        for flyway in location_flyways.get(eventlocation.id, []):
+            if flyway.id not in unique_flyway_ids:
+                unique_flyway_ids.append(flyway.id)
+                unique_flyways.append(model_to_dict(flyway))
+
+    document = {"eventdiagnoses": eventdiagnoses, "administrativelevelones": unique_l1s,
+                "administrativeleveltwos": unique_l2s, "species": unique_species, "flyways": unique_flyways,
+                "organizations": OrganizationSerializer(event.organizations.all(), many=True).data}
+
+    # store the document exactly as it would be rendered (e.g., dates as strings, decimals as numbers)
+    return json.loads(json.dumps(document, cls=encoders.JSONEncoder))
+
+
+def update_event_summary_documents(event_ids):
+    # build and store the summary documents of events, once the changes to them are committed (see event_changed),
+    # each in a transaction that locks the document of its event while it is built, so that the builds of an event
+    # are serialized and the last one to store its document has read every change committed before it started
+    for event_id in sorted(event_ids):
+        try:
+            with transaction.atomic():
+                event = Event.objects.get(id=event_id)
+                summary_document, created = EventSummaryDocument.objects.select_for_update().get_or_create(
+                    event=event, defaults={'data': {}})
+                summary_document.data = build_event_summary_document(event)
+                summary_document.save(update_fields=['data'])
+        except (IntegrityError, Event.DoesNotExist):
+            # the event was deleted in the meantime (and its document with it)
+            pass
+
+
+def get_event_summary_document(event):
+    # use the stored summary document of the event, which is rebuilt whenever the event or its children change
+    # (see update_event_summary_documents), or build one (without storing it) if the event has none yet
+    try:
+        return event.summarydocument.data
+    except EventSummaryDocument.DoesNotExist:
+        # keep the document on the event, or each of the serializer fields that reads it would build it again
+        event.summarydocument = EventSummaryDocument(event=event, data=build_event_summary_document(event))
+        return event.summarydocument.data
+
+
 class EventSummaryPublicSerializer(serializers.ModelSerializer):
 
     # diagnosis = Diagnosis.objects.get(pk=obj.diagnosis.id).name if obj.diagnosis else None
@@ -4579,86 +4760,24 @@ class EventSummaryPublicSerializer(serializers.ModelSerializer):
     # return diagnosis
 
     def get_eventdiagnoses(self, obj):
-        event_diagnoses = EventDiagnosis.objects.filter(event=obj.id)
-        eventdiagnoses = []
-        for event_diagnosis in event_diagnoses:
-            if event_diagnosis.diagnosis:
-                diag_id = event_diagnosis.diagnosis.id
-                diag_name = event_diagnosis.diagnosis.name
-                if event_diagnosis.suspect:
-                    diag_name = diag_name + " suspect"
-                diag_type = event_diagnosis.diagnosis.diagnosis_type
-                diag_type_id = event_diagnosis.diagnosis.diagnosis_type.id if diag_type else None
-                diag_type_name = event_diagnosis.diagnosis.diagnosis_type.name if diag_type else ''
-                altered_event_diagnosis = {"id": event_diagnosis.id, "event": event_diagnosis.event.id,
-                                           "diagnosis": diag_id, "diagnosis_string": diag_name,
-                                           "diagnosis_type": diag_type_id, "diagnosis_type_string": diag_type_name,
-                                           "suspect": event_diagnosis.suspect, "major": event_diagnosis.major,
-                                           "priority": event_diagnosis.priority}
-                eventdiagnoses.append(altered_event_diagnosis)
-        return eventdiagnoses
+        eventdiagnoses = get_event_summary_document(obj)['eventdiagnoses']
+        return [{field: eventdiagnosis[field] for field in EVENT_SUMMARY_PUBLIC_DIAGNOSIS_FIELDS}
+                for eventdiagnosis in eventdiagnoses]
 
     def get_administrativelevelones(self, obj):
-        unique_l1_ids = []
-        unique_l1s = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                al1_id = eventlocation.get('administrative_level_one_id')
-                if al1_id is not None and al1_id not in unique_l1_ids:
-                    unique_l1_ids.append(al1_id)
-                    al1 = AdministrativeLevelOne.objects.filter(id=al1_id).first()
-                    unique_l1s.append(model_to_dict(al1))
-        return unique_l1s
+        return get_event_summary_document(obj)['administrativelevelones']
 
     def get_administrativeleveltwos(self, obj):
-        unique_l2_ids = []
-        unique_l2s = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                al2_id = eventlocation.get('administrative_level_two_id')
-                if al2_id is not None and al2_id not in unique_l2_ids:
-                    unique_l2_ids.append(al2_id)
-                    al2_model = AdministrativeLevelTwo.objects.filter(id=al2_id).first()
-                    al2_dict = model_to_dict(al2_model)
-                    al2_dict.update({'administrative_level_one_string': al2_model.administrative_level_one.name})
-                    al2_dict.update({'country': al2_model.administrative_level_one.country.id})
-                    al2_dict.update({'country_string': al2_model.administrative_level_one.country.name})
-                    unique_l2s.append(al2_dict)
-        return unique_l2s
+        return get_event_summary_document(obj)['administrativeleveltwos']
 
     def get_species(self, obj):
-        unique_species_ids = []
-        unique_species = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                locationspecies = LocationSpecies.objects.filter(event_location=eventlocation['id'])
-                if locationspecies is not None:
-                    for alocationspecies in locationspecies:
-                        species = Species.objects.filter(id=alocationspecies.species_id).first()
-                        if species is not None:
-                            if species.id not in unique_species_ids:
-                                unique_species_ids.append(species.id)
-                                unique_species.append(model_to_dict(species))
-        return unique_species
+        return get_event_summary_document(obj)['species']
 
     def get_flyways(self, obj):
-        unique_flyway_ids = []
-        unique_flyways = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                flyway_ids = list(EventLocationFlyway.objects.filter(
-                    event_location=eventlocation['id']).values_list('flyway_id', flat=True))
-                if flyway_ids is not None:
-                    for flyway_id in flyway_ids:
-                        if flyway_id is not None and flyway_id not in unique_flyway_ids:
-                            unique_flyway_ids.append(flyway_id)
-                            flyway = Flyway.objects.filter(id=flyway_id).first()
-                            unique_flyways.append(model_to_dict(flyway))
-        return unique_flyways
+        return get_event_summary_document(obj)['flyways']
+
+    def get_organizations(self, obj):
+        return get_event_summary_document(obj)['organizations']
 
     def get_permission_source(self, obj):
         return determine_permission_source(self.context['request'].user, obj)
@@ -4671,7 +4790,7 @@ class EventSummaryPublicSerializer(serializers.ModelSerializer):
     species = serializers.SerializerMethodField()
     event_type_string = serializers.StringRelatedField(source='event_type')
     event_status_string = serializers.StringRelatedField(source='event_status')
-    organizations = OrganizationSerializer(many=True)
+    organizations = serializers.SerializerMethodField()
     permissions = DRYPermissionsField()
     permission_source = serializers.SerializerMethodField()
 
@@ -4685,93 +4804,22 @@ class EventSummaryPublicSerializer(serializers.ModelSerializer):
 class EventSummarySerializer(serializers.ModelSerializer):
 
     def get_eventdiagnoses(self, obj):
-        event_diagnoses = EventDiagnosis.objects.filter(event=obj.id)
-        eventdiagnoses = []
-        for event_diagnosis in event_diagnoses:
-            if event_diagnosis.diagnosis:
-                diag_id = event_diagnosis.diagnosis.id
-                diag_name = event_diagnosis.diagnosis.name
-                if event_diagnosis.suspect:
-                    diag_name = diag_name + " suspect"
-                diag_type = event_diagnosis.diagnosis.diagnosis_type
-                diag_type_id = event_diagnosis.diagnosis.diagnosis_type.id if diag_type else None
-                diag_type_name = event_diagnosis.diagnosis.diagnosis_type.name if diag_type else ''
-                created_by = event_diagnosis.created_by.id if event_diagnosis.created_by else None
-                created_by_string = event_diagnosis.created_by.username if event_diagnosis.created_by else ''
-                modified_by = event_diagnosis.modified_by.id if event_diagnosis.modified_by else None
-                modified_by_string = event_diagnosis.modified_by.username if event_diagnosis.modified_by else ''
-                altered_event_diagnosis = {"id": event_diagnosis.id, "event": event_diagnosis.event.id,
-                                           "diagnosis": diag_id, "diagnosis_string": diag_name,
-                                           "diagnosis_type": diag_type_id, "diagnosis_type_string": diag_type_name,
-                                           "suspect": event_diagnosis.suspect, "major": event_diagnosis.major,
-                                           "priority": event_diagnosis.priority,
-                                           "created_by": created_by, "created_by_string": created_by_string,
-                                           "modified_date": event_diagnosis.modified_date, "modified_by": modified_by,
-                                           "modified_by_string": modified_by_string}
-                eventdiagnoses.append(altered_event_diagnosis)
-        return eventdiagnoses
+        return get_event_summary_document(obj)['eventdiagnoses']
 
     def get_administrativelevelones(self, obj):
-        unique_l1_ids = []
-        unique_l1s = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                al1_id = eventlocation.get('administrative_level_one_id')
-                if al1_id is not None and al1_id not in unique_l1_ids:
-                    unique_l1_ids.append(al1_id)
-                    al1 = AdministrativeLevelOne.objects.filter(id=al1_id).first()
-                    unique_l1s.append(model_to_dict(al1))
-        return unique_l1s
+        return get_event_summary_document(obj)['administrativelevelones']
 
     def get_administrativeleveltwos(self, obj):
-        unique_l2_ids = []
-        unique_l2s = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                al2_id = eventlocation.get('administrative_level_two_id')
-                if al2_id is not None and al2_id not in unique_l2_ids:
-                    unique_l2_ids.append(al2_id)
-                    al2_model = AdministrativeLevelTwo.objects.filter(id=al2_id).first()
-                    al2_dict = model_to_dict(al2_model)
-                    al2_dict.update({'administrative_level_one_string': al2_model.administrative_level_one.name})
-                    al2_dict.update({'country': al2_model.administrative_level_one.country.id})
-                    al2_dict.update({'country_string': al2_model.administrative_level_one.country.name})
-                    unique_l2s.append(al2_dict)
-        return unique_l2s
+        return get_event_summary_document(obj)['administrativeleveltwos']
 
     def get_species(self, obj):
-        unique_species_ids = []
-        unique_species = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                locationspecies = LocationSpecies.objects.filter(event_location=eventlocation['id'])
-                if locationspecies is not None:
-                    for alocationspecies in locationspecies:
-                        species = Species.objects.filter(id=alocationspecies.species_id).first()
-                        if species is not None:
-                            if species.id not in unique_species_ids:
-                                unique_species_ids.append(species.id)
-                                unique_species.append(model_to_dict(species))
-        return unique_species
+        return get_event_summary_document(obj)['species']
 
     def get_flyways(self, obj):
-        unique_flyway_ids = []
-        unique_flyways = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                flyway_ids = list(EventLocationFlyway.objects.filter(
-                    event_location=eventlocation['id']).values_list('flyway_id', flat=True))
-                if flyway_ids is not None:
-                    for flyway_id in flyway_ids:
-                        if flyway_id is not None and flyway_id not in unique_flyway_ids:
-                            unique_flyway_ids.append(flyway_id)
-                            flyway = Flyway.objects.filter(id=flyway_id).first()
-                            unique_flyways.append(model_to_dict(flyway))
-        return unique_flyways
+        return get_event_summary_document(obj)['flyways']
+
+    def get_organizations(self, obj):
+        return get_event_summary_document(obj)['organizations']
 
     def get_permission_source(self, obj):
         return determine_permission_source(self.context['request'].user, obj)
@@ -4786,7 +4834,7 @@ class EventSummarySerializer(serializers.ModelSerializer):
     species = serializers.SerializerMethodField()
     event_type_string = serializers.StringRelatedField(source='event_type')
     event_status_string = serializers.StringRelatedField(source='event_status')
-    organizations = OrganizationSerializer(many=True)
+    organizations = serializers.SerializerMethodField()
     permissions = DRYPermissionsField()
     permission_source = serializers.SerializerMethodField()
 
@@ -4802,93 +4850,22 @@ class EventSummarySerializer(serializers.ModelSerializer):
 class EventSummaryAdminSerializer(serializers.ModelSerializer):
 
     def get_eventdiagnoses(self, obj):
-        event_diagnoses = EventDiagnosis.objects.filter(event=obj.id)
-        eventdiagnoses = []
-        for event_diagnosis in event_diagnoses:
-            if event_diagnosis.diagnosis:
-                diag_id = event_diagnosis.diagnosis.id
-                diag_name = event_diagnosis.diagnosis.name
-                if event_diagnosis.suspect:
-                    diag_name = diag_name + " suspect"
-                diag_type = event_diagnosis.diagnosis.diagnosis_type
-                diag_type_id = event_diagnosis.diagnosis.diagnosis_type.id if diag_type else None
-                diag_type_name = event_diagnosis.diagnosis.diagnosis_type.name if diag_type else ''
-                created_by = event_diagnosis.created_by.id if event_diagnosis.created_by else None
-                created_by_string = event_diagnosis.created_by.username if event_diagnosis.created_by else ''
-                modified_by = event_diagnosis.modified_by.id if event_diagnosis.modified_by else None
-                modified_by_string = event_diagnosis.modified_by.username if event_diagnosis.modified_by else ''
-                altered_event_diagnosis = {"id": event_diagnosis.id, "event": event_diagnosis.event.id,
-                                           "diagnosis": diag_id, "diagnosis_string": diag_name,
-                                           "diagnosis_type": diag_type_id, "diagnosis_type_string": diag_type_name,
-                                           "suspect": event_diagnosis.suspect, "major": event_diagnosis.major,
-                                           "priority": event_diagnosis.priority,
-                                           "created_by": created_by, "created_by_string": created_by_string,
-                                           "modified_date": event_diagnosis.modified_date, "modified_by": modified_by,
-                                           "modified_by_string": modified_by_string}
-                eventdiagnoses.append(altered_event_diagnosis)
-        return eventdiagnoses
+        return get_event_summary_document(obj)['eventdiagnoses']
 
     def get_administrativelevelones(self, obj):
-        unique_l1_ids = []
-        unique_l1s = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                al1_id = eventlocation.get('administrative_level_one_id')
-                if al1_id is not None and al1_id not in unique_l1_ids:
-                    unique_l1_ids.append(al1_id)
-                    al1 = AdministrativeLevelOne.objects.filter(id=al1_id).first()
-                    unique_l1s.append(model_to_dict(al1))
-        return unique_l1s
+        return get_event_summary_document(obj)['administrativelevelones']
 
     def get_administrativeleveltwos(self, obj):
-        unique_l2_ids = []
-        unique_l2s = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                al2_id = eventlocation.get('administrative_level_two_id')
-                if al2_id is not None and al2_id not in unique_l2_ids:
-                    unique_l2_ids.append(al2_id)
-                    al2_model = AdministrativeLevelTwo.objects.filter(id=al2_id).first()
-                    al2_dict = model_to_dict(al2_model)
-                    al2_dict.update({'administrative_level_one_string': al2_model.administrative_level_one.name})
-                    al2_dict.update({'country': al2_model.administrative_level_one.country.id})
-                    al2_dict.update({'country_string': al2_model.administrative_level_one.country.name})
-                    unique_l2s.append(al2_dict)
-        return unique_l2s
+        return get_event_summary_document(obj)['administrativeleveltwos']
 
     def get_species(self, obj):
-        unique_species_ids = []
-        unique_species = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                locationspecies = LocationSpecies.objects.filter(event_location=eventlocation['id'])
-                if locationspecies is not None:
-                    for alocationspecies in locationspecies:
-                        species = Species.objects.filter(id=alocationspecies.species_id).first()
-                        if species is not None:
-                            if species.id not in unique_species_ids:
-                                unique_species_ids.append(species.id)
-                                unique_species.append(model_to_dict(species))
-        return unique_species
+        return get_event_summary_document(obj)['species']
 
     def get_flyways(self, obj):
-        unique_flyway_ids = []
-        unique_flyways = []
-        eventlocations = obj.eventlocations.values()
-        if eventlocations is not None:
-            for eventlocation in eventlocations:
-                flyway_ids = list(EventLocationFlyway.objects.filter(
-                    event_location=eventlocation['id']).values_list('flyway_id', flat=True))
-                if flyway_ids is not None:
-                    for flyway_id in flyway_ids:
-                        if flyway_id is not None and flyway_id not in unique_flyway_ids:
-                            unique_flyway_ids.append(flyway_id)
-                            flyway = Flyway.objects.filter(id=flyway_id).first()
-                            unique_flyways.append(model_to_dict(flyway))
-        return unique_flyways
+        return get_event_summary_document(obj)['flyways']
+
+    def get_organizations(self, obj):
+        return get_event_summary_document(obj)['organizations']
 
     def get_permission_source(self, obj):
         return determine_permission_source(self.context['request'].user, obj)
@@ -4905,7 +4882,7 @@ class EventSummaryAdminSerializer(serializers.ModelSerializer):
     staff_string = serializers.StringRelatedField(source='staff')
     event_status_string = serializers.StringRelatedField(source='event_status')
     legal_status_string = serializers.StringRelatedField(source='legal_status')
-    organizations = OrganizationSerializer(many=True)
+    organizations = serializers.SerializerMethodField()
     permissions = DRYPermissionsField()
     permission_source = serializers.SerializerMethodField()
 
@@ -4962,7 +4939,7 @@ class LocationSpeciesDetailSerializer(serializers.ModelSerializer):
 
 class EventLocationContactDetailSerializer(serializers.ModelSerializer):
     def get_owner_organization_string(self, obj):
-        return Organization.objects.filter(id=obj.contact.owner_organization).first().name
+        return obj.contact.created_by.organization.name
 
     contact_type_string = serializers.StringRelatedField(source='contact_type')
     first_name = serializers.StringRelatedField(source='contact.first_name')
@@ -4993,8 +4970,15 @@ class EventLocationDetailPublicSerializer(serializers.ModelSerializer):
     flyways = serializers.SerializerMethodField()
 
     def get_flyways(self, obj):
-        flyway_ids = [flyway['id'] for flyway in obj.flyways.values()]
-        return list(Flyway.objects.filter(id__in=flyway_ids).values('id', 'name'))
+        return [{'id': flyway.id, 'name': flyway.name} for flyway in obj.flyways.all()]
+
+    # requesters can opt out of the county shapes (and reference counties by ID only) with the no_county_points flag
+    def get_fields(self):
+        fields = super(EventLocationDetailPublicSerializer, self).get_fields()
+        request = self.context.get('request', None)
+        if request and 'no_county_points' in request.query_params:
+            fields.pop('administrative_level_two_points')
+        return fields
 
     class Meta:
         model = EventLocation
@@ -5014,8 +4998,15 @@ class EventLocationDetailSerializer(serializers.ModelSerializer):
     flyways = serializers.SerializerMethodField()
 
     def get_flyways(self, obj):
-        flyway_ids = [flyway['id'] for flyway in obj.flyways.values()]
-        return list(Flyway.objects.filter(id__in=flyway_ids).values('id', 'name'))
+        return [{'id': flyway.id, 'name': flyway.name} for flyway in obj.flyways.all()]
+
+    # requesters can opt out of the county shapes (and reference counties by ID only) with the no_county_points flag
+    def get_fields(self):
+        fields = super(EventLocationDetailSerializer, self).get_fields()
+        request = self.context.get('request', None)
+        if request and 'no_county_points' in request.query_params:
+            fields.pop('administrative_level_two_points')
+        return fields
 
     class Meta:
         model = EventLocation
@@ -5059,6 +5050,58 @@ class ServiceRequestDetailSerializer(serializers.ModelSerializer):
                   'created_by_organization_string', 'modified_date', 'modified_by', 'modified_by_string', 'comments',)
 
 
+def get_published_organizations(event):
+    # gather the publishable organizations of an event (in priority order) with their lookups in a single query
+    pub_orgs = []
+    evtorgs = EventOrganization.objects.filter(
+        event=event.id, organization__do_not_publish=False).select_related(
+        'organization__administrative_level_one', 'organization__country').order_by('priority')
+    for evtorg in evtorgs:
+        org = evtorg.organization
+        new_org = {'id': org.id, 'name': org.name, 'address_one': org.address_one,
+                   'address_two': org.address_two, 'city': org.city, 'postal_code': org.postal_code,
+                   'administrative_level_one': org.administrative_level_one.id,
+                   'administrative_level_one_string': org.administrative_level_one.name,
+                   'country': org.country.id, 'country_string': org.country.name, 'phone': org.phone}
+        pub_orgs.append({"id": evtorg.id, "priority": evtorg.priority, "organization": new_org})
+    return pub_orgs
+
+
+def get_combined_comments(event):
+    # gather the comments of an event and of its event locations and service requests in a fixed number of queries
+    content_types = ContentType.objects.get_for_models(Event, EventLocation, ServiceRequest)
+    content_type_models = {content_type.id: content_type.model for content_type in content_types.values()}
+    evtloc_names = dict(EventLocation.objects.filter(event=event.id).values_list('id', 'name'))
+    servreq_ids = list(ServiceRequest.objects.filter(event=event.id).values_list('id', flat=True))
+    comments = Comment.objects.filter(
+        Q(object_id=event.id, content_type=content_types[Event])
+        | Q(object_id__in=list(evtloc_names.keys()), content_type=content_types[EventLocation])
+        | Q(object_id__in=servreq_ids, content_type=content_types[ServiceRequest])
+    ).select_related('created_by__organization', 'modified_by')
+    combined_comments = []
+    for cmt in comments:
+        # date_sort = datetime.strptime(str(cmt.created_date) + " 00:00:00." + str(cmt.id), "%Y-%m-%d %H:%M:%S.%f")
+        date_sort = (str(cmt.created_date.year) + str(cmt.created_date.month).zfill(2)
+                     + str(cmt.created_date.day).zfill(2) + "." + str(cmt.id).zfill(32))
+        content_type_model = content_type_models[cmt.content_type_id]
+        comment = {
+            "id": cmt.id, "comment": cmt.comment, "comment_type": cmt.comment_type_id, "object_id": cmt.object_id,
+            "content_type_string": content_type_model, "created_date": cmt.created_date,
+            "created_by": cmt.created_by.id, "created_by_string": cmt.created_by.username,
+            "created_by_first_name": cmt.created_by.first_name, "created_by_last_name": cmt.created_by.last_name,
+            "created_by_organization": cmt.created_by.organization.id,
+            "created_by_organization_string": cmt.created_by.organization.name,
+            "modified_date": cmt.modified_date, "modified_by": cmt.modified_by.id,
+            "modified_by_string": cmt.modified_by.username, "date_sort": date_sort
+        }
+        if content_type_model == 'event':
+            comment['object_name'] = event.event_reference
+        elif content_type_model == 'eventlocation':
+            comment['object_name'] = evtloc_names[cmt.object_id]
+        combined_comments.append(comment)
+    return combined_comments
+
+
 class EventDetailPublicSerializer(serializers.ModelSerializer):
     permissions = DRYPermissionsField()
     permission_source = serializers.SerializerMethodField()
@@ -5081,20 +5124,7 @@ class EventDetailPublicSerializer(serializers.ModelSerializer):
         return pub_groups
 
     def get_organizations(self, obj):
-        pub_orgs = []
-        if obj.organizations is not None:
-            orgs = obj.organizations.all()
-            evtorgs = EventOrganization.objects.filter(
-                event=obj.id, organization__do_not_publish=False).order_by('priority')
-            for evtorg in evtorgs:
-                org = [org for org in orgs if org.id == evtorg.organization.id][0]
-                new_org = {'id': org.id, 'name': org.name, 'address_one': org.address_one,
-                           'address_two': org.address_two, 'city': org.city, 'postal_code': org.postal_code,
-                           'administrative_level_one': org.administrative_level_one.id,
-                           'administrative_level_one_string': org.administrative_level_one.name,
-                           'country': org.country.id, 'country_string': org.country.name, 'phone': org.phone}
-                pub_orgs.append({"id": evtorg.id, "priority": evtorg.priority, "organization": new_org})
-        return pub_orgs
+        return get_published_organizations(obj)
 
     def get_permission_source(self, obj):
         return determine_permission_source(self.context['request'].user, obj)
@@ -5129,37 +5159,7 @@ class EventDetailSerializer(serializers.ModelSerializer):
     write_collaborators = UserPublicSerializer(many=True)
 
     def get_combined_comments(self, obj):
-        event_content_type = ContentType.objects.filter(model='event').first()
-        event_comments = Comment.objects.filter(object_id=obj.id, content_type=event_content_type.id)
-        evtloc_ids = list(EventLocation.objects.filter(event=obj.id).values_list('id', flat=True))
-        evtloc_content_type = ContentType.objects.filter(model='eventlocation').first()
-        evtloc_comments = Comment.objects.filter(object_id__in=evtloc_ids, content_type=evtloc_content_type.id)
-        servreq_ids = list(ServiceRequest.objects.filter(event=obj.id).values_list('id', flat=True))
-        servreq_content_type = ContentType.objects.filter(model='servicerequest').first()
-        servreq_comments = Comment.objects.filter(object_id__in=servreq_ids, content_type=servreq_content_type)
-        union_comments = event_comments.union(evtloc_comments).union(servreq_comments)#.order_by('-id')
-        # return CommentSerializer(union_comments, many=True).data
-        combined_comments = []
-        for cmt in union_comments:
-            # date_sort = datetime.strptime(str(cmt.created_date) + " 00:00:00." + str(cmt.id), "%Y-%m-%d %H:%M:%S.%f")
-            date_sort = (str(cmt.created_date.year) + str(cmt.created_date.month).zfill(2)
-                         + str(cmt.created_date.day).zfill(2) + "." + str(cmt.id).zfill(32))
-            comment = {
-                "id": cmt.id, "comment": cmt.comment, "comment_type": cmt.comment_type.id, "object_id": cmt.object_id,
-                "content_type_string": cmt.content_type.model, "created_date": cmt.created_date,
-                "created_by": cmt.created_by.id, "created_by_string": cmt.created_by.username,
-                "created_by_first_name": cmt.created_by.first_name, "created_by_last_name": cmt.created_by.last_name,
-                "created_by_organization": cmt.created_by.organization.id,
-                "created_by_organization_string": cmt.created_by.organization.name,
-                "modified_date": cmt.modified_date, "modified_by": cmt.modified_by.id,
-                "modified_by_string": cmt.modified_by.username, "date_sort": date_sort
-            }
-            if cmt.content_type.model == 'event':
-                comment['object_name'] = Event.objects.filter(id=cmt.object_id).first().event_reference
-            elif cmt.content_type.model == 'eventlocation':
-                comment['object_name'] = EventLocation.objects.filter(id=cmt.object_id).first().name
-            combined_comments.append(comment)
-        return combined_comments
+        return get_combined_comments(obj)
 
     def get_eventgroups(self, obj):
         pub_groups = []
@@ -5173,23 +5173,11 @@ class EventDetailSerializer(serializers.ModelSerializer):
         return pub_groups
 
     def get_organizations(self, obj):
-        pub_orgs = []
-        if obj.organizations is not None:
-            orgs = obj.organizations.all()
-            evtorgs = EventOrganization.objects.filter(
-                event=obj.id, organization__do_not_publish=False).order_by('priority')
-            for evtorg in evtorgs:
-                org = [org for org in orgs if org.id == evtorg.organization.id][0]
-                new_org = {'id': org.id, 'name': org.name, 'address_one': org.address_one,
-                           'address_two': org.address_two, 'city': org.city, 'postal_code': org.postal_code,
-                           'administrative_level_one': org.administrative_level_one.id,
-                           'administrative_level_one_string': org.administrative_level_one.name,
-                           'country': org.country.id, 'country_string': org.country.name, 'phone': org.phone}
-                pub_orgs.append({"id": evtorg.id, "priority": evtorg.priority, "organization": new_org})
-        return pub_orgs
+        return get_published_organizations(obj)
 
     def get_eventdiagnoses(self, obj):
-        event_diagnoses = EventDiagnosis.objects.filter(event=obj.id)
+        event_diagnoses = EventDiagnosis.objects.filter(event=obj.id).select_related(
+            'diagnosis__diagnosis_type', 'created_by', 'modified_by')
         eventdiagnoses = []
         for event_diagnosis in event_diagnoses:
             if event_diagnosis.diagnosis:
@@ -5204,7 +5192,7 @@ class EventDetailSerializer(serializers.ModelSerializer):
                 created_by_string = event_diagnosis.created_by.username if event_diagnosis.created_by else ''
                 modified_by = event_diagnosis.modified_by.id if event_diagnosis.modified_by else None
                 modified_by_string = event_diagnosis.modified_by.username if event_diagnosis.modified_by else ''
-                altered_event_diagnosis = {"id": event_diagnosis.id, "event": event_diagnosis.event.id,
+                altered_event_diagnosis = {"id": event_diagnosis.id, "event": event_diagnosis.event_id,
                                            "diagnosis": diag_id, "diagnosis_string": diag_name,
                                            "diagnosis_type": diag_type_id, "diagnosis_type_string": diag_type_name,
                                            "suspect": event_diagnosis.suspect, "major": event_diagnosis.major,
@@ -5255,55 +5243,13 @@ class EventDetailAdminSerializer(serializers.ModelSerializer):
     write_collaborators = UserPublicSerializer(many=True)
 
     def get_combined_comments(self, obj):
-        event_content_type = ContentType.objects.filter(model='event').first()
-        event_comments = Comment.objects.filter(object_id=obj.id, content_type=event_content_type.id)
-        evtloc_ids = list(EventLocation.objects.filter(event=obj.id).values_list('id', flat=True))
-        evtloc_content_type = ContentType.objects.filter(model='eventlocation').first()
-        evtloc_comments = Comment.objects.filter(object_id__in=evtloc_ids, content_type=evtloc_content_type.id)
-        servreq_ids = list(ServiceRequest.objects.filter(event=obj.id).values_list('id', flat=True))
-        servreq_content_type = ContentType.objects.filter(model='servicerequest').first()
-        servreq_comments = Comment.objects.filter(object_id__in=servreq_ids, content_type=servreq_content_type)
-        union_comments = event_comments.union(evtloc_comments).union(servreq_comments)#.order_by('-id')
-        # return CommentSerializer(union_comments, many=True).data
-        combined_comments = []
-        for cmt in union_comments:
-            # date_sort = datetime.strptime(str(cmt.created_date) + " 00:00:00." + str(cmt.id), "%Y-%m-%d %H:%M:%S.%f")
-            date_sort = (str(cmt.created_date.year) + str(cmt.created_date.month).zfill(2)
-                         + str(cmt.created_date.day).zfill(2) + "." + str(cmt.id).zfill(32))
-            comment = {
-                "id": cmt.id, "comment": cmt.comment, "comment_type": cmt.comment_type.id, "object_id": cmt.object_id,
-                "content_type_string": cmt.content_type.model, "created_date": cmt.created_date,
-                "created_by": cmt.created_by.id, "created_by_string": cmt.created_by.username,
-                "created_by_first_name": cmt.created_by.first_name, "created_by_last_name": cmt.created_by.last_name,
-                "created_by_organization": cmt.created_by.organization.id,
-                "created_by_organization_string": cmt.created_by.organization.name,
-                "modified_date": cmt.modified_date, "modified_by": cmt.modified_by.id,
-                "modified_by_string": cmt.modified_by.username, "date_sort": date_sort
-            }
-            if cmt.content_type.model == 'event':
-                comment['object_name'] = Event.objects.filter(id=cmt.object_id).first().event_reference
-            elif cmt.content_type.model == 'eventlocation':
-                comment['object_name'] = EventLocation.objects.filter(id=cmt.object_id).first().name
-            combined_comments.append(comment)
-        return sorted(combined_comments, key=itemgetter('date_sort'), reverse=True)
+        return sorted(get_combined_comments(obj), key=itemgetter('date_sort'), reverse=True)
     def get_organizations(self, obj):
-        pub_orgs = []
-        if obj.organizations is not None:
-            orgs = obj.organizations.all()
-            evtorgs = EventOrganization.objects.filter(
-                event=obj.id, organization__do_not_publish=False).order_by('priority')
-            for evtorg in evtorgs:
-                org = [org for org in orgs if org.id == evtorg.organization.id][0]
-                new_org = {'id': org.id, 'name': org.name, 'address_one': org.address_one,
-                           'address_two': org.address_two, 'city': org.city, 'postal_code': org.postal_code,
-                           'administrative_level_one': org.administrative_level_one.id,
-                           'administrative_level_one_string': org.administrative_level_one.name,
-                           'country': org.country.id, 'country_string': org.country.name, 'phone': org.phone}
-                pub_orgs.append({"id": evtorg.id, "priority": evtorg.priority, "organization": new_org})
-        return pub_orgs
+        return get_published_organizations(obj)
 
     def get_eventdiagnoses(self, obj):
-        event_diagnoses = EventDiagnosis.objects.filter(event=obj.id)
+        event_diagnoses = EventDiagnosis.objects.filter(event=obj.id).select_related(
+            'diagnosis__diagnosis_type', 'created_by', 'modified_by')
         eventdiagnoses = []
         for event_diagnosis in event_diagnoses:
             if event_diagnosis.diagnosis:
@@ -5318,7 +5264,7 @@ class EventDetailAdminSerializer(serializers.ModelSerializer):
                 created_by_string = event_diagnosis.created_by.username if event_diagnosis.created_by else ''
                 modified_by = event_diagnosis.modified_by.id if event_diagnosis.modified_by else None
                 modified_by_string = event_diagnosis.modified_by.username if event_diagnosis.modified_by else ''
-                altered_event_diagnosis = {"id": event_diagnosis.id, "event": event_diagnosis.event.id,
+                altered_event_diagnosis = {"id": event_diagnosis.id, "event": event_diagnosis.event_id,
                                            "diagnosis": diag_id, "diagnosis_string": diag_name,
                                            "diagnosis_type": diag_type_id, "diagnosis_type_string": diag_type_name,
                                            "suspect": event_diagnosis.suspect, "major": event_diagnosis.major,
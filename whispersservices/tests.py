@@ -1,3 +1,1122 @@
-from django.test import TestCase
+import io
+import json
+from datetime import date, timedelta
+from types import SimpleNamespace
+from decimal import Decimal
+from unittest import mock
+from django.apps import apps
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from whispersservices.models import Event, EventType, EventStatus, LegalStatus, Organization, Role, User
+from whispersservices.models import Country, AdministrativeLevelOne, AdministrativeLevelTwo, EventLocation
+from whispersservices.models import Species, LocationSpecies, Diagnosis, DiagnosisType, EventDiagnosis
+from whispersservices.models import EventSummaryDocument, Flyway, EventLocationFlyway, Contact, EventLocationContact
+from whispersservices.models import Circle, CircleUser, EventReadCircle, EventWriteCircle, EventReadUser
+from whispersservices.models import set_relates, buffered_history, system_change, EventChange, Notification
+from whispersservices.models import OutboundEmail, EventOrganization, Comment, CommentType, ServiceRequest, ServiceRequestType
+from whispersservices.models import get_event_data_version, bump_event_data_version, get_event_version
+from whispersservices.renderers import FastJSONRenderer, has_orjson_float_mismatch, has_non_finite_float
+from whispersservices.serializers import build_event_summary_document, get_combined_comments
+from whispersservices.serializers import get_published_organizations, EventLocationSerializer
+from whispersservices.views import EVENT_STATISTICS_DIMENSIONS, encode_history_cursor, decode_history_cursor
+from whispersservices.views import can_stream_list, stream_json_list
+
+
+def run_commit_hooks():
+    # a test case never commits, so run the callbacks that would run on commit (and any that those callbacks add)
+    while connection.run_on_commit:
+        callbacks, connection.run_on_commit = connection.run_on_commit, []
+        for savepoint_ids, callback in callbacks:
+            callback()
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    # floats the json module writes in exponent form, or that orjson (in some version) writes differently
+    FLOATS = [1e16, 1.5e300, 1e22, 1.2345678901234568e+17, 1e-5, 1e-7, 2.5e-10, 0.0001, 1000000000000000.0, -1e16]
+
+    def test_floats_render_the_same_bytes(self):
+        for value in self.FLOATS:
+            data = {"value": value, "values": [value, 1.5, 0]}
+            self.assertEqual(FastJSONRenderer().render(data, 'application/json'),
+                             JSONRenderer().render(data, 'application/json'), value)
+
+    def test_mismatch_is_found_in_any_orjson_float_form(self):
+        # the forms written by orjson 3.8 (no exponent sign) and by later versions
+        for ret in [b'[1e16]', b'[1.5e300]', b'[1e+16]', b'{"a":1e-7}', b'[0.00001]', b'[-0.00005]']:
+            self.assertTrue(has_orjson_float_mismatch(ret), ret)
+
+    def test_no_mismatch_without_exponents_or_small_floats(self):
+        for ret in [b'[1000000000000000.0]', b'[0.0001]', b'[10.00001]', b'{"name":"Lake e-5"}', b'{"see":"note"}']:
+            self.assertFalse(has_orjson_float_mismatch(ret), ret)
+
+    def test_non_finite_floats_are_rejected(self):
+        for value in [float('nan'), float('inf'), float('-inf')]:
+            data = {"values": [None, {"value": value}]}
+            self.assertTrue(has_non_finite_float(data))
+            with self.assertRaises(ValueError):
+                JSONRenderer().render(data, 'application/json')
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render(data, 'application/json')
+
+    def test_nulls_render_the_same_bytes(self):
+        data = [{"value": None, "values": (1.5, None, [0.0, -2.5]), "name": "null"}]
+        self.assertFalse(has_non_finite_float(data))
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json'),
+                         JSONRenderer().render(data, 'application/json'))
+
+
+class StreamedListTests(SimpleTestCase):
+
+    class ItemSerializer(serializers.Serializer):
+        id = serializers.IntegerField()
+        name = serializers.CharField()
+        value = serializers.FloatField()
+
+    class ItemQuerySet(object):
+        # the two queryset methods a streamed list uses, over a list of objects
+        def __init__(self, items):
+            self.items = items
+
+        def values_list(self, field, flat=False):
+            return [item.pk for item in self.items]
+
+        def filter(self, pk__in):
+            return [item for item in self.items if item.pk in pk__in]
+
+    ITEMS = [SimpleNamespace(pk=i, id=i, name='Lac Saint-Jean \u2014 ' + str(i), value=value)
+             for i, value in enumerate([1.5, 1e16, 1e-7, 0, -2.25, 1e22, 0.0001])]
+
+    def get_request(self, renderer, media_type='application/json'):
+        request = Request(APIRequestFactory().get('/eventsummaries/', {'no_page': ''}))
+        request.accepted_renderer = renderer
+        request.accepted_media_type = media_type
+        return request
+
+    def stream(self, request, items):
+        # stream in chunks smaller than the list, so that the chunks must be joined
+        with mock.patch('whispersservices.views.STREAM_CHUNK_SIZE', 3):
+            response = stream_json_list(request, self.ItemQuerySet(items), self.ItemSerializer, {'request': request})
+            return b''.join(response.streaming_content)
+
+    def test_streamed_list_has_the_same_bytes_as_the_rendered_list(self):
+        for renderer in [JSONRenderer(), FastJSONRenderer()]:
+            request = self.get_request(renderer)
+            for items in [self.ITEMS, self.ITEMS[:3], self.ITEMS[:1], []]:
+                data = self.ItemSerializer(items, many=True).data
+                self.assertEqual(self.stream(request, items),
+                                 renderer.render(data, request.accepted_media_type, {'request': request}))
+
+    def test_objects_deleted_while_streaming_are_left_out(self):
+        request = self.get_request(JSONRenderer())
+        queryset = self.ItemQuerySet(self.ITEMS)
+        # the first chunk has been deleted by the time it is fetched
+        with mock.patch('whispersservices.views.STREAM_CHUNK_SIZE', 3):
+            response = stream_json_list(request, queryset, self.ItemSerializer, {'request': request})
+            queryset.items = self.ITEMS[3:]
+            content = b''.join(response.streaming_content)
+        data = self.ItemSerializer(self.ITEMS[3:], many=True).data
+        self.assertEqual(content, JSONRenderer().render(data, 'application/json', {'request': request}))
+
+    def test_only_plain_json_lists_are_streamed(self):
+        self.assertTrue(can_stream_list(self.get_request(JSONRenderer())))
+        self.assertFalse(can_stream_list(self.get_request(JSONRenderer(), 'application/json; indent=4')))
+
+
+class HistoryCursorTests(SimpleTestCase):
+
+    def test_cursor_decodes_to_the_position_of_the_record(self):
+        history_date = timezone.now()
+        record = SimpleNamespace(instance_type=Event, history_date=history_date, history_id=42)
+        self.assertEqual(decode_history_cursor(encode_history_cursor(record)), (history_date, 'event', 42))
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ['not a cursor', 'YXxi', 'eWVzdGVyZGF5fGV2ZW50fDE=', 'MjAyMC0wMS0wMVQwMDowMDowMHxldmVudHx4']:
+            with self.assertRaises(serializers.ValidationError):
+                decode_history_cursor(cursor)
+
+
+class WhispersTestCase(APITestCase):
+    """
+    Creates the lookups every event needs and a partner user, and starts each test with empty caches
+    """
+
+    def setUp(self):
+        cache.clear()
+        caches['eventsummaries'].clear()
+        self.partner = Role.objects.create(name='Partner')
+        # anonymous searches are owned by the admin user, which is expected to be the first user
+        admin = User.objects.create_user('admin', 'admin@example.com', 'password', role=self.partner)
+        User.objects.filter(id=admin.id).update(id=1)
+        self.organization = Organization.objects.create(name='Parent Organization')
+        self.user = self.create_user('owner', self.organization)
+        self.event_type = EventType.objects.create(name='Mortality/Morbidity')
+        self.event_status = EventStatus.objects.create(name='Draft')
+        self.legal_status = LegalStatus.objects.create(name='N/A')
+        self.country = Country.objects.create(name='United States')
+        self.state = AdministrativeLevelOne.objects.create(name='Wisconsin', country=self.country)
+        self.county = AdministrativeLevelTwo.objects.create(name='Dane', administrative_level_one=self.state)
+
+    def create_user(self, username, organization):
+        return User.objects.create_user(username, username + '@example.com', 'password', role=self.partner,
+                                        organization=organization)
+
+    def create_event(self, user, public=True):
+        return Event.objects.create(event_type=self.event_type, event_status=self.event_status,
+                                    legal_status=self.legal_status, public=public, created_by=user, modified_by=user)
+
+    def create_location(self, event, administrative_level_two=None, **kwargs):
+        return EventLocation.objects.create(
+            event=event, country=self.country, administrative_level_one=self.state,
+            administrative_level_two=administrative_level_two or self.county, created_by=event.created_by,
+            modified_by=event.created_by, **kwargs)
+
+
+class EventCacheVersionTests(WhispersTestCase):
+
+    def test_version_is_bumped_only_on_commit(self):
+        version = get_event_data_version()
+        bump_event_data_version()
+        self.assertEqual(get_event_data_version(), version)
+        run_commit_hooks()
+        self.assertNotEqual(get_event_data_version(), version)
+
+    def test_event_write_bumps_the_data_version(self):
+        event = self.create_event(self.user)
+        run_commit_hooks()
+        data_version = get_event_data_version()
+        event.public = False
+        event.save()
+        run_commit_hooks()
+        self.assertNotEqual(get_event_data_version(), data_version)
+
+    def test_event_counts_are_cached_until_an_event_is_written(self):
+        self.create_event(self.user)
+        run_commit_hooks()
+        self.assertEqual(self.client.get('/eventsummaries/get_count/').data['count'], 1)
+
+        # the cached count is served until the write is committed
+        self.create_event(self.user)
+        self.assertEqual(self.client.get('/eventsummaries/get_count/').data['count'], 1)
+        run_commit_hooks()
+        self.assertEqual(self.client.get('/eventsummaries/get_count/').data['count'], 2)
+
+    def test_user_event_counts_are_cached_per_user(self):
+        self.create_event(self.user, public=False)
+        colleague = self.create_user('colleague', Organization.objects.create(name='Other Organization'))
+        run_commit_hooks()
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/eventsummaries/get_user_events_count/').data['count'], 1)
+        self.client.force_authenticate(colleague)
+        self.assertEqual(self.client.get('/eventsummaries/get_user_events_count/').data['count'], 0)
+
+    def test_anonymous_event_summaries_are_cached_until_an_event_is_written(self):
+        self.create_event(self.user)
+        run_commit_hooks()
+        self.assertEqual(self.client.get('/eventsummaries/').data['count'], 1)
+
+        # the cached response is served until the write is committed
+        self.create_event(self.user)
+        self.assertEqual(self.client.get('/eventsummaries/').data['count'], 1)
+        run_commit_hooks()
+        self.assertEqual(self.client.get('/eventsummaries/').data['count'], 2)
+
+
+class EventSummaryDocumentTests(WhispersTestCase):
+
+    def setUp(self):
+        super(EventSummaryDocumentTests, self).setUp()
+        self.event = self.create_event(self.user)
+        self.diagnosis = Diagnosis.objects.create(
+            name='Avian Botulism', diagnosis_type=DiagnosisType.objects.create(name='Bacteria'))
+        run_commit_hooks()
+
+    def get_document(self):
+        return EventSummaryDocument.objects.get(event=self.event).data
+
+    def test_document_is_rebuilt_when_a_child_is_committed(self):
+        location = self.create_location(self.event)
+        LocationSpecies.objects.create(event_location=location, species=Species.objects.create(name='Mallard'))
+        EventDiagnosis.objects.create(event=self.event, diagnosis=self.diagnosis, suspect=False,
+                                      created_by=self.user, modified_by=self.user)
+        self.assertEqual(self.get_document()['species'], [])
+        run_commit_hooks()
+        document = self.get_document()
+        self.assertEqual([species['name'] for species in document['species']], ['Mallard'])
+        self.assertEqual([county['name'] for county in document['administrativeleveltwos']], ['Dane'])
+        self.assertEqual([diagnosis['diagnosis_string'] for diagnosis in document['eventdiagnoses']],
+                         ['Avian Botulism'])
+
+    def test_reads_do_not_write_documents(self):
+        EventSummaryDocument.objects.all().delete()
+        response = self.client.get('/eventsummaries/')
+        self.assertEqual(response.data['results'][0]['administrativeleveltwos'], [])
+        self.assertFalse(EventSummaryDocument.objects.exists())
+
+    def test_document_is_built_in_a_fixed_number_of_queries(self):
+        species = Species.objects.create(name='Mallard')
+        for county in ['Dane', 'Iowa']:
+            county = AdministrativeLevelTwo.objects.get_or_create(name=county, administrative_level_one=self.state)[0]
+            LocationSpecies.objects.create(
+                event_location=self.create_location(self.event, county), species=species)
+        run_commit_hooks()
+        with self.assertNumQueries(5):
+            document = build_event_summary_document(self.event)
+        self.assertEqual(len(document['administrativeleveltwos']), 2)
+        self.assertEqual(len(document['species']), 1)
+
+    def test_documents_are_rebuilt_when_a_username_changes(self):
+        EventDiagnosis.objects.create(event=self.event, diagnosis=self.diagnosis, suspect=False,
+                                      created_by=self.user, modified_by=self.user)
+        run_commit_hooks()
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=['last_login'])
+        self.assertFalse(connection.run_on_commit)
+        self.user.username = 'renamed'
+        self.user.save()
+        run_commit_hooks()
+        self.assertEqual(self.get_document()['eventdiagnoses'][0]['created_by_string'], 'renamed')
+
+    def test_documents_are_rebuilt_when_a_lookup_changes(self):
+        self.create_location(self.event)
+        run_commit_hooks()
+        self.county.name = 'Dane County'
+        self.county.save()
+        run_commit_hooks()
+        self.assertEqual(self.get_document()['administrativeleveltwos'][0]['name'], 'Dane County')
+
+
+class EventConditionalRetrieveTests(WhispersTestCase):
+
+    def setUp(self):
+        super(EventConditionalRetrieveTests, self).setUp()
+        self.event = self.create_event(self.user, public=False)
+        run_commit_hooks()
+        self.client.force_authenticate(self.user)
+        self.url = '/eventdetails/' + str(self.event.id) + '/'
+
+    def assertNotModified(self, etag):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def assertModified(self, etag):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
+
+    def test_event_write_bumps_the_event_version(self):
+        event_version = get_event_version(self.event.id)
+        self.event.public = True
+        self.event.save()
+        run_commit_hooks()
+        self.assertNotEqual(get_event_version(self.event.id), event_version)
+
+    def test_unchanged_event_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.event.id)
+        self.assertNotModified(response['ETag'])
+
+    def test_changed_event_is_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        self.event.event_reference = 'Changed'
+        self.event.save()
+        run_commit_hooks()
+        etag = self.assertModified(etag)
+        self.assertNotModified(etag)
+
+    def test_other_users_do_not_share_a_version(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(self.create_user('colleague', self.organization))
+        self.assertModified(etag)
+
+    def test_events_are_not_modified_since_their_last_modified_date(self):
+        url = '/events/' + str(self.event.id) + '/'
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+
+class EventCommentTests(WhispersTestCase):
+
+    def setUp(self):
+        super(EventCommentTests, self).setUp()
+        self.event = self.create_event(self.user)
+        self.event.event_reference = 'Lake Mendota die-off'
+        self.event.save()
+        self.location = self.create_location(self.event, name='North Shore')
+        self.service_request = ServiceRequest.objects.create(
+            event=self.event, request_type=ServiceRequestType.objects.create(name='Diagnostic'),
+            request_response=None, created_by=self.user, modified_by=self.user)
+        self.comment_type = CommentType.objects.create(name='Other')
+
+    def create_comment(self, content_object, text):
+        return Comment.objects.create(content_object=content_object, comment=text, comment_type=self.comment_type,
+                                      created_by=self.user, modified_by=self.user)
+
+    def test_comments_of_the_event_and_its_children_are_combined(self):
+        event_comment = self.create_comment(self.event, 'Event comment')
+        location_comment = self.create_comment(self.location, 'Location comment')
+        request_comment = self.create_comment(self.service_request, 'Request comment')
+        self.create_comment(self.create_event(self.user), 'Other event comment')
+        comments = {comment['id']: comment for comment in get_combined_comments(self.event)}
+        self.assertEqual(set(comments), {event_comment.id, location_comment.id, request_comment.id})
+        self.assertEqual(comments[event_comment.id]['content_type_string'], 'event')
+        self.assertEqual(comments[event_comment.id]['object_name'], 'Lake Mendota die-off')
+        self.assertEqual(comments[location_comment.id]['object_name'], 'North Shore')
+        self.assertEqual(comments[request_comment.id]['content_type_string'], 'servicerequest')
+        self.assertEqual(comments[request_comment.id]['created_by_organization_string'], 'Parent Organization')
+
+    def test_comments_are_combined_in_a_fixed_number_of_queries(self):
+        self.create_comment(self.event, 'Event comment')
+        # the content types are cached after the first call
+        get_combined_comments(self.event)
+        with CaptureQueriesContext(connection) as queries:
+            get_combined_comments(self.event)
+        for i in range(3):
+            self.create_comment(self.create_location(self.event, name='Location ' + str(i)), 'Location comment')
+            self.create_comment(self.service_request, 'Request comment')
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(len(get_combined_comments(self.event)), 7)
+
+
+class PublishedOrganizationTests(WhispersTestCase):
+
+    def setUp(self):
+        super(PublishedOrganizationTests, self).setUp()
+        self.event = self.create_event(self.user)
+
+    def add_organization(self, name, priority, do_not_publish=False):
+        organization = Organization.objects.create(
+            name=name, city='Madison', administrative_level_one=self.state, country=self.country,
+            do_not_publish=do_not_publish)
+        return EventOrganization.objects.create(event=self.event, organization=organization, priority=priority,
+                                                created_by=self.user, modified_by=self.user)
+
+    def test_publishable_organizations_are_listed_by_priority(self):
+        second = self.add_organization('Second Organization', 2)
+        first = self.add_organization('First Organization', 1)
+        self.add_organization('Unpublished Organization', 3, do_not_publish=True)
+        organizations = get_published_organizations(self.event)
+        self.assertEqual([organization['id'] for organization in organizations], [first.id, second.id])
+        self.assertEqual(organizations[0]['priority'], 1)
+        self.assertEqual(organizations[0]['organization']['name'], 'First Organization')
+        self.assertEqual(organizations[0]['organization']['administrative_level_one_string'], 'Wisconsin')
+        self.assertEqual(organizations[0]['organization']['country_string'], 'United States')
+
+    def test_organizations_are_listed_in_one_query(self):
+        for i in range(3):
+            self.add_organization('Organization ' + str(i), i)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(get_published_organizations(self.event)), 3)
+
+
+class EventCircleTests(WhispersTestCase):
+
+    def setUp(self):
+        super(EventCircleTests, self).setUp()
+        self.event = self.create_event(self.user, public=False)
+        self.member = self.create_user('member', Organization.objects.create(name='Other Organization'))
+        self.circles = [Circle.objects.create(name='Circle ' + str(i), created_by=self.user, modified_by=self.user)
+                        for i in range(2)]
+        for circle in self.circles:
+            CircleUser.objects.create(circle=circle, user=self.member, created_by=self.user, modified_by=self.user)
+        run_commit_hooks()
+        self.url = '/events/' + str(self.event.id) + '/'
+
+    def share(self, data):
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        run_commit_hooks()
+
+    def get_circle_ids(self, model):
+        return list(model.objects.filter(event=self.event).values_list('circle', flat=True))
+
+    def test_event_shared_with_a_circle_is_visible_to_its_members(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.share({'new_read_circles': [self.circles[0].id]})
+        self.client.force_authenticate(self.member)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['permission_source'], 'read_collaborators')
+
+    def test_circle_in_both_lists_is_only_shared_for_writing(self):
+        self.share({'new_read_circles': [circle.id for circle in self.circles],
+                    'new_write_circles': [self.circles[1].id]})
+        self.assertEqual(self.get_circle_ids(EventReadCircle), [self.circles[0].id])
+        self.assertEqual(self.get_circle_ids(EventWriteCircle), [self.circles[1].id])
+
+    def test_partial_update_keeps_the_circle_lists_that_were_not_submitted(self):
+        self.share({'new_read_circles': [self.circles[0].id]})
+        self.share({'new_write_circles': [self.circles[1].id]})
+        self.assertEqual(self.get_circle_ids(EventReadCircle), [self.circles[0].id])
+        self.assertEqual(self.get_circle_ids(EventWriteCircle), [self.circles[1].id])
+
+    def test_circles_of_other_users_are_ignored(self):
+        other_circle = Circle.objects.create(name='Other Circle', created_by=self.member, modified_by=self.member)
+        self.share({'new_read_circles': [self.circles[0].id, other_circle.id]})
+        self.assertEqual(self.get_circle_ids(EventReadCircle), [self.circles[0].id])
+
+    def test_event_shared_with_a_circle_is_modified(self):
+        self.client.force_authenticate(self.user)
+        url = '/eventdetails/' + str(self.event.id) + '/'
+        etag = self.client.get(url)['ETag']
+        self.share({'new_read_circles': [self.circles[0].id]})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class SubOrganizationTests(WhispersTestCase):
+
+    def setUp(self):
+        super(SubOrganizationTests, self).setUp()
+        self.child_organization = Organization.objects.create(
+            name='Child Organization', parent_organization=self.organization)
+        self.grandchild_organization = Organization.objects.create(
+            name='Grandchild Organization', parent_organization=self.child_organization)
+        self.child_user = self.create_user('child', self.child_organization)
+        self.grandchild_user = self.create_user('grandchild', self.grandchild_organization)
+
+    def get_contact_ids(self, user):
+        self.client.force_authenticate(user)
+        return [contact['id'] for contact in self.client.get('/contacts/').data['results']]
+
+    def test_contacts_of_sub_organizations_are_listed_once(self):
+        contact = Contact.objects.create(first_name='Own', created_by=self.user, modified_by=self.user)
+        child_contact = Contact.objects.create(first_name='Child', created_by=self.child_user,
+                                               modified_by=self.child_user)
+        grandchild_contact = Contact.objects.create(first_name='Grandchild', created_by=self.grandchild_user,
+                                                    modified_by=self.grandchild_user)
+        self.assertEqual(sorted(self.get_contact_ids(self.user)),
+                         sorted([contact.id, child_contact.id, grandchild_contact.id]))
+        # but not the contacts of parent organizations
+        self.assertEqual(sorted(self.get_contact_ids(self.child_user)),
+                         sorted([child_contact.id, grandchild_contact.id]))
+        self.assertEqual(self.get_contact_ids(self.grandchild_user), [grandchild_contact.id])
+
+    def test_private_event_of_a_sub_organization_is_visible_to_the_organization(self):
+        event = self.create_event(self.grandchild_user, public=False)
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/events/' + str(event.id) + '/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['permission_source'], 'organization')
+        response = self.client.get('/eventdetails/' + str(event.id) + '/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('created_by_string', response.data)
+
+    def test_private_event_of_a_parent_organization_is_not_visible(self):
+        event = self.create_event(self.user, public=False)
+        self.client.force_authenticate(self.child_user)
+        self.assertEqual(self.client.get('/events/' + str(event.id) + '/').status_code, 404)
+        self.assertEqual(self.client.get('/eventdetails/' + str(event.id) + '/').status_code, 404)
+
+    def test_event_location_of_a_sub_organization_is_visible_to_the_organization(self):
+        location = self.create_location(self.create_event(self.grandchild_user, public=False))
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/eventlocations/' + str(location.id) + '/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('created_by_string', response.data)
+
+    def test_event_location_contacts_of_sub_organizations_are_listed(self):
+        location = self.create_location(self.create_event(self.grandchild_user, public=False))
+        contact = Contact.objects.create(first_name='Grandchild', created_by=self.grandchild_user,
+                                         modified_by=self.grandchild_user)
+        location_contact = EventLocationContact.objects.create(
+            event_location=location, contact=contact, created_by=self.grandchild_user,
+            modified_by=self.grandchild_user)
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/eventlocationcontacts/')
+        self.assertEqual([item['id'] for item in response.data['results']], [location_contact.id])
+
+    def test_moving_an_organization_bumps_the_versions_of_its_events(self):
+        event = self.create_event(self.grandchild_user)
+        other_event = self.create_event(self.user)
+        run_commit_hooks()
+        event_version = get_event_version(event.id)
+        other_event_version = get_event_version(other_event.id)
+        self.child_organization.parent_organization = None
+        self.child_organization.save()
+        run_commit_hooks()
+        self.assertNotEqual(get_event_version(event.id), event_version)
+        self.assertEqual(get_event_version(other_event.id), other_event_version)
+
+    def test_event_of_a_moved_organization_is_modified(self):
+        other_organization = Organization.objects.create(name='Other Organization')
+        other_user = self.create_user('other', other_organization)
+        event = self.create_event(self.user)
+        run_commit_hooks()
+        self.client.force_authenticate(other_user)
+        url = '/eventdetails/' + str(event.id) + '/'
+        etag = self.client.get(url)['ETag']
+        self.organization.parent_organization = other_organization
+        self.organization.save()
+        run_commit_hooks()
+        # (the organizations of a user are loaded once per request, so the next request has a new user object)
+        self.client.force_authenticate(User.objects.get(id=other_user.id))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('created_by_string', response.data)
+
+
+class BulkHistoryTests(WhispersTestCase):
+
+    def test_relates_are_synced_with_history(self):
+        event = self.create_event(self.user)
+        readers = [self.create_user('reader' + str(i), self.organization) for i in range(3)]
+
+        added, deleted = set_relates(EventReadUser, 'event', event, 'user', [readers[0].id, readers[1].id], self.user)
+        self.assertEqual((added, deleted), ({readers[0].id, readers[1].id}, set()))
+        added, deleted = set_relates(EventReadUser, 'event', event, 'user', [readers[1].id, readers[2].id], self.user)
+        self.assertEqual((added, deleted), ({readers[2].id}, {readers[0].id}))
+        self.assertEqual(set(EventReadUser.objects.filter(event=event).values_list('user', flat=True)),
+                         {readers[1].id, readers[2].id})
+
+        history = EventReadUser.history.filter(event_id=event.id)
+        self.assertEqual(sorted(history.filter(history_type='+').values_list('user_id', flat=True)),
+                         sorted(reader.id for reader in readers))
+        self.assertEqual(list(history.filter(history_type='-').values_list('user_id', flat=True)), [readers[0].id])
+        self.assertEqual(set(history.values_list('history_user', flat=True)), {self.user.id})
+
+    def test_deleted_relates_still_update_the_event(self):
+        event = self.create_event(self.user)
+        reader = self.create_user('reader', self.organization)
+        set_relates(EventReadUser, 'event', event, 'user', [reader.id], self.user)
+        run_commit_hooks()
+        event_version = get_event_version(event.id)
+        set_relates(EventReadUser, 'event', event, 'user', [], self.user)
+        run_commit_hooks()
+        self.assertNotEqual(get_event_version(event.id), event_version)
+
+    def test_buffered_history_is_written_at_the_end_of_the_block(self):
+        with buffered_history():
+            contacts = [Contact.objects.create(first_name=str(i), created_by=self.user, modified_by=self.user)
+                        for i in range(3)]
+            self.assertFalse(Contact.history.filter(id__in=[contact.id for contact in contacts]).exists())
+        self.assertEqual(Contact.history.filter(id__in=[contact.id for contact in contacts]).count(), 3)
+
+    def test_buffered_history_of_a_rolled_back_savepoint_is_dropped(self):
+        with buffered_history():
+            contact = Contact.objects.create(first_name='Kept', created_by=self.user, modified_by=self.user)
+            try:
+                with transaction.atomic():
+                    Contact.objects.create(first_name='Rolled Back', created_by=self.user, modified_by=self.user)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(list(Contact.history.values_list('id', flat=True)), [contact.id])
+
+    def test_system_changes_of_users_can_skip_history(self):
+        count = User.history.filter(id=self.user.id).count()
+        self.user.last_login = timezone.now()
+        with override_settings(SKIP_SYSTEM_CHANGE_HISTORY=False):
+            with system_change(self.user):
+                self.user.save(update_fields=['last_login'])
+        self.assertEqual(User.history.filter(id=self.user.id).count(), count + 1)
+        with override_settings(SKIP_SYSTEM_CHANGE_HISTORY=True):
+            with system_change(self.user):
+                self.user.save(update_fields=['last_login'])
+            self.assertEqual(User.history.filter(id=self.user.id).count(), count + 1)
+            # other changes are still recorded
+            self.user.first_name = 'Owner'
+            self.user.save()
+        self.assertEqual(User.history.filter(id=self.user.id).count(), count + 2)
+
+
+class EventHistoryTests(WhispersTestCase):
+
+    def setUp(self):
+        super(EventHistoryTests, self).setUp()
+        self.event = self.create_event(self.user, public=False)
+        self.event.event_reference = 'Changed'
+        self.event.legal_number = 'Case 1'
+        self.event.save()
+        self.url = '/events/' + str(self.event.id) + '/history/'
+
+    def get_changed_fields(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        changed = [record for record in response.data['results'] if record['history_type'] == '~']
+        self.assertEqual(len(changed), 1)
+        return [change['field'] for change in changed[0]['changes']]
+
+    def test_owner_does_not_see_the_changes_of_admin_fields(self):
+        self.assertEqual(self.get_changed_fields(self.user), ['event_reference'])
+
+    def test_admin_sees_the_changes_of_every_field(self):
+        admin = self.create_user('nwhc', self.organization)
+        admin.role = Role.objects.create(name='Admin')
+        admin.save()
+        self.assertEqual(sorted(self.get_changed_fields(admin)), ['event_reference', 'legal_number'])
+
+    def test_users_without_access_to_the_event_cannot_see_it(self):
+        self.client.force_authenticate(self.create_user('other', Organization.objects.create(name='Other')))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class EventChangeNotificationTests(WhispersTestCase):
+
+    def setUp(self):
+        super(EventChangeNotificationTests, self).setUp()
+        self.event = self.create_event(self.user, public=False)
+        self.collaborator = self.create_user('collaborator', Organization.objects.create(name='Other Organization'))
+        EventReadUser.objects.create(event=self.event, user=self.collaborator, created_by=self.user,
+                                     modified_by=self.user)
+        run_commit_hooks()
+        EventChange.objects.all().delete()
+
+    def send_digests(self):
+        call_command('send_notifications', stdout=io.StringIO())
+        return {notification.recipient_id: notification.events for notification in Notification.objects.all()}
+
+    def test_change_is_recorded_once_per_transaction_on_commit(self):
+        for reference in ['First', 'Second', 'Third']:
+            self.event.event_reference = reference
+            self.event.save()
+        self.create_location(self.event)
+        self.assertFalse(EventChange.objects.exists())
+        self.assertEqual(len([callback for savepoint_ids, callback in connection.run_on_commit
+                              if getattr(callback, 'on_commit_key', None) == ('event_change', self.event.id,
+                                                                               self.user.id)]), 1)
+        run_commit_hooks()
+        self.assertEqual(list(EventChange.objects.values_list('event_id', 'changed_by')),
+                         [(self.event.id, self.user.id)])
+
+    def test_digest_notifies_the_other_users_of_the_event(self):
+        self.event.event_reference = 'Changed'
+        self.event.save()
+        run_commit_hooks()
+        self.assertEqual(self.send_digests(), {self.collaborator.id: [self.event.id]})
+        self.assertFalse(EventChange.objects.exists())
+
+    def test_digest_of_the_changes_of_a_deleted_event_is_dropped(self):
+        self.event.event_reference = 'Changed'
+        self.event.save()
+        run_commit_hooks()
+        Event.objects.filter(id=self.event.id).delete()
+        self.assertEqual(self.send_digests(), {})
+        self.assertFalse(EventChange.objects.exists())
+
+
+@override_settings(EVENT_CHANGES_WATERMARK_MARGIN=0)
+class EventChangesTests(WhispersTestCase):
+
+    def setUp(self):
+        super(EventChangesTests, self).setUp()
+        self.since = (timezone.now() - timedelta(seconds=1)).isoformat()
+
+    def get_changes(self):
+        response = self.client.get('/eventsummaries/changes/', {'since': self.since})
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['id'] for item in response.data['changed']), response.data['removed']
+
+    def test_changed_events_are_reported(self):
+        event = self.create_event(self.user)
+        self.create_event(self.user, public=False)
+        self.assertEqual(self.get_changes(), ([event.id], []))
+
+    def test_event_made_private_is_removed(self):
+        event = self.create_event(self.user)
+        event.public = False
+        event.save()
+        self.assertEqual(self.get_changes(), ([], [event.id]))
+        # but its owner still sees it change
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.get_changes(), ([event.id], []))
+
+    def test_deleted_events_are_removed_only_for_those_who_could_see_them(self):
+        event = self.create_event(self.user)
+        private_event = self.create_event(self.user, public=False)
+        event_ids = [event.id, private_event.id]
+        Event.objects.filter(id__in=event_ids).delete()
+        self.assertEqual(self.get_changes(), ([], [event.id]))
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.get_changes(), ([], sorted(event_ids)))
+
+    def test_since_is_required_and_validated(self):
+        for params in [{}, {'since': ''}, {'since': 'yesterday'}, {'since': '2020-13-45T00:00:00'}]:
+            self.assertEqual(self.client.get('/eventsummaries/changes/', params).status_code, 400, params)
+
+    def test_changes_since_the_watermark_are_empty(self):
+        self.create_event(self.user)
+        response = self.client.get('/eventsummaries/changes/', {'since': self.since})
+        self.since = response.data['watermark'].isoformat()
+        self.assertEqual(self.get_changes(), ([], []))
+
+
+@override_settings(ENVIRONMENT='test')
+class EmailQueueTests(WhispersTestCase):
+
+    def request_new(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/administrativeleveltwos/request_new/', 'Sauk County, Wisconsin',
+                                    content_type='text/plain')
+        self.assertEqual(response.status_code, 200)
+
+    def test_request_email_is_queued(self):
+        self.request_new()
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.STATUS_QUEUED)
+        self.assertEqual(email.reply_to, [self.user.email])
+        self.assertIn('Sauk County, Wisconsin', email.body)
+        self.assertEqual(mail.outbox, [])
+
+    def test_queued_email_is_sent(self):
+        self.request_new()
+        call_command('send_queued_email', stdout=io.StringIO())
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.STATUS_SENT)
+        self.assertIsNotNone(email.sent_date)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, email.subject)
+        self.assertEqual(mail.outbox[0].reply_to, [self.user.email])
+
+
+class AdministrativeLevelCentroidTests(WhispersTestCase):
+
+    def setUp(self):
+        super(AdministrativeLevelCentroidTests, self).setUp()
+        AdministrativeLevelTwo.objects.filter(id=self.county.id).update(
+            centroid_latitude=Decimal('43.0'), centroid_longitude=Decimal('-89.0'))
+        AdministrativeLevelTwo.objects.create(
+            name='Vilas', administrative_level_one=self.state, centroid_latitude=Decimal('46.0'),
+            centroid_longitude=Decimal('-90.0'))
+        AdministrativeLevelTwo.objects.create(name='Unknown', administrative_level_one=self.state)
+        self.serializer = EventLocationSerializer()
+
+    def test_county_centroid_is_read_from_the_county(self):
+        self.county.refresh_from_db()
+        self.assertEqual(self.serializer.search_local_adm2(self.county), {'lng': '-89.000000', 'lat': '43.000000'})
+
+    def test_state_centroid_is_computed_from_its_counties_and_stored(self):
+        self.assertEqual(self.serializer.search_local_adm1(self.state), {'lng': '-89.500000', 'lat': '44.500000'})
+        self.state.refresh_from_db()
+        self.assertEqual(self.state.centroid_latitude, Decimal('44.5'))
+        self.assertEqual(self.state.centroid_longitude, Decimal('-89.5'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.serializer.search_local_adm1(self.state)['lat'], '44.500000')
+
+    def test_state_centroid_across_the_antimeridian(self):
+        state = AdministrativeLevelOne.objects.create(name='Alaska', country=self.country)
+        for longitude in [Decimal('172.0'), Decimal('-176.0')]:
+            AdministrativeLevelTwo.objects.create(name=str(longitude), administrative_level_one=state,
+                                                  centroid_latitude=Decimal('60.0'), centroid_longitude=longitude)
+        self.assertEqual(self.serializer.search_local_adm1(state)['lng'], '178.000000')
+
+    def test_state_without_county_centroids_has_no_centroid(self):
+        state = AdministrativeLevelOne.objects.create(name='Minnesota', country=self.country)
+        self.assertIsNone(self.serializer.search_local_adm1(state))
+
+    def test_centroids_are_in_the_event_summary_document(self):
+        event = self.create_event(self.user)
+        self.create_location(event)
+        run_commit_hooks()
+        self.serializer.search_local_adm1(self.state)
+        run_commit_hooks()
+        document = EventSummaryDocument.objects.get(event=event).data
+        self.assertEqual(Decimal(str(document['administrativelevelones'][0]['centroid_latitude'])), Decimal('44.5'))
+        self.assertEqual(Decimal(str(document['administrativeleveltwos'][0]['centroid_longitude'])), Decimal('-89'))
+
+
+class ReferenceDataTests(WhispersTestCase):
+
+    url = '/referencedata/'
+
+    def test_tables_are_listed_with_their_hashes(self):
+        Organization.objects.create(name='Unpublished Organization', do_not_publish=True)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        countries = response.data['tables']['countries']
+        self.assertEqual(len(countries['hash']), 32)
+        self.assertEqual(countries['fields'], ['id', 'name', 'abbreviation', 'calling_code'])
+        self.assertEqual([row[:2] for row in countries['rows']], [[self.country.id, 'United States']])
+        organization_names = [row[1] for row in response.data['tables']['organizations']['rows']]
+        self.assertEqual(organization_names, ['Parent Organization'])
+
+    def test_tables_with_known_hashes_are_not_sent(self):
+        tables = self.client.get(self.url).data['tables']
+        hashes = 'countries:' + tables['countries']['hash'] + ',species:' + tables['species']['hash']
+        response = self.client.get(self.url, {'hashes': hashes})
+        self.assertEqual(response.data['tables']['countries'], {'hash': tables['countries']['hash']})
+        self.assertEqual(response.data['tables']['species'], {'hash': tables['species']['hash']})
+        self.assertIn('rows', response.data['tables']['administrativelevelones'])
+
+    def test_changed_table_is_sent_with_a_new_hash(self):
+        tables = self.client.get(self.url).data['tables']
+        self.country.name = 'United States of America'
+        self.country.save()
+        run_commit_hooks()
+        response = self.client.get(self.url, {'hashes': 'countries:' + tables['countries']['hash']})
+        countries = response.data['tables']['countries']
+        self.assertNotEqual(countries['hash'], tables['countries']['hash'])
+        self.assertEqual(countries['rows'][0][1], 'United States of America')
+
+    def test_unchanged_bundle_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Species.objects.create(name='Mallard')
+        run_commit_hooks()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CountyGeometryTests(WhispersTestCase):
+
+    # a square ring with points along its sides, which only add detail at high zoom levels
+    RING = [[-89.5, 43.0], [-89.4, 43.0001], [-89.3, 43.0], [-89.3, 43.2], [-89.4, 43.2001], [-89.5, 43.2],
+            [-89.5, 43.0]]
+
+    def setUp(self):
+        super(CountyGeometryTests, self).setUp()
+        self.county.points = json.dumps([self.RING])
+        self.county.save()
+        run_commit_hooks()
+        self.url = '/administrativeleveltwos/' + str(self.county.id) + '/geometry/'
+
+    def test_geometry_is_simplified_at_low_zoom_levels(self):
+        self.assertEqual(self.client.get(self.url, {'zoom': 18}).data['points'], [self.RING])
+        self.assertEqual(self.client.get(self.url, {'zoom': 8}).data['points'],
+                         [[[-89.5, 43.0], [-89.3, 43.0], [-89.3, 43.2], [-89.5, 43.2], [-89.5, 43.0]]])
+        self.assertIsInstance(self.client.get(self.url, {'encoding': 'polyline'}).data['points'][0], str)
+
+    def test_unchanged_geometry_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_missing_county_is_not_found_whatever_the_etag(self):
+        url = '/administrativeleveltwos/' + str(self.county.id + 1) + '/geometry/'
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+
+class EventStatisticsTests(WhispersTestCase):
+
+    def setUp(self):
+        super(EventStatisticsTests, self).setUp()
+        diagnosis = Diagnosis.objects.create(
+            name='Avian Botulism', diagnosis_type=DiagnosisType.objects.create(name='Bacteria'))
+        flyway = Flyway.objects.create(name='Mississippi')
+        for month in [6, 6, 7]:
+            event = self.create_event(self.user)
+            location = self.create_location(event, start_date=date(2020, month, 1))
+            EventLocationFlyway.objects.create(event_location=location, flyway=flyway)
+            # two species at one location are still one event of the location's area
+            for name in ['Mallard', 'Canada Goose']:
+                LocationSpecies.objects.create(event_location=location,
+                                               species=Species.objects.get_or_create(name=name)[0])
+            EventDiagnosis.objects.create(event=event, diagnosis=diagnosis, suspect=False)
+        run_commit_hooks()
+
+    def get_statistics(self, params):
+        response = self.client.get('/eventsummaries/statistics/', params)
+        self.assertEqual(response.status_code, 200, params)
+        return response.data
+
+    def test_events_are_counted_once_per_group_of_every_dimension(self):
+        for dimension in EVENT_STATISTICS_DIMENSIONS:
+            data = self.get_statistics({'group_by': dimension})
+            counts = [item['count'] for item in data]
+            self.assertEqual(counts, [3, 3] if dimension == 'species' else [3], dimension)
+
+    def test_events_are_counted_per_time_bucket(self):
+        data = self.get_statistics({'group_by': 'flyway', 'bucket': 'month'})
+        self.assertEqual([(str(item['bucket']), item['count']) for item in data],
+                         [('2020-06-01', 2), ('2020-07-01', 1)])
+
+    def test_invalid_dimensions_are_rejected(self):
+        self.assertEqual(self.client.get('/eventsummaries/statistics/', {'group_by': 'colour'}).status_code, 400)
+
+
+class EventClusterTests(WhispersTestCase):
+
+    def setUp(self):
+        super(EventClusterTests, self).setUp()
+        self.county.centroid_latitude = Decimal('43.067468')
+        self.county.centroid_longitude = Decimal('-89.417852')
+        self.county.save()
+        # two events in Madison (one of them mapped at its county centroid), one in Milwaukee, and a private one
+        self.create_location(self.create_event(self.user), latitude=Decimal('43.073051'),
+                             longitude=Decimal('-89.401230'))
+        self.create_location(self.create_event(self.user))
+        self.create_location(self.create_event(self.user), latitude=Decimal('43.038902'),
+                             longitude=Decimal('-87.906471'))
+        self.create_location(self.create_event(self.user, public=False), latitude=Decimal('43.073051'),
+                             longitude=Decimal('-89.401230'))
+        run_commit_hooks()
+
+    def get_event_counts(self, params):
+        response = self.client.get('/eventsummaries/clusters/', params)
+        self.assertEqual(response.status_code, 200, params)
+        return sorted(item['event_count'] for item in response.data)
+
+    def test_nearby_locations_are_clustered_at_low_zoom_levels(self):
+        self.assertEqual(self.get_event_counts({'zoom': 3}), [3])
+        self.assertEqual(self.get_event_counts({'zoom': 8}), [1, 2])
+        self.assertEqual(self.get_event_counts({'zoom': 16}), [1, 1, 1])
+
+    def test_clusters_are_limited_to_the_bounding_box(self):
+        self.assertEqual(self.get_event_counts({'zoom': 16, 'bbox': '-89.5,43.0,-89.3,43.1'}), [1, 1])
+
+    def test_private_events_are_clustered_for_their_owner(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.get_event_counts({'zoom': 3}), [4])
+
+
+class EventLocationFilterTests(WhispersTestCase):
+
+    def setUp(self):
+        super(EventLocationFilterTests, self).setUp()
+        # an event in Madison, one in Milwaukee, and one in Minneapolis
+        self.madison = self.create_event(self.user)
+        self.create_location(self.madison, latitude=Decimal('43.073051'), longitude=Decimal('-89.401230'))
+        self.milwaukee = self.create_event(self.user)
+        self.create_location(self.milwaukee, latitude=Decimal('43.038902'), longitude=Decimal('-87.906471'))
+        self.minneapolis = self.create_event(self.user)
+        self.create_location(self.minneapolis, latitude=Decimal('44.977753'), longitude=Decimal('-93.265011'))
+        run_commit_hooks()
+
+    def get_event_ids(self, params):
+        response = self.client.get('/eventsummaries/', params)
+        self.assertEqual(response.status_code, 200, params)
+        return sorted(event['id'] for event in response.data['results'])
+
+    def test_events_are_filtered_by_bounding_box(self):
+        self.assertEqual(self.get_event_ids({'bbox': '-90.0,42.5,-87.5,43.5'}),
+                         sorted([self.madison.id, self.milwaukee.id]))
+
+    def test_events_are_filtered_by_distance_from_a_point(self):
+        # Milwaukee is about 120 kilometers from Madison
+        self.assertEqual(self.get_event_ids({'point': '-89.4,43.07', 'radius': '50'}), [self.madison.id])
+        self.assertEqual(self.get_event_ids({'point': '-89.4,43.07', 'radius': '150'}),
+                         sorted([self.madison.id, self.milwaukee.id]))
+
+    def test_events_are_filtered_by_polygon(self):
+        # a triangle around Madison and Minneapolis, whose bounding box also contains Milwaukee
+        self.assertEqual(self.get_event_ids({'polygon': '-89.0,42.5,-96.0,45.5,-87.0,45.5'}),
+                         sorted([self.madison.id, self.minneapolis.id]))
+
+    def test_invalid_coordinates_are_rejected(self):
+        for params in [{'bbox': '-90.0,42.5'}, {'point': '-89.4,43.07'}, {'point': '-89.4,43.07', 'radius': '-1'},
+                       {'polygon': '-90.0,42.5,-94.0,45.5'}, {'polygon': '-90.0,42.5,-94.0,95.5,-89.0,45.5'}]:
+            self.assertEqual(self.client.get('/eventsummaries/', params).status_code, 400, params)
+
+
+class TextSearchTests(WhispersTestCase):
+
+    def setUp(self):
+        super(TextSearchTests, self).setUp()
+        self.event = self.create_event(self.user)
+        self.event.event_reference = 'Lake Mendota die-off'
+        self.event.save()
+        self.create_event(self.user)
+        comment_type = CommentType.objects.create(name='Other')
+        self.comment = Comment.objects.create(
+            content_object=self.event, comment='Suspected <b>botulism</b> & lead poisoning', comment_type=comment_type,
+            created_by=self.user, modified_by=self.user)
+        Comment.objects.create(content_object=self.event, comment='No carcasses found', comment_type=comment_type,
+                               created_by=self.user, modified_by=self.user)
+        run_commit_hooks()
+
+    def get_results(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'] if 'results' in response.data else response.data
+
+    def test_comments_are_searched_with_escaped_snippets(self):
+        self.client.force_authenticate(self.user)
+        results = self.get_results('/comments/', {'search': 'botulism'})
+        self.assertEqual([result['id'] for result in results], [self.comment.id])
+        self.assertEqual(results[0]['search_snippet'],
+                         'Suspected &lt;b&gt;<mark>botulism</mark>&lt;/b&gt; &amp; lead poisoning')
+        self.assertGreater(results[0]['search_rank'], 0)
+
+    def test_comments_are_searched_by_word_stems(self):
+        self.client.force_authenticate(self.user)
+        results = self.get_results('/comments/', {'search': 'poisoned'})
+        self.assertEqual([result['id'] for result in results], [self.comment.id])
+
+    def test_event_references_are_searched_by_partners_only(self):
+        self.assertEqual(self.get_results('/eventsummaries/', {'search': 'mendota'}), [])
+        self.client.force_authenticate(self.user)
+        results = self.get_results('/eventsummaries/', {'search': 'mendota'})
+        self.assertEqual([result['id'] for result in results], [self.event.id])
+
+
+class TypeaheadTests(WhispersTestCase):
+
+    def setUp(self):
+        super(TypeaheadTests, self).setUp()
+        for name, latin_name in [('Canada Goose', 'Branta canadensis'), ('Mandarin Duck', 'Aix galericulata'),
+                                 ('Mallard', 'Anas platyrhynchos')]:
+            Species.objects.create(name=name, species_latin_name=latin_name)
+
+    def get_names(self, url, params, field='name'):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, params)
+        return [item[field] for item in response.data]
+
+    def test_prefixes_match(self):
+        self.assertEqual(sorted(self.get_names('/species/typeahead/', {'q': 'ma'})), ['Mallard', 'Mandarin Duck'])
+        self.assertEqual(len(self.get_names('/species/typeahead/', {'q': 'ma', 'limit': '1'})), 1)
+
+    def test_similar_and_scientific_names_match(self):
+        self.assertEqual(self.get_names('/species/typeahead/', {'q': 'mallrd'}), ['Mallard'])
+        self.assertEqual(self.get_names('/species/typeahead/', {'q': 'anas'}), ['Mallard'])
+
+    def test_search_is_required(self):
+        self.assertEqual(self.client.get('/species/typeahead/').status_code, 400)
+
+    def test_contacts_of_other_organizations_are_left_out(self):
+        other_user = self.create_user('other', Organization.objects.create(name='Other Organization'))
+        for user in [self.user, other_user]:
+            Contact.objects.create(first_name='Jane', last_name=user.username, created_by=user, modified_by=user)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.get_names('/contacts/typeahead/', {'q': 'jan'}, 'last_name'), ['owner'])
+        self.assertEqual(self.get_names('/organizations/typeahead/', {'q': 'other'}), ['Other Organization'])
+
+
+class PartitionHistoryTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['eventsummaries'].clear()
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password',
+                                             role=Role.objects.create(name='Partner'))
+        self.event = Event.objects.create(
+            event_type=EventType.objects.create(name='Mortality/Morbidity'),
+            event_status=EventStatus.objects.create(name='Draft'),
+            legal_status=LegalStatus.objects.create(name='N/A'), created_by=self.user, modified_by=self.user)
+
+    def get_relkind(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+            return cursor.fetchone()[0]
+
+    def test_history_tables_are_partitioned_and_keep_their_rows(self):
+        call_command('partition_history', stdout=io.StringIO())
+        for model_name in settings.HISTORY_PARTITIONED_MODELS:
+            table = apps.get_model('whispersservices', model_name).history.model._meta.db_table
+            self.assertEqual(self.get_relkind(table), 'p', table)
+        self.assertEqual(self.event.history.count(), 1)
+
+        # history rows still insert (into the partition of this month) and query
+        self.event.event_reference = 'Partitioned'
+        self.event.save()
+        history = self.event.history.filter(history_date__gte=timezone.now() - timedelta(hours=1))
+        self.assertEqual([record.event_reference for record in history], ['Partitioned', ''])
+
+        # running the command again leaves the partitioned tables as they are
+        call_command('partition_history', stdout=io.StringIO())
+        self.assertEqual(self.event.history.count(), 2)
 
-# Create your tests here.
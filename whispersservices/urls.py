@@ -57,6 +57,8 @@ router.register(r'organizations', views.OrganizationViewSet, 'organizations')
 router.register(r'contacts', views.ContactViewSet, 'contacts')
 router.register(r'contacttypes', views.ContactTypeViewSet, 'contacttypes')
 router.register(r'searches', views.SearchViewSet, 'searches')
+router.register(r'notifications', views.NotificationViewSet, 'notifications')
+router.register(r'referencedata', views.ReferenceDataViewSet, 'referencedata')
 
 urlpatterns = [
     url(r'^', include(router.urls)),
@@ -1,18 +1,35 @@
 import re
-from datetime import datetime as dt
+import json
+import base64
+import hashlib
+import math
+from datetime import datetime as dt, timedelta
 from collections import OrderedDict
 from django.core.mail import EmailMessage
+from django.core.cache import cache, caches
 from django.utils import timezone
-from django.db.models import Count, Q
-from django.db.models.functions import Now
+from django.utils.dateparse import parse_datetime
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.http import StreamingHttpResponse
+from django.db import connection
+from django.db.models import Count, Sum, Avg, F, Q, Func, Value, Prefetch, prefetch_related_objects
+from django.db.models import Case, When, BooleanField, FloatField, IntegerField, TextField, OuterRef, Subquery
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Now, Trunc, Substr, Replace, Cast, Greatest, Least
+from django.db.models.functions import Radians, Sin, Cos, ASin, Sqrt, Power
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
 from rest_framework import views, viewsets, authentication, filters
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.parsers import BaseParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.exceptions import PermissionDenied, APIException, NotFound
 from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+from rest_framework.utils.urls import replace_query_param
 from rest_framework_csv import renderers as csv_renderers
 from whispersservices.serializers import *
 from whispersservices.models import *
@@ -53,6 +70,86 @@ class PlainTextParser(BaseParser):
 
 PK_REQUESTS = ['retrieve', 'update', 'partial_update', 'destroy']
 LIST_DELIMETER = ','
+NOT_SEARCH_PARAMS = [
+    'no_page', 'page', 'page_size', 'format', 'slim', 'ordering', 'since', 'group_by', 'bucket', 'zoom']
+# the dimensions event statistics can be grouped by, and the path from an event to each
+EVENT_STATISTICS_DIMENSIONS = OrderedDict([
+    ('event_type', 'event_type'),
+    ('event_status', 'event_status'),
+    ('complete', 'complete'),
+    ('diagnosis', 'eventdiagnoses__diagnosis'),
+    ('diagnosis_type', 'eventdiagnoses__diagnosis__diagnosis_type'),
+    ('species', 'eventlocations__locationspecies__species'),
+    ('country', 'eventlocations__country'),
+    ('administrative_level_one', 'eventlocations__administrative_level_one'),
+    ('administrative_level_two', 'eventlocations__administrative_level_two'),
+    ('flyway', 'eventlocations__flyways'),
+])
+EVENT_STATISTICS_BUCKETS = ['day', 'week', 'month', 'quarter', 'year']
+# the mean radius of the earth in kilometers
+EARTH_RADIUS = 6371.0088
+# the characters escaped in HTML text, and their entities (the ampersand first, so that no entity is escaped again)
+HTML_ESCAPES = [('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#39;')]
+TYPEAHEAD_DEFAULT_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+# the models in the change history of an event, each with the model of its parent record and the field referring to it
+# (parents come before their children; comments are found through the models they can be attached to)
+EVENT_HISTORY_MODELS = OrderedDict([
+    (Event, (None, None)),
+    (EventEventGroup, (Event, 'event_id')),
+    (EventOrganization, (Event, 'event_id')),
+    (EventContact, (Event, 'event_id')),
+    (EventLocation, (Event, 'event_id')),
+    (EventLocationContact, (EventLocation, 'event_location_id')),
+    (EventLocationFlyway, (EventLocation, 'event_location_id')),
+    (LocationSpecies, (EventLocation, 'event_location_id')),
+    (EventDiagnosis, (Event, 'event_id')),
+    (SpeciesDiagnosis, (LocationSpecies, 'location_species_id')),
+    (SpeciesDiagnosisOrganization, (SpeciesDiagnosis, 'species_diagnosis_id')),
+    (ServiceRequest, (Event, 'event_id')),
+    (EventReadUser, (Event, 'event_id')),
+    (EventWriteUser, (Event, 'event_id')),
+    (EventReadCircle, (Event, 'event_id')),
+    (EventWriteCircle, (Event, 'event_id')),
+])
+EVENT_HISTORY_COMMENTED_MODELS = [Event, EventEventGroup, EventLocation, ServiceRequest]
+# the serializers non-admins get for the records in the history of an event, whose fields are the only changes
+# reported to them (the collaborator and circle relates have no private fields, so all their changes are reported)
+EVENT_HISTORY_SERIALIZERS = {
+    Event: EventSerializer,
+    EventEventGroup: EventEventGroupPublicSerializer,
+    EventOrganization: EventOrganizationSerializer,
+    EventContact: EventContactSerializer,
+    EventLocation: EventLocationSerializer,
+    EventLocationContact: EventLocationContactSerializer,
+    EventLocationFlyway: EventLocationFlywaySerializer,
+    LocationSpecies: LocationSpeciesSerializer,
+    EventDiagnosis: EventDiagnosisSerializer,
+    SpeciesDiagnosis: SpeciesDiagnosisSerializer,
+    SpeciesDiagnosisOrganization: SpeciesDiagnosisOrganizationSerializer,
+    ServiceRequest: ServiceRequestSerializer,
+    Comment: CommentSerializer,
+}
+# the fields that are not reported as changes, because every change record already has its own ID, date, and user
+HISTORY_UNREPORTED_FIELDS = ['id', 'modified_date', 'modified_by']
+HISTORY_TYPES = {'+': 'Created', '~': 'Changed', '-': 'Deleted'}
+GEOMETRY_CACHE_MAX_AGE = 60 * 60 * 24 * 7
+GEOMETRY_ENCODINGS = ['json', 'polyline']
+# the number of objects serialized and encoded at a time in a streamed (no_page) list response
+STREAM_CHUNK_SIZE = 500
+
+
+def get_search_params(query_params):
+    # normalize the query_params so that the same filters in any order (or with paging params) are equal
+    if not query_params:
+        return {}
+    return OrderedDict(sorted((key, value) for key, value in query_params.items() if key not in NOT_SEARCH_PARAMS))
+
+
+def get_event_data_cache_key(prefix, key_data):
+    # include the event data version so that cached values are never served after a write to the event tree
+    key_data = json.dumps([get_event_data_version()] + key_data)
+    return 'whispers_' + prefix + '_' + hashlib.md5(key_data.encode('utf-8')).hexdigest()
 
 
 def get_request_user(request):
@@ -62,6 +159,54 @@ def get_request_user(request):
         return None
 
 
+# return the filter of the events owned by the user or the user's org (or its sub-orgs), or shared with the user
+# (the collaborators and circle members are matched by subquery, so that the filter also applies to event history)
+def get_user_events_filter(user):
+    return (Q(created_by__exact=user.id)
+            | Q(created_by__organization__in=get_sub_organizations(user.organization.id))
+            | Q(id__in=EventReadUser.objects.filter(user=user.id).values('event'))
+            | Q(id__in=EventWriteUser.objects.filter(user=user.id).values('event'))
+            | Q(id__in=EventCircleUser.objects.filter(user=user.id).values('event')))
+
+
+def can_stream_list(request):
+    # unpaginated lists requested as plain (not indented) JSON can be streamed
+    return (request is not None and 'no_page' in request.query_params
+            and isinstance(request.accepted_renderer, JSONRenderer)
+            and request.accepted_renderer.get_indent(request.accepted_media_type, {}) is None)
+
+
+def stream_json_list(request, queryset, serializer_class, context):
+    # stream a queryset as a JSON array, serializing and encoding STREAM_CHUNK_SIZE objects at a time,
+    # so that neither the whole list nor its whole encoding is ever held in memory
+    # (each chunk is fetched by primary key from the same queryset, so its prefetches still apply,
+    # and encoded by the accepted JSON renderer, so the response has the same bytes it would have if not streamed)
+    renderer = request.accepted_renderer
+    separator = b',' if renderer.compact else b', '
+    pks = list(OrderedDict.fromkeys(queryset.values_list('pk', flat=True)))
+
+    def stream():
+        yield b'['
+        first = True
+        for start in range(0, len(pks), STREAM_CHUNK_SIZE):
+            chunk_pks = pks[start:start + STREAM_CHUNK_SIZE]
+            objs = {obj.pk: obj for obj in queryset.filter(pk__in=chunk_pks)}
+            # (objects deleted since the primary keys were listed are left out)
+            objs = [objs[pk] for pk in chunk_pks if pk in objs]
+            if not objs:
+                continue
+            data = serializer_class(objs, many=True, context=context).data
+            elements = renderer.render(data, request.accepted_media_type, {'request': request})[1:-1]
+            yield elements if first else separator + elements
+            first = False
+        yield b']'
+
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type += '; charset=' + renderer.charset
+    return StreamingHttpResponse(stream(), content_type=content_type, status=200)
+
+
 def construct_email(request_data, requester_email, message):
     # construct and send the request email
     subject = "Assistance Request"
@@ -75,15 +220,232 @@ def construct_email(request_data, requester_email, message):
     headers = None  # {'Message-ID': 'foo'}
     email = EmailMessage(subject, body, from_address, to_list, bcc_list, reply_to=reply_list, headers=headers)
     if settings.ENVIRONMENT in ['production', 'test']:
-        try:
-            email.send(fail_silently=False)
-            return Response({"status": 'email sent'}, status=200)
-        except TypeError:
-            return Response({"status": "send email failed, please contact the administrator."}, status=500)
+        queue_email(email)
+        return Response({"status": 'email sent'}, status=200)
     else:
         return Response(email.__dict__, status=200)
 
 
+def simplify_ring(ring, tolerance):
+    # simplify a list of coordinate pairs with the Douglas-Peucker algorithm, keeping the first and last pairs
+    if tolerance <= 0 or len(ring) < 3:
+        return ring
+    keep = [False] * len(ring)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = ring[first][:2], ring[last][:2]
+        dx, dy = x2 - x1, y2 - y1
+        length = (dx * dx + dy * dy) ** 0.5
+        max_distance = 0
+        max_index = first
+        for i in range(first + 1, last):
+            x, y = ring[i][:2]
+            if length == 0:
+                distance = ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+            else:
+                distance = abs(dy * x - dx * y + x2 * y1 - y2 * x1) / length
+            if distance > max_distance:
+                max_distance = distance
+                max_index = i
+        if max_distance > tolerance:
+            keep[max_index] = True
+            stack.append((first, max_index))
+            stack.append((max_index, last))
+    simplified = [pair for pair, kept in zip(ring, keep) if kept]
+    # a closed ring needs at least four pairs to remain a polygon
+    return simplified if len(simplified) >= 4 or len(simplified) == len(ring) else ring
+
+
+def encode_polyline(ring, precision=5):
+    # encode a list of coordinate pairs (in their stored order) with the encoded polyline algorithm
+    factor = 10 ** precision
+    encoded = []
+    previous = [0, 0]
+    for pair in ring:
+        for i in range(2):
+            value = int(round(pair[i] * factor))
+            delta = value - previous[i]
+            previous[i] = value
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                encoded.append(chr((0x20 | (delta & 0x1f)) + 63))
+                delta >>= 5
+            encoded.append(chr(delta + 63))
+    return ''.join(encoded)
+
+
+def transform_geometry(geometry, tolerance, encoding):
+    # walk the nested lists of a geometry down to its rings (lists of coordinate pairs) and simplify and encode them
+    if geometry and all(isinstance(item, list) and item and not isinstance(item[0], list) for item in geometry):
+        ring = simplify_ring(geometry, tolerance)
+        return encode_polyline(ring) if encoding == 'polyline' else [[round(c, 6) for c in pair] for pair in ring]
+    return [transform_geometry(item, tolerance, encoding) for item in geometry]
+
+
+def encode_history_cursor(record):
+    # a history cursor is the position of a historical record in the timeline (newest first):
+    # its date, then its model name, then its history ID (to order records of the same date)
+    model_name = record.instance_type._meta.model_name
+    position = '|'.join([record.history_date.isoformat(), model_name, str(record.history_id)])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_history_cursor(cursor):
+    try:
+        history_date, model_name, history_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        history_date = parse_datetime(history_date)
+        history_id = int(history_id)
+    except ValueError:
+        history_date = None
+    if history_date is None:
+        raise serializers.ValidationError({"cursor": "cursor must be the cursor of a previous page"})
+    return history_date, model_name, history_id
+
+
+def get_history_changes(record, previous_record, reported_fields=None):
+    # the fields of a historical record whose values differ from those of the previous record of the same object
+    # (all the fields with values for a record without a previous record), optionally only among the reported fields
+    changes = []
+    for field in record.instance_type._meta.concrete_fields:
+        if (field.editable and field.name not in HISTORY_UNREPORTED_FIELDS
+                and (reported_fields is None or field.name in reported_fields)):
+            old_value = getattr(previous_record, field.attname) if previous_record is not None else None
+            new_value = getattr(record, field.attname)
+            if old_value != new_value:
+                changes.append({"field": field.name, "old": old_value, "new": new_value})
+    return changes
+
+
+def parse_coordinates(param_name, value, min_count, max_count=None):
+    # parse a list of coordinates (longitude and latitude pairs, flattened) from a query param
+    try:
+        coordinates = [float(item) for item in value.split(LIST_DELIMETER)]
+    except ValueError:
+        coordinates = []
+    max_count = max_count or len(coordinates)
+    if len(coordinates) % 2 != 0 or not min_count <= len(coordinates) // 2 <= max_count or any(
+            not -180 <= coordinates[i] <= 180 or not -90 <= coordinates[i + 1] <= 90
+            for i in range(0, len(coordinates) - 1, 2)):
+        raise serializers.ValidationError(
+            {param_name: param_name + " must be a list of longitude,latitude pairs (in degrees)"})
+    return coordinates
+
+
+def filter_event_locations_in_bbox(queryset, bbox):
+    # filter event locations to those mapped inside a bounding box (min longitude, min latitude, max longitude, max
+    # latitude), using the index on the map points
+    min_longitude, min_latitude, max_longitude, max_latitude = bbox
+    queryset = queryset.filter(map_latitude__gte=min_latitude, map_latitude__lte=max_latitude)
+    if min_longitude <= max_longitude:
+        return queryset.filter(map_longitude__gte=min_longitude, map_longitude__lte=max_longitude)
+    # the bounding box crosses the antimeridian
+    return queryset.filter(Q(map_longitude__gte=min_longitude) | Q(map_longitude__lte=max_longitude))
+
+
+def filter_event_locations_near(queryset, longitude, latitude, radius):
+    # filter event locations to those mapped within a radius (in kilometers) of a point,
+    # first to the bounding box of the circle (using the index on the map points), then by great-circle distance
+    latitude_delta = math.degrees(radius / EARTH_RADIUS)
+    min_latitude, max_latitude = max(latitude - latitude_delta, -90.0), min(latitude + latitude_delta, 90.0)
+    if min_latitude == -90.0 or max_latitude == 90.0:
+        # the circle contains a pole, so it spans every longitude
+        min_longitude, max_longitude = -180.0, 180.0
+    else:
+        longitude_delta = math.degrees(math.asin(
+            min(math.sin(radius / EARTH_RADIUS) / math.cos(math.radians(latitude)), 1.0)))
+        # wrap around the antimeridian
+        min_longitude = longitude - longitude_delta
+        min_longitude = min_longitude + 360 if min_longitude < -180 else min_longitude
+        max_longitude = longitude + longitude_delta
+        max_longitude = max_longitude - 360 if max_longitude > 180 else max_longitude
+    queryset = filter_event_locations_in_bbox(queryset, [min_longitude, min_latitude, max_longitude, max_latitude])
+
+    # the haversine formula (with the haversine clamped to 1, since rounding can push it just above 1 for points
+    # nearly opposite each other on the earth, which would be out of the domain of the arcsine)
+    map_latitude = Radians(Cast('map_latitude', FloatField()))
+    map_longitude = Radians(Cast('map_longitude', FloatField()))
+    haversine = (Power(Sin((map_latitude - math.radians(latitude)) / 2), 2)
+                 + math.cos(math.radians(latitude)) * Cos(map_latitude)
+                 * Power(Sin((map_longitude - math.radians(longitude)) / 2), 2))
+    distance = 2 * EARTH_RADIUS * ASin(Least(Sqrt(haversine), 1.0))
+    return queryset.annotate(distance=distance).filter(distance__lte=radius)
+
+
+class PolygonContainsPoint(Func):
+    """
+    Whether a PostgreSQL polygon (in its text form) contains the point of a longitude and a latitude expression
+    """
+
+    arg_joiner = ' @> '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+    def __init__(self, polygon_text, longitude, latitude):
+        super(PolygonContainsPoint, self).__init__(
+            Func(Value(polygon_text), template='CAST(%(expressions)s AS polygon)', output_field=TextField()),
+            Func(Cast(longitude, FloatField()), Cast(latitude, FloatField()), function='point',
+                 output_field=TextField()))
+
+
+def filter_event_locations_in_polygon(queryset, polygon):
+    # filter event locations to those mapped inside a polygon (a flattened list of longitude and latitude pairs),
+    # first to the bounding box of the polygon (using the index on the map points), then with the PostgreSQL
+    # geometric polygon type (which treats coordinates as planar, so polygons should not cross the antimeridian)
+    longitudes = polygon[0::2]
+    latitudes = polygon[1::2]
+    queryset = filter_event_locations_in_bbox(
+        queryset, [min(longitudes), min(latitudes), max(longitudes), max(latitudes)])
+    polygon_text = '(' + ','.join('(%s,%s)' % (lon, lat) for lon, lat in zip(longitudes, latitudes)) + ')'
+    return queryset.annotate(
+        in_polygon=PolygonContainsPoint(polygon_text, F('map_longitude'), F('map_latitude'))).filter(in_polygon=True)
+
+
+def search_text(queryset, search, text_field=None):
+    # filter a queryset of a model with a search vector to the rows matching a full-text search, ordered by rank,
+    # optionally with a snippet of the text with the matching words highlighted
+    # (the text is HTML escaped before it is highlighted, so that the highlight tags are the only markup in the snippet)
+    query = SearchQuery(search, config=TEXT_SEARCH_CONFIG)
+    queryset = queryset.filter(search_vector=query).annotate(search_rank=SearchRank(F('search_vector'), query))
+    if text_field is not None:
+        text = F(text_field)
+        for character, entity in HTML_ESCAPES:
+            text = Replace(text, Value(character), Value(entity))
+        queryset = queryset.annotate(search_snippet=Func(
+            Value(TEXT_SEARCH_CONFIG), text, query, Value('StartSel=<mark>, StopSel=</mark>, MaxFragments=3'),
+            function='ts_headline', output_field=TextField()))
+    return queryset.order_by('-search_rank', 'id')
+
+
+def search_typeahead(queryset, query_params, fields):
+    # filter a queryset to a few rows with any of the fields starting with (or similar to) the 'q' param,
+    # prefix matches first, then by trigram similarity, both matches being served by the trigram indexes on the fields
+    search = query_params.get('q', '') if query_params else ''
+    if search.strip() == '':
+        raise serializers.ValidationError({"q": "q is required"})
+    limit = query_params.get('limit', None)
+    limit = min(int(limit), TYPEAHEAD_MAX_LIMIT) if limit is not None and limit.isdigit() else TYPEAHEAD_DEFAULT_LIMIT
+
+    # (the trigram indexes serve ILIKE, but not the UPPER() LIKE of the istartswith lookup)
+    prefix = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    prefixes = {}
+    prefix_match = Q()
+    similar_match = Q()
+    for field in fields:
+        column = connection.ops.quote_name(queryset.model._meta.db_table) + '.' + connection.ops.quote_name(
+            queryset.model._meta.get_field(field).column)
+        prefixes['typeahead_' + field + '_prefix'] = RawSQL(column + ' ILIKE %s', (prefix,), output_field=BooleanField())
+        prefix_match |= Q(**{'typeahead_' + field + '_prefix': True})
+        similar_match |= Q(**{field + '__trigram_similar': search})
+    similarities = [TrigramSimilarity(field, search) for field in fields]
+    similarity = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+    queryset = queryset.annotate(**prefixes).filter(prefix_match | similar_match).annotate(
+        typeahead_prefix=Case(When(prefix_match, then=Value(1)), default=Value(0), output_field=IntegerField()),
+        typeahead_similarity=similarity)
+    return queryset.order_by('-typeahead_prefix', '-typeahead_similarity', 'id')[:limit]
+
+
 ######
 #
 #  Abstract Base Classes
@@ -100,11 +462,76 @@ class AuthLastLoginMixin(object):
         user = request.user
         if user.is_authenticated:
             user.last_login = timezone.now()
-            user.save(update_fields=['last_login'])
+            with system_change(user):
+                user.save(update_fields=['last_login'])
         return super(AuthLastLoginMixin, self).finalize_response(request, *args, **kwargs)
 
 
-class HistoryViewSet(AuthLastLoginMixin, viewsets.ModelViewSet):
+class EventConditionalRetrieveMixin(object):
+    """
+    This class will add ETag and Last-Modified headers to retrieved events,
+    and return a 304 (Not Modified) response without serializing anything when the requester already has this version
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        # look up the object first to ensure the requester is permitted to see it
+        instance = self.get_object()
+        user = get_request_user(request)
+
+        # the same version of an event is serialized differently for different users, serializers, formats,
+        # and query params
+        event_version = get_event_version(instance.id)
+        lookup_version = get_event_lookup_version()
+        etag_data = json.dumps([
+            event_version, lookup_version, self.__class__.__name__, self.get_serializer_class().__name__,
+            request.accepted_renderer.format,
+            sorted(request.query_params.lists()),
+            [user.id, user.role_id, user.organization_id] if user and user.is_authenticated else None])
+        etag = quote_etag(hashlib.md5(etag_data.encode('utf-8')).hexdigest())
+        last_modified = int(max(event_version[1], lookup_version[1]))
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            # only load the related objects once it is known that the event will be serialized
+            prefetch_related_objects([instance], *self.get_prefetch_lookups())
+            serializer = self.get_serializer(instance)
+            response = Response(serializer.data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # ensure a browser never reuses the version it has for one user for a different user
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return response
+
+    # the related lookups to load for a retrieved event (none by default)
+    def get_prefetch_lookups(self):
+        return []
+
+
+class StreamingListMixin(object):
+    """
+    This class will stream unpaginated (no_page) JSON list responses, serializing and encoding a chunk at a time
+    """
+
+    def list(self, request, *args, **kwargs):
+        if can_stream_list(request):
+            queryset = self.filter_queryset(self.get_queryset())
+            return stream_json_list(request, queryset, self.get_serializer_class(), self.get_serializer_context())
+        return super(StreamingListMixin, self).list(request, *args, **kwargs)
+
+
+class BufferedHistoryMixin(object):
+    """
+    This class will collect the history written by each write request and record it in bulk when the request commits
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return super(BufferedHistoryMixin, self).dispatch(request, *args, **kwargs)
+        with buffered_history():
+            return super(BufferedHistoryMixin, self).dispatch(request, *args, **kwargs)
+
+
+class HistoryViewSet(BufferedHistoryMixin, StreamingListMixin, AuthLastLoginMixin, viewsets.ModelViewSet):
     """
     This class will automatically assign the User ID to the created_by and modified_by history fields when appropriate
     """
@@ -134,7 +561,7 @@ class HistoryViewSet(AuthLastLoginMixin, viewsets.ModelViewSet):
         return super().paginate_queryset(*args, **kwargs)
 
 
-class ReadOnlyHistoryViewSet(AuthLastLoginMixin, viewsets.ReadOnlyModelViewSet):
+class ReadOnlyHistoryViewSet(StreamingListMixin, AuthLastLoginMixin, viewsets.ReadOnlyModelViewSet):
     """
     This class will only allow GET requests (list and retrieve)
     """
@@ -158,7 +585,7 @@ class ReadOnlyHistoryViewSet(AuthLastLoginMixin, viewsets.ReadOnlyModelViewSet):
 ######
 
 
-class EventViewSet(HistoryViewSet):
+class EventViewSet(EventConditionalRetrieveMixin, HistoryViewSet):
     """
     list:
     Returns a list of all events.
@@ -177,6 +604,10 @@ class EventViewSet(HistoryViewSet):
     
     delete:
     Deletes an event.
+    
+    history:
+    Returns the change history of an event and all its records (newest first) with the fields changed by each change,
+    optionally within a time range ('since' and 'until' params), one page at a time (follow the 'next' URL).
     """
 
     # TODO: would this be true?
@@ -200,6 +631,108 @@ class EventViewSet(HistoryViewSet):
 
         return super(EventViewSet, self).destroy(request, *args, **kwargs)
 
+    @action(detail=True)
+    def history(self, request, pk=None):
+        user = get_request_user(request)
+        event = Event.objects.filter(id=pk).first() if pk is not None and pk.isdigit() else None
+        if event is None:
+            raise NotFound
+        # the history includes the records of the event, so only those who can see them can see it
+        # (and non-admins only see the changes of the fields their serializers of those records have)
+        if not user or not user.is_authenticated or user.role.is_public:
+            raise PermissionDenied
+        is_admin = user.role.is_superadmin or user.role.is_admin
+        if not (is_admin or determine_permission_source(user, event)):
+            raise PermissionDenied
+
+        query_params = request.query_params
+        paginator = StandardResultsSetPagination()
+        page_size = query_params.get('page_size', None)
+        page_size = min(int(page_size), paginator.max_page_size) if page_size and page_size.isdigit() else None
+        page_size = page_size or paginator.page_size
+        time_range = {}
+        for param, lookup in [('since', 'history_date__gt'), ('until', 'history_date__lte')]:
+            value = query_params.get(param, None)
+            if value:
+                try:
+                    value = parse_datetime(value)
+                except ValueError:
+                    value = None
+                if value is None:
+                    raise serializers.ValidationError({param: param + " must be an ISO 8601 date and time"})
+                time_range[lookup] = timezone.make_aware(value, timezone.utc) if timezone.is_naive(value) else value
+        cursor = query_params.get('cursor', None)
+        cursor = decode_history_cursor(cursor) if cursor else None
+
+        # find all the records of the event, including deleted ones, from the parent keys in the history tables
+        record_ids = OrderedDict([(Event, {event.id})])
+        for model, (parent_model, parent_field) in EVENT_HISTORY_MODELS.items():
+            if parent_model is not None:
+                parent_ids = record_ids[parent_model]
+                record_ids[model] = set(model.history.filter(**{parent_field + '__in': parent_ids}).order_by(
+                    ).values_list('id', flat=True).distinct()) if parent_ids else set()
+        comments = Q()
+        for model in EVENT_HISTORY_COMMENTED_MODELS:
+            if record_ids[model]:
+                comments |= Q(content_type=ContentType.objects.get_for_model(model), object_id__in=record_ids[model])
+        record_ids[Comment] = set(Comment.history.filter(comments).order_by().values_list(
+            'id', flat=True).distinct()) if comments else set()
+
+        # read the next page of the timeline of each model (newest first) by record and date, then merge them
+        records = []
+        for model, ids in record_ids.items():
+            if not ids:
+                continue
+            history = model.history.filter(id__in=ids, **time_range)
+            if cursor is not None:
+                cursor_date, cursor_model_name, cursor_history_id = cursor
+                model_name = model._meta.model_name
+                if model_name > cursor_model_name:
+                    history = history.filter(history_date__lt=cursor_date)
+                elif model_name == cursor_model_name:
+                    history = history.filter(
+                        Q(history_date__lt=cursor_date) | Q(history_date=cursor_date, history_id__lt=cursor_history_id))
+                else:
+                    history = history.filter(history_date__lte=cursor_date)
+            previous = model.history.filter(id=OuterRef('id')).filter(
+                Q(history_date__lt=OuterRef('history_date'))
+                | Q(history_date=OuterRef('history_date'), history_id__lt=OuterRef('history_id'))
+            ).order_by('-history_date', '-history_id').values('history_id')[:1]
+            history = history.annotate(previous_history_id=Subquery(previous)).select_related('history_user')
+            records.extend(history.order_by('-history_date', '-history_id')[:page_size + 1])
+        records.sort(key=lambda record: (record.history_date, record.instance_type._meta.model_name,
+                                         record.history_id), reverse=True)
+        has_next = len(records) > page_size
+        records = records[:page_size]
+
+        # compute the field changes of the page from the previous records, read with one query per model
+        previous_ids = {}
+        for record in records:
+            if record.previous_history_id is not None:
+                previous_ids.setdefault(record.instance_type, []).append(record.previous_history_id)
+        previous_records = {}
+        for model, history_ids in previous_ids.items():
+            for previous_record in model.history.filter(history_id__in=history_ids):
+                previous_records[(model, previous_record.history_id)] = previous_record
+        results = []
+        for record in records:
+            previous_record = previous_records.get((record.instance_type, record.previous_history_id), None)
+            serializer_class = None if is_admin else EVENT_HISTORY_SERIALIZERS.get(record.instance_type, None)
+            reported_fields = serializer_class.Meta.fields if serializer_class is not None else None
+            results.append({
+                "model": record.instance_type._meta.model_name, "id": record.id, "history_id": record.history_id,
+                "history_date": record.history_date, "history_type": record.history_type,
+                "history_type_string": HISTORY_TYPES.get(record.history_type, ''),
+                "history_user": record.history_user_id,
+                "history_user_string": record.history_user.username if record.history_user else '',
+                "changes": [] if record.history_type == '-' else get_history_changes(
+                    record, previous_record, reported_fields)})
+
+        next_url = None
+        if has_next:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_history_cursor(records[-1]))
+        return Response({"next": next_url, "results": results})
+
     # override the default queryset to allow filtering by URL arguments
     def get_queryset(self):
         user = get_request_user(self.request)
@@ -219,16 +752,10 @@ class EventViewSet(HistoryViewSet):
                 if queryset:
                     obj = queryset[0]
                     if obj:
-                        read_collaborators = []
-                        write_collaborators = []
-                        if obj.read_collaborators:
-                            read_collaborators = list(
-                                User.objects.filter(readevents=obj.id).values_list('id', flat=True))
-                        if obj.write_collaborators:
-                            write_collaborators = list(
-                                User.objects.filter(writeevents=obj.id).values_list('id', flat=True))
+                        read_collaborators = get_event_read_collaborator_ids(obj.id)
+                        write_collaborators = get_event_write_collaborator_ids(obj.id)
                         if (user.id == obj.created_by.id
-                                or user.organization.id == obj.created_by.organization.id
+                                or obj.created_by.organization_id in get_user_organization_ids(user)
                                 or user.id in read_collaborators or user.id in write_collaborators):
                             return queryset
                         else:
@@ -256,14 +783,8 @@ class EventViewSet(HistoryViewSet):
             if pk is not None and pk.isdigit():
                 obj = Event.objects.filter(id=pk).first()
                 if obj:
-                    read_collaborators = []
-                    write_collaborators = []
-                    if obj.read_collaborators:
-                        read_collaborators = list(
-                            User.objects.filter(readevents=obj.id).values_list('id', flat=True))
-                    if obj.write_collaborators:
-                        write_collaborators = list(
-                            User.objects.filter(writeevents=obj.id).values_list('id', flat=True))
+                    read_collaborators = get_event_read_collaborator_ids(obj.id)
+                    write_collaborators = get_event_write_collaborator_ids(obj.id)
                     if user.id in read_collaborators:
                         # read_collaborators members can only retrieve
                         if self.action == 'retrieve':
@@ -271,15 +792,16 @@ class EventViewSet(HistoryViewSet):
                         else:
                             raise PermissionDenied
                     # write_collaborators members and org partners can retrieve and update but not delete
-                    elif user.id in write_collaborators or (user.organization.id == obj.created_by.organization.id
-                                                            and (user.role.is_affiliate or user.role.is_partner)):
+                    elif user.id in write_collaborators or (
+                            obj.created_by.organization_id in get_user_organization_ids(user)
+                            and (user.role.is_affiliate or user.role.is_partner)):
                         if self.action == 'delete':
                             raise PermissionDenied
                         else:
                             return EventSerializer
                     # owner and org partner managers and org partner admins have full access to non-admin fields
                     elif user.id == obj.created_by.id or (
-                            user.organization.id == obj.created_by.organization.id
+                            obj.created_by.organization_id in get_user_organization_ids(user)
                             and (user.role.is_partnermanager or user.role.is_partneradmin)):
                         return EventSerializer
             return EventPublicSerializer
@@ -539,7 +1061,8 @@ class EventStatusViewSet(HistoryViewSet):
 class EventAbstractViewSet(HistoryViewSet):
     """
     list:
-    Returns a list of all event abstracts.
+    Returns a list of all event abstracts, or those matching a full-text search ('search' param),
+    ranked and with highlighted snippets.
 
     create:
     Creates a new event abstract.
@@ -573,6 +1096,9 @@ class EventAbstractViewSet(HistoryViewSet):
         contains = self.request.query_params.get('contains', None) if self.request else None
         if contains is not None:
             queryset = queryset.filter(text__contains=contains)
+        search = self.request.query_params.get('search', None) if self.request else None
+        if search is not None and search != '':
+            queryset = search_text(queryset, search, 'text')
         return queryset
 
 
@@ -684,7 +1210,8 @@ class EventOrganizationViewSet(HistoryViewSet):
             pk = self.request.parser_context['kwargs'].get('pk', None)
             if pk is not None and pk.isdigit():
                 obj = EventOrganization.objects.filter(id=pk).first()
-                if obj and (user.id == obj.created_by.id or user.organization.id == obj.created_by.organization.id):
+                if obj and (user.id == obj.created_by.id
+                            or obj.created_by.organization_id in get_user_organization_ids(user)):
                     return EventOrganizationSerializer
             return EventOrganizationPublicSerializer
         # non-admins and non-owners (and non-owner orgs) must use the public serializer
@@ -790,10 +1317,9 @@ class EventLocationViewSet(HistoryViewSet):
             pk = self.request.parser_context['kwargs'].get('pk', None)
             if pk is not None and pk.isdigit():
                 obj = EventLocation.objects.filter(id=pk).first()
-                if obj and (user.id == obj.created_by.id or user.organization.id == obj.created_by.organization.id
-                            or user.id in list(User.objects.filter(
-                            Q(writeevents__in=[obj.event.id]) | Q(readevents__in=[obj.event.id])
-                        ).values_list('id', flat=True))):
+                if obj and (user.id == obj.created_by.id
+                            or obj.created_by.organization_id in get_user_organization_ids(user)
+                            or user.id in get_event_collaborator_ids(obj.event.id)):
                     return EventLocationSerializer
             return EventLocationPublicSerializer
         # non-admins and non-owners (and non-owner orgs) must use the public serializer
@@ -841,15 +1367,16 @@ class EventLocationContactViewSet(HistoryViewSet):
         # admins and superadmins can see everything
         elif user.role.is_superadmin or user.role.is_admin:
             queryset = EventLocationContact.objects.all()
-        # partners can see location contacts owned by the user or user's org
+        # partners can see location contacts owned by the user or user's org (or its sub-orgs)
         elif user.role.is_affiliate or user.role.is_partner or user.role.is_partnermanager or user.role.is_partneradmin:
             # they can also see location contacts for events on which they are collaborators:
             collab_evt_ids = list(Event.objects.filter(
                 Q(eventwriteusers__user__in=[user.id, ]) | Q(eventreadusers__user__in=[user.id, ])
+                | Q(eventcircleusers__user=user.id)
             ).values_list('id', flat=True))
             queryset = EventLocationContact.objects.filter(
                 Q(created_by__exact=user.id) |
-                Q(created_by__organization__exact=user.organization) |
+                Q(created_by__organization__in=get_sub_organizations(user.organization.id)) |
                 Q(event_location__event__in=collab_evt_ids)
             )
         # otherwise return nothing
@@ -933,6 +1460,9 @@ class AdministrativeLevelTwoViewSet(HistoryViewSet):
     request_new:
     Request to have a new administrative level two added.
     
+    geometry:
+    Returns the shape of an administrative level two, optionally simplified for a zoom level and encoded as polylines.
+    
     read:
     Returns a administrative level two by id.
     
@@ -954,6 +1484,48 @@ class AdministrativeLevelTwoViewSet(HistoryViewSet):
         message = "Please add a new administrative level two:"
         return construct_email(request.data, request.user.email, message)
 
+    @action(detail=True)
+    def geometry(self, request, pk):
+        # shapes rarely change, so let clients keep them as long as no administrative area data has been written
+        zoom = request.query_params.get('zoom', None)
+        if zoom is not None and not zoom.isdigit():
+            raise serializers.ValidationError({"zoom": "zoom must be a non-negative integer"})
+        encoding = request.query_params.get('encoding', 'json')
+        if encoding not in GEOMETRY_ENCODINGS:
+            raise serializers.ValidationError({"encoding": "encoding must be one of " + str(GEOMETRY_ENCODINGS)})
+        # look up the area before the precondition, so that a missing area is not found even with a matching ETag
+        # (without its points, which are only loaded when its shape is not already cached)
+        admin_level_two = self.get_queryset().filter(pk=pk).defer('points').first() if pk.isdigit() else None
+        if admin_level_two is None:
+            raise NotFound
+        self.check_object_permissions(request, admin_level_two)
+        key_data = json.dumps([get_event_lookup_version(), admin_level_two.id, zoom, encoding])
+        etag = quote_etag(hashlib.md5(key_data.encode('utf-8')).hexdigest())
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            cache_key = 'whispers_geometry_' + hashlib.md5(key_data.encode('utf-8')).hexdigest()
+            data = cache.get(cache_key)
+            if data is None:
+                data = {"id": admin_level_two.id, "name": admin_level_two.name, "zoom": zoom, "encoding": encoding}
+                try:
+                    points = json.loads(admin_level_two.points)
+                except ValueError:
+                    points = None
+                if isinstance(points, list):
+                    # simplify to about one pixel at the requested zoom level (256 pixel tiles spanning 360 degrees)
+                    tolerance = 360.0 / (256 * 2 ** int(zoom)) if zoom is not None else 0
+                    data["points"] = transform_geometry(points, tolerance, encoding)
+                else:
+                    # points that are not a list of coordinates are returned exactly as stored
+                    data["points"] = admin_level_two.points
+                    data["encoding"] = 'text'
+                cache.set(cache_key, data, GEOMETRY_CACHE_MAX_AGE)
+            response = Response(data)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=GEOMETRY_CACHE_MAX_AGE)
+        return response
+
     def get_queryset(self):
         queryset = AdministrativeLevelTwo.objects.all()
         administrative_level_one = self.request.query_params.get('administrativelevelone', None)
@@ -1127,11 +1699,9 @@ class LocationSpeciesViewSet(HistoryViewSet):
             pk = self.request.parser_context['kwargs'].get('pk', None)
             if pk is not None and pk.isdigit():
                 obj = LocationSpecies.objects.filter(id=pk).first()
-                if obj and (user.id == obj.created_by.id or user.organization.id == obj.created_by.organization.id
-                            or user.id in list(User.objects.filter(
-                            Q(writeevents__in=[obj.event_location.event.id]) | Q(
-                                readevents__in=[obj.event_location.event.id])
-                        ).values_list('id', flat=True))):
+                if obj and (user.id == obj.created_by.id
+                            or obj.created_by.organization_id in get_user_organization_ids(user)
+                            or user.id in get_event_collaborator_ids(obj.event_location.event.id)):
                     return LocationSpeciesSerializer
             return LocationSpeciesPublicSerializer
         # non-admins and non-owners (and non-owner orgs) must use the public serializer
@@ -1150,6 +1720,9 @@ class SpeciesViewSet(HistoryViewSet):
     request_new:
     Request to have a new species added.
     
+    typeahead:
+    Returns a few species whose name or latin name starts with or is similar to the 'q' param, best matches first.
+    
     read:
     Returns a species by id.
     
@@ -1172,6 +1745,12 @@ class SpeciesViewSet(HistoryViewSet):
         message = "Please add a new species:"
         return construct_email(request.data, request.user.email, message)
 
+    @action(detail=False)
+    def typeahead(self, request):
+        queryset = search_typeahead(self.get_queryset(), request.query_params, ['name', 'species_latin_name'])
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data, status=200)
+
     def get_serializer_class(self):
         if self.request and 'slim' in self.request.query_params:
             return SpeciesSlimSerializer
@@ -1366,7 +1945,8 @@ class EventDiagnosisViewSet(HistoryViewSet):
             pk = self.request.parser_context['kwargs'].get('pk', None)
             if pk is not None and pk.isdigit():
                 obj = EventDiagnosis.objects.filter(id=pk).first()
-                if obj and (user.id == obj.created_by.id or user.organization.id == obj.created_by.organization.id):
+                if obj and (user.id == obj.created_by.id
+                            or obj.created_by.organization_id in get_user_organization_ids(user)):
                     return EventDiagnosisSerializer
             return EventDiagnosisPublicSerializer
         # non-admins and non-owners (and non-owner orgs) must use the public serializer
@@ -1418,11 +1998,9 @@ class SpeciesDiagnosisViewSet(HistoryViewSet):
             pk = self.request.parser_context['kwargs'].get('pk', None)
             if pk is not None and pk.isdigit():
                 obj = SpeciesDiagnosis.objects.filter(id=pk).first()
-                if obj and (user.id == obj.created_by.id or user.organization.id == obj.created_by.organization.id
-                            or user.id in list(User.objects.filter(
-                            Q(writeevents__in=[obj.location_species.event_location.event.id]) | Q(
-                                readevents__in=[obj.location_species.event_location.event.id])
-                        ).values_list('id', flat=True))):
+                if obj and (user.id == obj.created_by.id
+                            or obj.created_by.organization_id in get_user_organization_ids(user)
+                            or user.id in get_event_collaborator_ids(obj.location_species.event_location.event.id)):
                     return SpeciesDiagnosisSerializer
             return SpeciesDiagnosisPublicSerializer
         # non-admins and non-owners (and non-owner orgs) must use the public serializer
@@ -1550,15 +2128,16 @@ class ServiceRequestViewSet(HistoryViewSet):
         # admins and superadmins can see everything
         elif user.role.is_superadmin or user.role.is_admin:
             queryset = ServiceRequest.objects.all()
-        # partners can see service requests owned by the user or user's org
+        # partners can see service requests owned by the user or user's org (or its sub-orgs)
         elif user.role.is_affiliate or user.role.is_partner or user.role.is_partnermanager or user.role.is_partneradmin:
             # they can also see service requests for events on which they are collaborators:
             collab_evt_ids = list(Event.objects.filter(
                 Q(eventwriteusers__user__in=[user.id, ]) | Q(eventreadusers__user__in=[user.id, ])
+                | Q(eventcircleusers__user=user.id)
             ).values_list('id', flat=True))
             queryset = ServiceRequest.objects.filter(
                 Q(created_by__exact=user.id) |
-                Q(created_by__organization__exact=user.organization) |
+                Q(created_by__organization__in=get_sub_organizations(user.organization.id)) |
                 Q(event__in=collab_evt_ids)
             )
         # otherwise return nothing
@@ -1626,7 +2205,8 @@ class ServiceRequestResponseViewSet(HistoryViewSet):
 class CommentViewSet(HistoryViewSet):
     """
     list:
-    Returns a list of all comments.
+    Returns a list of all comments, or those matching a full-text search ('search' param),
+    ranked and with highlighted snippets.
 
     create:
     Creates a comment.
@@ -1655,11 +2235,12 @@ class CommentViewSet(HistoryViewSet):
         # admins and superadmins can see everything
         elif user.role.is_superadmin or user.role.is_admin:
             queryset = Comment.objects.all()
-        # partners can see comments owned by the user or user's org
+        # partners can see comments owned by the user or user's org (or its sub-orgs)
         elif user.role.is_affiliate or user.role.is_partner or user.role.is_partnermanager or user.role.is_partneradmin:
             # they can also see comments for events on which they are collaborators:
             collab_evt_ids = list(Event.objects.filter(
                 Q(eventwriteusers__user__in=[user.id, ]) | Q(eventreadusers__user__in=[user.id, ])
+                | Q(eventcircleusers__user=user.id)
             ).values_list('id', flat=True))
             collab_evtloc_ids = list(EventLocation.objects.filter(
                 event__in=collab_evt_ids).values_list('id', flat=True))
@@ -1669,7 +2250,7 @@ class CommentViewSet(HistoryViewSet):
                 event__in=collab_evt_ids).values_list('id', flat=True))
             queryset = Comment.objects.filter(
                 Q(created_by__exact=user.id) |
-                Q(created_by__organization__exact=user.organization) |
+                Q(created_by__organization__in=get_sub_organizations(user.organization.id)) |
                 Q(content_type__model='event', object_id__in=collab_evt_ids) |
                 Q(content_type__model='eventlocation', object_id__in=collab_evtloc_ids) |
                 Q(content_type__model='eventeventgroup',object_id__in=collab_evtgrp_ids) |
@@ -1682,6 +2263,9 @@ class CommentViewSet(HistoryViewSet):
         contains = self.request.query_params.get('contains', None) if self.request else None
         if contains is not None:
             queryset = queryset.filter(comment__contains=contains)
+        search = self.request.query_params.get('search', None) if self.request else None
+        if search is not None and search != '':
+            queryset = search_text(queryset, search, 'comment')
         return queryset
 
 
@@ -1884,7 +2468,8 @@ class AuthView(views.APIView):
         user = request.user if request is not None else None
         if user and user.is_authenticated:
             user.last_login = timezone.now()
-            user.save(update_fields=['last_login'])
+            with system_change(user):
+                user.save(update_fields=['last_login'])
         return Response(self.serializer_class(user).data)
 
 
@@ -1963,6 +2548,9 @@ class OrganizationViewSet(HistoryViewSet):
     request_new:
     Request to have a new organization added.
     
+    typeahead:
+    Returns a few organizations whose name starts with or is similar to the 'q' param, best matches first.
+    
     read:
     Returns a organization by id.
     
@@ -1984,6 +2572,12 @@ class OrganizationViewSet(HistoryViewSet):
         message = "Please add a new organization:"
         return construct_email(request.data, request.user.email, message)
 
+    @action(detail=False)
+    def typeahead(self, request):
+        queryset = search_typeahead(self.get_queryset(), request.query_params, ['name'])
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data, status=200)
+
     # override the default serializer_class to ensure the requester sees only permitted data
     def get_serializer_class(self):
         user = get_request_user(self.request)
@@ -2035,8 +2629,8 @@ class OrganizationViewSet(HistoryViewSet):
                                 or user.role.is_superadmin or user.role.is_admin):
                         return queryset
             raise NotFound
-        # all list requests, and all requests from public users, must only return published data
-        elif self.action == 'list' or user.role.is_public:
+        # all list (and typeahead) requests, and all requests from public users, must only return published data
+        elif self.action in ['list', 'typeahead'] or user.role.is_public:
             return queryset.filter(do_not_publish=False)
         # that leaves the create request, implying that the requester is the owner
         else:
@@ -2054,6 +2648,10 @@ class ContactViewSet(HistoryViewSet):
     user_contacts:
     Returns contacts owned by a user.
     
+    typeahead:
+    Returns a few contacts whose first name, last name, or email starts with or is similar to the 'q' param,
+    best matches first (of the contacts owned by the user when the 'user_contacts' param is included).
+    
     read:
     Returns a contact by id.
     
@@ -2092,10 +2690,10 @@ class ContactViewSet(HistoryViewSet):
             slim = True if 'slim' in self.request.query_params else False
 
             if 'no_page' in self.request.query_params:
-                if slim:
-                    serializer = ContactSlimSerializer(queryset, many=True, context={'request': request})
-                else:
-                    serializer = ContactSerializer(queryset, many=True, context={'request': request})
+                serializer_class = ContactSlimSerializer if slim else ContactSerializer
+                if can_stream_list(request):
+                    return stream_json_list(request, queryset, serializer_class, {'request': request})
+                serializer = serializer_class(queryset, many=True, context={'request': request})
                 return Response(serializer.data, status=200)
             else:
                 page = self.paginate_queryset(queryset)
@@ -2111,6 +2709,14 @@ class ContactViewSet(HistoryViewSet):
                     serializer = ContactSerializer(queryset, many=True, context={'request': request})
                 return Response(serializer.data, status=200)
 
+    @action(detail=False)
+    def typeahead(self, request):
+        query_params = self.request.query_params if request is not None else None
+        queryset = self.build_queryset(query_params, get_user_contacts='user_contacts' in query_params)
+        queryset = search_typeahead(queryset, query_params, ['first_name', 'last_name', 'email'])
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data, status=200)
+
     # override the default queryset to allow filtering by URL arguments
     def get_queryset(self):
         query_params = self.request.query_params if self.request else None
@@ -2127,11 +2733,13 @@ class ContactViewSet(HistoryViewSet):
         # public users cannot see anything
         elif user.role.is_public:
             return Contact.objects.none()
-        # user-specific requests and requests from a partner user can only return data owned by the user or user's org
+        # user-specific requests and requests from a partner user can only return data owned by the user
+        #  or the user's org (or its sub-orgs)
         elif (get_user_contacts or user.role.is_affiliate
               or user.role.is_partner or user.role.is_partnermanager or user.role.is_partneradmin):
             queryset = Contact.objects.all().filter(
-                Q(created_by__exact=user.id) | Q(created_by__organization__exact=user.organization))
+                Q(created_by__exact=user.id)
+                | Q(created_by__organization__in=get_sub_organizations(user.organization.id)))
         # admins, superadmins, and superusers can see everything
         elif user.role.is_superadmin or user.role.is_admin:
             queryset = Contact.objects.all()
@@ -2301,6 +2909,39 @@ class SearchViewSet(HistoryViewSet):
         return queryset
 
 
+class NotificationViewSet(ReadOnlyHistoryViewSet):
+    """
+    list:
+    Returns a list of the user's notifications (digests of the changes to the events the user created or collaborates
+    on), newest first. Use the 'unread' param to return only unread notifications.
+
+    read:
+    Returns a notification by id.
+
+    mark_read:
+    Marks the user's notifications whose IDs are submitted in the 'ids' list as read (or all of them, without 'ids').
+    """
+    serializer_class = NotificationSerializer
+    permission_classes = (IsAuthenticated,)
+
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        queryset = Notification.objects.filter(recipient=request.user.id, read=False)
+        ids = request.data.get('ids', None) if isinstance(request.data, dict) else None
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(item, int) for item in ids):
+                raise serializers.ValidationError({"ids": "ids must be a list of integers"})
+            queryset = queryset.filter(id__in=ids)
+        return Response({"count": queryset.update(read=True)}, status=200)
+
+    def get_queryset(self):
+        # users can only see their own notifications
+        queryset = Notification.objects.filter(recipient=self.request.user.id)
+        if 'unread' in self.request.query_params:
+            queryset = queryset.filter(read=False)
+        return queryset
+
+
 ######
 #
 #  Special
@@ -2308,6 +2949,86 @@ class SearchViewSet(HistoryViewSet):
 ######
 
 
+# the lookup tables of the reference data bundle, with the (public) rows and fields of each
+REFERENCE_DATA_TABLES = OrderedDict([
+    ('countries', (Country.objects.all(), ['id', 'name', 'abbreviation', 'calling_code'])),
+    ('administrativelevelones', (AdministrativeLevelOne.objects.all(), ['id', 'name', 'country', 'abbreviation'])),
+    ('administrativeleveltwos', (AdministrativeLevelTwo.objects.all(), [
+        'id', 'name', 'administrative_level_one', 'centroid_latitude', 'centroid_longitude', 'fips_code'])),
+    ('administrativelevellocalities', (AdministrativeLevelLocality.objects.all(), [
+        'id', 'country', 'admin_level_one_name', 'admin_level_two_name'])),
+    ('landownerships', (LandOwnership.objects.all(), ['id', 'name'])),
+    ('flyways', (Flyway.objects.all(), ['id', 'name'])),
+    ('species', (Species.objects.all(), [
+        'id', 'name', 'class_name', 'order_name', 'family_name', 'sub_family_name', 'genus_name',
+        'species_latin_name', 'subspecies_latin_name', 'tsn'])),
+    ('agebiases', (AgeBias.objects.all(), ['id', 'name'])),
+    ('sexbiases', (SexBias.objects.all(), ['id', 'name'])),
+    ('diagnoses', (Diagnosis.objects.all(), ['id', 'name', 'high_impact', 'diagnosis_type'])),
+    ('diagnosistypes', (DiagnosisType.objects.all(), ['id', 'name', 'color'])),
+    ('diagnosisbases', (DiagnosisBasis.objects.all(), ['id', 'name'])),
+    ('diagnosiscauses', (DiagnosisCause.objects.all(), ['id', 'name'])),
+    ('eventtypes', (EventType.objects.all(), ['id', 'name'])),
+    ('eventstatuses', (EventStatus.objects.all(), ['id', 'name'])),
+    ('legalstatuses', (LegalStatus.objects.all(), ['id', 'name'])),
+    ('servicerequesttypes', (ServiceRequestType.objects.all(), ['id', 'name'])),
+    ('servicerequestresponses', (ServiceRequestResponse.objects.all(), ['id', 'name'])),
+    ('commenttypes', (CommentType.objects.all(), ['id', 'name'])),
+    ('contacttypes', (ContactType.objects.all(), ['id', 'name'])),
+    ('organizations', (Organization.objects.filter(do_not_publish=False), [
+        'id', 'name', 'address_one', 'address_two', 'city', 'postal_code', 'administrative_level_one', 'country',
+        'phone', 'parent_organization', 'laboratory'])),
+])
+
+
+class ReferenceDataViewSet(viewsets.ViewSet):
+    """
+    list:
+    Returns all the lookup tables in one response, each as a list of fields and a list of rows, with a content hash.
+    Tables whose hash is submitted in the 'hashes' param (e.g., 'countries:abc,species:def') and has not changed
+    are returned with just their hash.
+    """
+
+    def list(self, request):
+        # build the tables once per version of the lookup data
+        cache_key = 'whispers_reference_data_' + hashlib.md5(
+            json.dumps(get_event_lookup_version()).encode('utf-8')).hexdigest()
+        bundle = cache.get(cache_key)
+        if bundle is None:
+            tables = OrderedDict()
+            for table_name, (queryset, fields) in REFERENCE_DATA_TABLES.items():
+                rows = [list(row) for row in queryset.order_by('id').values_list(*fields)]
+                # hash the table exactly as it is rendered (e.g., decimals as numbers)
+                table_json = json.dumps([fields, rows], cls=encoders.JSONEncoder)
+                table_hash = hashlib.md5(table_json.encode('utf-8')).hexdigest()
+                tables[table_name] = {"hash": table_hash, "fields": fields, "rows": json.loads(table_json)[1]}
+            bundle_hash = hashlib.md5(''.join(table['hash'] for table in tables.values()).encode('utf-8')).hexdigest()
+            bundle = {"hash": bundle_hash, "tables": tables}
+            cache.set(cache_key, bundle, None)
+
+        # send only the tables that have changed since the hashes the requester already has
+        known_hashes = {}
+        hashes = request.query_params.get('hashes', None)
+        if hashes is not None and hashes != '':
+            for table_hash in hashes.split(LIST_DELIMETER):
+                table_name, __, known_hash = table_hash.partition(':')
+                known_hashes[table_name.strip()] = known_hash.strip()
+
+        etag = quote_etag(hashlib.md5((bundle['hash'] + json.dumps(sorted(known_hashes.items()))).encode(
+            'utf-8')).hexdigest())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            tables = OrderedDict()
+            for table_name, table in bundle['tables'].items():
+                if known_hashes.get(table_name, None) == table['hash']:
+                    tables[table_name] = {"hash": table['hash']}
+                else:
+                    tables[table_name] = table
+            response = Response({"hash": bundle['hash'], "tables": tables})
+        response['ETag'] = etag
+        return response
+
+
 class CSVEventSummaryPublicRenderer(csv_renderers.PaginatedCSVRenderer):
     header = ['id', 'type', 'affected', 'start_date', 'end_date', 'countries', 'states', 'counties',  'species',
               'eventdiagnoses']
@@ -2340,25 +3061,202 @@ class EventSummaryViewSet(ReadOnlyHistoryViewSet):
     user_events:
     Returns events create by a user.
     
+    statistics:
+    Returns counts of events and sums of affected counts, grouped by dimensions ('group_by' param, e.g., 'diagnosis,flyway')
+    and by start date bucket ('bucket' param: day, week, month, quarter, or year), for the same filters as the list.
+    
+    clusters:
+    Returns clusters of the event locations in a bounding box ('bbox' param: min lon,min lat,max lon,max lat)
+    for a map zoom level ('zoom' param), each with its geohash cell, mean position, and counts of locations and events,
+    for the same filters as the list.
+    
+    changes:
+    Returns the event summaries created or modified (including their children) since a watermark ('since' param),
+    and the IDs of the events deleted (or no longer visible) since then, along with the next watermark.
+    
     read:
     Returns an event summary by id.
     """
 
+    # anonymous users all share the same (public) view of the data, so their list responses are cached
+    # (by URL, including all query params and format) until the next write to the event tree
+    def list(self, request, *args, **kwargs):
+        user = get_request_user(self.request)
+        if user and user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        event_summary_cache = caches['eventsummaries']
+        cache_key = get_event_data_cache_key(
+            'event_summaries', [request.build_absolute_uri(request.path), sorted(request.query_params.lists())])
+        data = event_summary_cache.get(cache_key)
+        if data is None:
+            # build the whole list (rather than streaming it) to cache it
+            response = super(StreamingListMixin, self).list(request, *args, **kwargs)
+            if response.status_code == 200:
+                event_summary_cache.set(cache_key, response.data, settings.EVENT_SUMMARY_CACHE_TIMEOUT)
+            return response
+        return Response(data)
+
     @action(detail=False)
     def get_count(self, request):
         query_params = self.request.query_params if self.request else None
-        return Response({"count": self.build_queryset(query_params, get_user_events=False).count()})
+        return Response({"count": self.get_cached_count(query_params, get_user_events=False)})
 
     @action(detail=False)
     def get_user_events_count(self, request):
         query_params = self.request.query_params if self.request else None
-        return Response({"count": self.build_queryset(query_params, get_user_events=True).count()})
+        return Response({"count": self.get_cached_count(query_params, get_user_events=True)})
+
+    @action(detail=False)
+    def statistics(self, request):
+        query_params = self.request.query_params if self.request else None
+        group_by = query_params.get('group_by', '') if query_params else ''
+        dimensions = [dimension.strip() for dimension in group_by.split(LIST_DELIMETER) if dimension.strip() != '']
+        invalid_dimensions = [dimension for dimension in dimensions if dimension not in EVENT_STATISTICS_DIMENSIONS]
+        if invalid_dimensions:
+            raise serializers.ValidationError(
+                {"group_by": "group_by must be a list of " + str(list(EVENT_STATISTICS_DIMENSIONS.keys()))})
+        bucket = query_params.get('bucket', None) if query_params else None
+        if bucket is not None and bucket not in EVENT_STATISTICS_BUCKETS:
+            raise serializers.ValidationError({"bucket": "bucket must be one of " + str(EVENT_STATISTICS_BUCKETS)})
+
+        search_params = get_search_params(query_params)
+        cache_key = get_event_data_cache_key(
+            'event_statistics', [self.get_visibility_scope(False), search_params, dimensions, bucket])
+        data = cache.get(cache_key)
+        if data is None:
+            # a multi-valued dimension (e.g., species) joins an event to many rows, so first reduce the rows
+            # to the distinct (group, event) pairs, then count and sum those pairs in a GROUP BY around them
+            columns = OrderedDict(('dimension_' + dimension, F(EVENT_STATISTICS_DIMENSIONS[dimension]))
+                                  for dimension in dimensions)
+            if bucket is not None:
+                columns['bucket'] = Trunc('start_date', bucket)
+            columns['event_id'] = F('id')
+            columns['event_affected_count'] = F('affected_count')
+            event_ids = self.build_queryset(query_params, get_user_events=False).values('id')
+            pairs = Event.objects.filter(id__in=event_ids).annotate(**columns).values(*columns.keys())
+            pairs = pairs.order_by().distinct()
+            pairs_sql, pairs_params = pairs.query.sql_with_params()
+
+            group_columns = [name for name in columns.keys() if name not in ['event_id', 'event_affected_count']]
+            quoted_group_columns = ', '.join(connection.ops.quote_name(name) for name in group_columns)
+            sql = "SELECT " + (quoted_group_columns + ", " if group_columns else "")
+            sql += "COUNT(*), SUM(" + connection.ops.quote_name('event_affected_count') + ")"
+            sql += " FROM (" + pairs_sql + ") AS event_statistics"
+            if group_columns:
+                sql += " GROUP BY " + quoted_group_columns + " ORDER BY " + quoted_group_columns
+            with connection.cursor() as cursor:
+                cursor.execute(sql, pairs_params)
+                rows = cursor.fetchall()
+
+            data = []
+            for row in rows:
+                item = OrderedDict(zip(dimensions, row[:len(dimensions)]))
+                if bucket is not None:
+                    # the database truncates dates to timestamps, but buckets are dates
+                    bucket_start = row[len(dimensions)]
+                    item['bucket'] = bucket_start.date() if isinstance(bucket_start, dt) else bucket_start
+                item['count'] = row[-2]
+                item['affected_count'] = row[-1] or 0
+                data.append(item)
+            cache.set(cache_key, data, settings.EVENT_COUNT_CACHE_TIMEOUT)
+        return Response(data)
+
+    @action(detail=False)
+    def clusters(self, request):
+        query_params = self.request.query_params if self.request else None
+        zoom = query_params.get('zoom', '0') if query_params else '0'
+        if not zoom.isdigit():
+            raise serializers.ValidationError({"zoom": "zoom must be a non-negative integer"})
+        bbox = query_params.get('bbox', None) if query_params else None
+        bbox = parse_coordinates('bbox', bbox, 2, 2) if bbox is not None and bbox != '' else None
+
+        search_params = get_search_params(query_params)
+        cache_key = get_event_data_cache_key(
+            'event_clusters', [self.get_visibility_scope(False), search_params, bbox, zoom])
+        data = cache.get(cache_key)
+        if data is None:
+            # use geohash cells about a quarter of a 256 pixel map tile wide at the zoom level
+            # (the cells of a geohash of n characters are 360 / 2^ceil(5n/2) degrees of longitude wide)
+            precision = min(max(int(math.ceil(2 * (int(zoom) + 2) / 5.0)), 1), GEOHASH_PRECISION)
+
+            event_ids = self.build_queryset(query_params, get_user_events=False).values('id')
+            queryset = EventLocation.objects.filter(event_id__in=event_ids).exclude(geohash='')
+            if bbox is not None:
+                # the events are already filtered to those with any location in the bounding box, but their
+                # other locations are not, so the locations themselves must be filtered too
+                queryset = filter_event_locations_in_bbox(queryset, bbox)
+            # geohash cells never cross the antimeridian, so the mean longitude of a cell is always inside it
+            queryset = queryset.annotate(cell=Substr('geohash', 1, precision)).values('cell').annotate(
+                latitude=Avg('map_latitude'), longitude=Avg('map_longitude'), count=Count('id'),
+                event_count=Count('event', distinct=True)).order_by('cell')
+            data = [{"geohash": item['cell'], "latitude": round(float(item['latitude']), 6),
+                     "longitude": round(float(item['longitude']), 6), "count": item['count'],
+                     "event_count": item['event_count']} for item in queryset]
+            cache.set(cache_key, data, settings.EVENT_COUNT_CACHE_TIMEOUT)
+        return Response(data)
+
+    @action(detail=False)
+    def changes(self, request):
+        query_params = self.request.query_params if self.request else None
+        since = query_params.get('since', None) if query_params else None
+        if since is None or since == '':
+            raise serializers.ValidationError({"since": "since is required (use the watermark of the last request)"})
+        try:
+            since = parse_datetime(since)
+        except ValueError:
+            since = None
+        if since is None:
+            raise serializers.ValidationError({"since": "since must be an ISO 8601 date and time"})
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+
+        # take the next watermark before reading any history, so nothing written during this request is missed,
+        # and hold it back by a margin, since history is dated when it is written but only seen once it is committed
+        watermark = timezone.now() - timedelta(seconds=settings.EVENT_CHANGES_WATERMARK_MARGIN)
+        if watermark <= since:
+            return Response({"since": since, "watermark": since, "changed": [], "removed": []})
+
+        # find the events whose tree has changed since the watermark from the history tables of the event tree
+        changed_ids = set()
+        for model, path in EVENT_TREE_MODELS.items():
+            event_id_field = path.replace('.', '__')
+            changed_ids.update(model.history.filter(
+                history_date__gt=since, history_date__lte=watermark).exclude(
+                **{event_id_field + '__isnull': True}).order_by().values_list(event_id_field, flat=True).distinct())
+
+        # send the changed events the requester can see (and that match the filters), using the usual serializers
+        queryset = self.build_queryset(query_params, get_user_events=False).filter(id__in=changed_ids)
+        queryset = queryset.select_related('summarydocument').order_by('id')
+        serializer = self.get_serializer_class()(queryset, many=True, context={'request': request})
+        changed = serializer.data
+
+        # the remaining changed events were deleted, or changed so that the requester can no longer see them
+        # (or they no longer match the filters), but only report the ones the requester could have seen before
+        # (by the visibility rules of build_queryset, applied to any version of the event, and to the collaborators and
+        # circles the event was ever shared with, since those of a deleted event are deleted with it)
+        removed_ids = changed_ids - set(item['id'] for item in changed)
+        removed = Event.history.filter(id__in=removed_ids)
+        user = get_request_user(self.request)
+        if not user or not user.is_authenticated or user.role.is_public:
+            removed = removed.filter(public=True)
+        elif not (user.role.is_superadmin or user.role.is_admin):
+            circle_ids = CircleUser.history.filter(user=user.id).values('circle_id')
+            removed = removed.filter(
+                Q(public=True) | get_user_events_filter(user)
+                | Q(id__in=EventReadUser.history.filter(user=user.id).values('event_id'))
+                | Q(id__in=EventWriteUser.history.filter(user=user.id).values('event_id'))
+                | Q(id__in=EventReadCircle.history.filter(circle__in=circle_ids).values('event_id'))
+                | Q(id__in=EventWriteCircle.history.filter(circle__in=circle_ids).values('event_id')))
+        removed = sorted(set(removed.values_list('id', flat=True)))
+
+        return Response({"since": since, "watermark": watermark, "changed": changed, "removed": removed})
 
     @action(detail=False)
     def user_events(self, request):
         # limit data to what the user owns, what the user's org owns, and what has been shared with the user
         query_params = self.request.query_params if self.request else None
-        queryset = self.build_queryset(query_params, get_user_events=True)
+        queryset = self.build_queryset(query_params, get_user_events=True).select_related('summarydocument')
         ordering_param = query_params.get('ordering', None) if query_params else None
         if ordering_param is not None:
             fields = [field.strip() for field in ordering_param.split(',')]
@@ -2396,14 +3294,8 @@ class EventSummaryViewSet(ReadOnlyHistoryViewSet):
                     return self.get_paginated_response(serializer.data)
                 serializer = EventSummaryAdminSerializer(queryset, many=True, context={'request': request})
         else:
-            read_collaborators = []
-            write_collaborators = []
-            if queryset[0].read_collaborators:
-                read_collaborators = list(
-                    User.objects.filter(eventreadusers=queryset[0].id).values_list('id', flat=True))
-            if queryset[0].write_collaborators:
-                write_collaborators = list(
-                    User.objects.filter(eventwriteusers=queryset[0].id).values_list('id', flat=True))
+            read_collaborators = get_event_read_collaborator_ids(queryset[0].id)
+            write_collaborators = get_event_write_collaborator_ids(queryset[0].id)
             # partner users can see all public fields and 'event_reference' and 'public' fields
             if (user.role.is_affiliate or user.role.is_partner or user.role.is_partnermanager
                   or user.role.is_partneradmin or user.id in read_collaborators or user.id in write_collaborators):
@@ -2426,6 +3318,8 @@ class EventSummaryViewSet(ReadOnlyHistoryViewSet):
                     return self.get_paginated_response(serializer.data)
                 serializer = EventSummaryPublicSerializer(queryset, many=True, context={'request': request})
 
+        if no_page and can_stream_list(request):
+            return stream_json_list(request, queryset, serializer.child.__class__, {'request': request})
         return Response(serializer.data, status=200)
 
     # override the default renderers to use a csv renderer when requested
@@ -2475,9 +3369,35 @@ class EventSummaryViewSet(ReadOnlyHistoryViewSet):
             return FlatEventSummaryPublicSerializer if frmt == 'csv' else EventSummaryPublicSerializer
 
     # override the default queryset to allow filtering by URL arguments
+    # (the stored summary documents are fetched in the same query, since the serializers are built from them)
     def get_queryset(self):
         query_params = self.request.query_params if self.request else None
-        return self.build_queryset(query_params, get_user_events=False)
+        return self.build_queryset(query_params, get_user_events=False).select_related('summarydocument')
+
+    # return the count of events matching the query_params, using the cached count if the same query
+    # has already been counted by a requester with the same visibility since the last write to the event tree
+    # NOTE: a cached count does not increment the count of the matching search
+    def get_cached_count(self, query_params, get_user_events):
+        search_params = get_search_params(query_params)
+
+        cache_key = get_event_data_cache_key(
+            'event_count', [self.get_visibility_scope(get_user_events), get_user_events, search_params])
+        count = cache.get(cache_key)
+        if count is None:
+            count = self.build_queryset(query_params, get_user_events).count()
+            cache.set(cache_key, count, settings.EVENT_COUNT_CACHE_TIMEOUT)
+        return count
+
+    # return the scope that identifies which events the requester can see, for keys of cached results
+    # (must match the visibility rules in build_queryset)
+    def get_visibility_scope(self, get_user_events):
+        user = get_request_user(self.request)
+        if not user or not user.is_authenticated or user.role.is_public:
+            return 'public'
+        elif get_user_events or not (user.role.is_superadmin or user.role.is_admin):
+            return 'user' + str(user.id) + 'org' + str(user.organization.id)
+        else:
+            return 'admin'
 
     # build a queryset using query_params
     # NOTE: this is being done in its own method to adhere to the DRY Principle
@@ -2488,9 +3408,8 @@ class EventSummaryViewSet(ReadOnlyHistoryViewSet):
         if query_params:
             ordered_query_params = OrderedDict(sorted(query_params.items()))
             ordered_query_params_static_keys = ordered_query_params.copy().keys()
-            not_search_params = ['no_page', 'page', 'page_size', 'format', 'slim', 'ordering']
             for param in ordered_query_params_static_keys:
-                if param in not_search_params:
+                if param in NOT_SEARCH_PARAMS:
                     del ordered_query_params[param]
             if len(ordered_query_params) > 0:
                 admin_user = User.objects.get(pk=1)
@@ -2504,7 +3423,8 @@ class EventSummaryViewSet(ReadOnlyHistoryViewSet):
                     search = Search.objects.create(data=ordered_query_params, created_by=admin_user)
                 search.count += 1
                 search.modified_by = admin_user if not user or not user.is_authenticated else user
-                search.save()
+                with system_change(search):
+                    search.save()
 
         # then proceed to build the queryset
         queryset = Event.objects.all()
@@ -2515,11 +3435,10 @@ class EventSummaryViewSet(ReadOnlyHistoryViewSet):
                 return queryset.none()
             else:
                 queryset = queryset.filter(public=True)
-        # user-specific event requests can only return data owned by the user or the user's org, or shared with the user
+        # user-specific event requests can only return data owned by the user or the user's org (or its sub-orgs),
+        #  or shared with the user
         elif get_user_events:
-            queryset = queryset.filter(
-                Q(created_by__exact=user.id) | Q(created_by__organization__exact=user.organization.id)
-                | Q(read_collaborators__in=[user.id]) | Q(write_collaborators__in=[user.id])).distinct()
+            queryset = queryset.filter(get_user_events_filter(user)).distinct()
         # admins, superadmins, and superusers can see everything
         elif user.role.is_superadmin or user.role.is_admin:
             queryset = queryset
@@ -2528,9 +3447,7 @@ class EventSummaryViewSet(ReadOnlyHistoryViewSet):
         else:
             # queryset = queryset.filter(public=True)
             public_queryset = queryset.filter(public=True).distinct()
-            personal_queryset = queryset.filter(
-                Q(created_by__exact=user.id) | Q(created_by__organization__exact=user.organization.id)
-                | Q(read_collaborators__in=[user.id]) | Q(write_collaborators__in=[user.id])).distinct()
+            personal_queryset = queryset.filter(get_user_events_filter(user)).distinct()
             queryset = public_queryset | personal_queryset
 
         # check for params that should use the 'and' operator
@@ -2690,6 +3607,40 @@ class EventSummaryViewSet(ReadOnlyHistoryViewSet):
                 queryset = queryset.filter(eventlocations__gnis_id__in=gnis_id_list).distinct()
             else:
                 queryset = queryset.filter(eventlocations__gnis_id__exact=gnis_id).distinct()
+        # filter by bounding box of event location map points (min longitude, min latitude, max longitude, max latitude)
+        bbox = query_params.get('bbox', None)
+        if bbox is not None and bbox != '':
+            bbox = parse_coordinates('bbox', bbox, 2, 2)
+            event_locations = filter_event_locations_in_bbox(EventLocation.objects.all(), bbox)
+            queryset = queryset.filter(id__in=event_locations.order_by().values('event_id'))
+        # filter by distance of event location map points from a point (longitude, latitude), in kilometers
+        point = query_params.get('point', None)
+        if point is not None and point != '':
+            longitude, latitude = parse_coordinates('point', point, 1, 1)
+            radius = query_params.get('radius', None)
+            try:
+                radius = float(radius)
+            except (TypeError, ValueError):
+                radius = None
+            if radius is None or radius < 0:
+                raise serializers.ValidationError({"radius": "radius must be a non-negative number (in kilometers)"})
+            event_locations = filter_event_locations_near(EventLocation.objects.all(), longitude, latitude, radius)
+            queryset = queryset.filter(id__in=event_locations.order_by().values('event_id'))
+        # filter by polygon (a list of longitude,latitude pairs) containing event location map points
+        polygon = query_params.get('polygon', None)
+        if polygon is not None and polygon != '':
+            polygon = parse_coordinates('polygon', polygon, 3)
+            event_locations = filter_event_locations_in_polygon(EventLocation.objects.all(), polygon)
+            queryset = queryset.filter(id__in=event_locations.order_by().values('event_id'))
+        # filter by full-text search of event_reference, which only partners and admins can see
+        search = query_params.get('search', None)
+        if search is not None and search != '':
+            if (not user or not user.is_authenticated or user.role.is_public or not (
+                    user.role.is_superadmin or user.role.is_admin or user.role.is_partneradmin
+                    or user.role.is_partnermanager or user.role.is_partner or user.role.is_affiliate)):
+                queryset = queryset.none()
+            else:
+                queryset = queryset.filter(search_vector=SearchQuery(search, config=TEXT_SEARCH_CONFIG))
         # filter by affected, (greater than or equal to only, less than or equal to only,
         # or between both, depending on which URL params appear)
         affected_count__gte = query_params.get('affected_count__gte', None)
@@ -2779,13 +3730,14 @@ class CSVEventDetailRenderer(csv_renderers.CSVRenderer):
               'number_tested': 'Number Assessed', 'number_positive': 'Number with this Diagnosis', 'lab': 'Lab'}
 
 
-class EventDetailViewSet(ReadOnlyHistoryViewSet):
+class EventDetailViewSet(EventConditionalRetrieveMixin, ReadOnlyHistoryViewSet):
     """
     list:
     Returns a list of all event details.
     
     read:
-    Returns an event detail.
+    Returns an event detail (with the no_county_points flag, counties are referenced by ID only; their shapes are
+    available from the administrative level two geometry action).
     
     flat:
     Returns a flattened response for an event detail by id.
@@ -2798,6 +3750,50 @@ class EventDetailViewSet(ReadOnlyHistoryViewSet):
         serializer = FlatEventDetailSerializer(queryset, many=True, context={'request': request})
         return Response(serializer.data, status=200)
 
+    # plan the related lookups of the whole nested document, so that an event loads in a fixed number of queries
+    # (the event-level method fields of the serializers each use their own single query)
+    def get_prefetch_lookups(self):
+        eventlocations = EventLocation.objects.select_related(
+            'country', 'administrative_level_one', 'administrative_level_two')
+        if 'no_county_points' in self.request.query_params:
+            eventlocations = eventlocations.defer('administrative_level_two__points')
+        lookups = [
+            'event_type', 'event_status',
+            Prefetch('eventlocations', queryset=eventlocations),
+            'eventlocations__flyways',
+            Prefetch('eventlocations__locationspecies', queryset=LocationSpecies.objects.select_related('species')),
+            Prefetch('eventlocations__locationspecies__speciesdiagnoses',
+                     queryset=SpeciesDiagnosis.objects.select_related('diagnosis', 'cause', 'basis')),
+            'eventlocations__locationspecies__speciesdiagnoses__organizations',
+        ]
+        if self.get_serializer_class() == EventDetailPublicSerializer:
+            lookups.append(Prefetch('eventdiagnoses', queryset=EventDiagnosis.objects.select_related('diagnosis')))
+        else:
+            comments = Comment.objects.select_related('content_type', 'created_by__organization', 'modified_by')
+            collaborators = User.objects.select_related('organization')
+            lookups.extend([
+                'staff', 'legal_status', 'created_by__organization', 'modified_by',
+                Prefetch('eventlocations__eventlocationcontact_set', queryset=EventLocationContact.objects.select_related(
+                    'contact_type', 'contact__organization', 'contact__created_by__organization')),
+                Prefetch('eventlocations__comments', queryset=comments),
+                Prefetch('comments', queryset=comments),
+                Prefetch('servicerequests', queryset=ServiceRequest.objects.select_related(
+                    'request_type', 'request_response', 'created_by__organization', 'modified_by')),
+                Prefetch('servicerequests__comments', queryset=comments),
+                Prefetch('eventgroups', queryset=EventGroup.objects.select_related('created_by', 'modified_by')),
+                Prefetch('eventgroups__comments', queryset=comments),
+                Prefetch('read_collaborators', queryset=collaborators),
+                Prefetch('write_collaborators', queryset=collaborators),
+            ])
+        return lookups
+
+    # apply the same plan to each page of a list
+    def filter_queryset(self, queryset):
+        queryset = super(EventDetailViewSet, self).filter_queryset(queryset)
+        if self.action == 'list':
+            queryset = queryset.prefetch_related(*self.get_prefetch_lookups())
+        return queryset
+
     # override the default renderers to use a csv renderer when requested
     def get_renderers(self):
         frmt = self.request.query_params.get('format', None) if self.request else None
@@ -2839,15 +3835,10 @@ class EventDetailViewSet(ReadOnlyHistoryViewSet):
                     if not obj:
                         raise NotFound
                     else:
-                        read_collaborators = []
-                        write_collaborators = []
-                        if obj.read_collaborators:
-                            read_collaborators = list(
-                                User.objects.filter(readevents=obj.id).values_list('id', flat=True))
-                        if obj.write_collaborators:
-                            write_collaborators = list(
-                                User.objects.filter(writeevents=obj.id).values_list('id', flat=True))
-                        if (user.id == obj.created_by.id or user.organization.id == obj.created_by.organization.id
+                        read_collaborators = get_event_read_collaborator_ids(obj.id)
+                        write_collaborators = get_event_write_collaborator_ids(obj.id)
+                        if (user.id == obj.created_by.id
+                                or obj.created_by.organization_id in get_user_organization_ids(user)
                                 or user.id in read_collaborators or user.id in write_collaborators
                                 or user.role.is_superadmin or user.role.is_admin):
                             return queryset
@@ -2872,16 +3863,11 @@ class EventDetailViewSet(ReadOnlyHistoryViewSet):
             if pk is not None and pk.isdigit():
                 obj = Event.objects.filter(id=pk).first()
                 if obj is not None:
-                    read_collaborators = []
-                    write_collaborators = []
-                    if obj.read_collaborators:
-                        read_collaborators = list(
-                            User.objects.filter(readevents=obj.id).values_list('id', flat=True))
-                    if obj.write_collaborators:
-                        write_collaborators = list(
-                            User.objects.filter(writeevents=obj.id).values_list('id', flat=True))
+                    read_collaborators = get_event_read_collaborator_ids(obj.id)
+                    write_collaborators = get_event_write_collaborator_ids(obj.id)
                     # owner and org members and collaborators have full access to non-admin fields
-                    if (user.id == obj.created_by.id or user.organization.id == obj.created_by.organization.id
+                    if (user.id == obj.created_by.id
+                            or obj.created_by.organization_id in get_user_organization_ids(user)
                             or user.id in read_collaborators or user.id in write_collaborators):
                         return EventDetailSerializer
             return EventDetailPublicSerializer
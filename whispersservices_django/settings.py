@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.0/ref/settings/
 """
 
 import os
+import tempfile
 from django.utils.six import moves
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -52,6 +53,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'simple_history',
     'rest_framework',
     'corsheaders',
@@ -89,12 +91,24 @@ TEMPLATES = [
     },
 ]
 
+# render and parse JSON with orjson (requires orjson, see the benchmark_json command), with the same output as before
+FAST_JSON = CONFIG.getboolean('general', 'FAST_JSON', fallback=False)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         # 'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'whispersservices.renderers.FastJSONRenderer' if FAST_JSON else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'whispersservices.parsers.FastJSONParser' if FAST_JSON else 'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
@@ -113,6 +127,20 @@ DEFAULT_FROM_EMAIL = CONFIG.get('email', 'DEFAULT_FROM_EMAIL')
 # EMAIL_PORT = '25'
 EMAIL_WHISPERS = CONFIG.get('email', 'EMAIL_WHISPERS')
 EMAIL_NWHC_EPI = CONFIG.get('email', 'EMAIL_NWHC_EPI')
+# emails are queued by requests and sent by the send_queued_email command (run it with --loop as a worker);
+# for testing, use 'django.core.mail.backends.filebased.EmailBackend' as the backend to write the emails to files
+# in EMAIL_FILE_PATH, or a local SMTP server (e.g. 'python -m smtpd -n -c DebuggingServer localhost:1025')
+EMAIL_FILE_PATH = CONFIG.get('email', 'EMAIL_FILE_PATH', fallback=os.path.join(PROJECT_PATH, 'sent_email'))
+EMAIL_QUEUE_BATCH_SIZE = CONFIG.getint('email', 'QUEUE_BATCH_SIZE', fallback=50)
+EMAIL_QUEUE_MAX_ATTEMPTS = CONFIG.getint('email', 'QUEUE_MAX_ATTEMPTS', fallback=5)
+EMAIL_QUEUE_RETRY_DELAY = CONFIG.getint('email', 'QUEUE_RETRY_DELAY', fallback=60)
+EMAIL_QUEUE_POLL_INTERVAL = CONFIG.getint('email', 'QUEUE_POLL_INTERVAL', fallback=10)
+
+# changes to events are recorded for the send_notifications command, which sends a digest of the changes to each user
+# who created or collaborates on the changed events (run it periodically, or with --loop every DIGEST_INTERVAL seconds)
+EVENT_CHANGE_NOTIFICATIONS = CONFIG.getboolean('notifications', 'ENABLED', fallback=True)
+NOTIFICATION_DIGEST_INTERVAL = CONFIG.getint('notifications', 'DIGEST_INTERVAL', fallback=3600)
+NOTIFICATION_DIGEST_EMAIL = CONFIG.getboolean('notifications', 'DIGEST_EMAIL', fallback=True)
 
 # Database
 # https://docs.djangoproject.com/en/2.0/ref/settings/#databases
@@ -130,6 +158,53 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/2.0/ref/settings/#caches
+
+# The local memory backend is private to each process, so it is only the default when DEBUG is enabled (i.e., in a
+# single development process). Otherwise (since the management commands, which also write events, run in processes of
+# their own), both caches default to the file-based backend, in directories under the system temporary directory,
+# which every process on the server shares. Any other shared backend can be set in the [caches] section instead.
+# The 'default' cache holds the data version stamps that every write to the event tree bumps, and the keys of the
+# cached values in both caches include those stamps, so if only one of the caches is shared, processes that never see
+# the bumps keep serving stale values.
+# The 'eventsummaries' cache holds whole public event summary responses and can be given its own (shared) backend,
+# otherwise it uses the same backend as the 'default' cache.
+
+if CONFIG.getboolean('general', 'DEBUG'):
+    CACHES_BACKEND = CONFIG.get('caches', 'BACKEND', fallback='django.core.cache.backends.locmem.LocMemCache')
+    CACHES_LOCATION_PREFIX = ''
+else:
+    CACHES_BACKEND = CONFIG.get('caches', 'BACKEND', fallback='django.core.cache.backends.filebased.FileBasedCache')
+    CACHES_LOCATION_PREFIX = tempfile.gettempdir() + os.sep
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHES_BACKEND,
+        'LOCATION': CONFIG.get('caches', 'LOCATION', fallback=CACHES_LOCATION_PREFIX + 'whispers'),
+    },
+    'eventsummaries': {
+        'BACKEND': CONFIG.get('caches', 'EVENTSUMMARIES_BACKEND', fallback=CACHES_BACKEND),
+        'LOCATION': CONFIG.get('caches', 'EVENTSUMMARIES_LOCATION',
+                               fallback=CACHES_LOCATION_PREFIX + 'whispers-eventsummaries'),
+    },
+}
+
+# number of seconds a cached event count or response is kept (both are also invalidated by any write to the event tree)
+EVENT_COUNT_CACHE_TIMEOUT = 60 * 60 * 24
+EVENT_SUMMARY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# number of seconds the watermark of the event changes feed is held back, so that changes whose history is dated
+# before the watermark but committed after it (by slower concurrent writes) are still sent in the next request
+EVENT_CHANGES_WATERMARK_MARGIN = CONFIG.getint('history', 'CHANGES_WATERMARK_MARGIN', fallback=60)
+
+# whether to skip the history of system-only changes (e.g., last logins, search counters, and rolled-up fields)
+SKIP_SYSTEM_CHANGE_HISTORY = CONFIG.getboolean('history', 'SKIP_SYSTEM_CHANGES', fallback=False)
+# the models whose history tables are partitioned by month (see the partition_history management command),
+# and the directory where the old partitions are archived (as gzipped CSV files) before they are dropped
+HISTORY_PARTITIONED_MODELS = ['Event', 'EventLocation', 'LocationSpecies', 'User', 'Search']
+HISTORY_ARCHIVE_DIR = CONFIG.get('history', 'ARCHIVE_DIR', fallback=os.path.join(PROJECT_PATH, 'history_archive'))
+
 AUTH_USER_MODEL = 'whispersservices.User'
 GEONAMES_USERNAME = CONFIG.get('geonames', 'USERNAME')
 